@@ -13,6 +13,7 @@ from src.strategy.dca_strategy import DCAStrategy
 from src.backtest.portfolio import Portfolio
 from src.backtest.engine import BacktestEngine
 from src.config.strategy_config import StrategyConfig
+from src.utils.calculator import PnLCalculator
 from src.utils.chart_visualizer import ChartVisualizer
 
 
@@ -36,7 +37,7 @@ def main():
     # Khởi tạo components
     portfolio_cfg = config.get("portfolio", {}) or {}
     initial_capital = portfolio_cfg.get("initial_capital", 10000)
-    portfolio = Portfolio(initial_capital=initial_capital)
+    portfolio = Portfolio(initial_capital=initial_capital, pnl_calculator=PnLCalculator.from_config(config))
     strategy = DCAStrategy(config)
     engine = BacktestEngine(config=config, data=df, strategy=strategy, portfolio=portfolio)
     
@@ -0,0 +1,56 @@
+"""
+Ví dụ: Replay file CSV qua StreamingEngine và in events theo thời gian thực
+"""
+
+from pathlib import Path
+import asyncio
+import sys
+
+# Thêm root vào path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.config.strategy_config import StrategyConfig
+from src.strategy.dca_strategy import DCAStrategy
+from src.backtest.portfolio import Portfolio
+from src.backtest.streaming import StreamingEngine, CSVReplayFeed
+from src.utils.calculator import PnLCalculator
+
+
+async def print_events(queue):
+    """In từng event ngay khi engine phát ra."""
+    while True:
+        event = await queue.get()
+        if event['type'] == 'end':
+            break
+        print(
+            f"[{event['symbol']}] {event['type'].upper():5} {event['timestamp']} "
+            f"| Giá: ${event['price']:.2f} | RSI: {event['rsi']:.2f}"
+        )
+
+
+async def main():
+    config = StrategyConfig(config_path="configs/default_config.json")
+    data_file = config.get("data.data_file", "data/raw/xauusd_h1.csv")
+
+    portfolio_cfg = config.get("portfolio", {}) or {}
+    engine = StreamingEngine(
+        config=config,
+        strategy=DCAStrategy(config),
+        portfolio=Portfolio(
+            initial_capital=portfolio_cfg.get("initial_capital", 10000),
+            pnl_calculator=PnLCalculator.from_config(config),
+        ),
+        symbol="XAUUSD",
+    )
+
+    # speed=36000: 1 nến H1 mỗi 0.1 giây
+    feed = CSVReplayFeed(data_file, speed=36000)
+    printer = asyncio.create_task(print_events(engine.subscribe()))
+    results = await engine.run(feed)
+    await printer
+
+    print(f"\n✅ Replay xong: {results['total_entries']} entries, P&L ${results['total_pnl']:,.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -15,6 +15,7 @@ from src.utils.data_loader import DataLoader
 from src.strategy.dca_strategy import DCAStrategy
 from src.backtest.portfolio import Portfolio
 from src.backtest.engine import BacktestEngine
+from src.utils.calculator import PnLCalculator
 
 
 def main():
@@ -70,7 +71,8 @@ def main():
     portfolio_config = config.get("portfolio", {}) if config else {}
 
     initial_capital = portfolio_config.get("initial_capital", 10000)
-    portfolio = Portfolio(initial_capital=initial_capital)
+    pnl_calculator = PnLCalculator.from_config(config) if config else None
+    portfolio = Portfolio(initial_capital=initial_capital, pnl_calculator=pnl_calculator)
     print(f"✅ Portfolio initialized (Capital: ${initial_capital:,.2f})")
 
     # ✅ IMPORTANT FIX: pass ROOT config to strategy
@@ -1,9 +1,11 @@
 """
 Script khởi động web application
 """
-import uvicorn
 
 if __name__ == "__main__":
+    # Import trong __main__: worker process (spawn) import lại file này và không cần uvicorn
+    import uvicorn
+    
     print("🚀 Đang khởi động Backtest XAUUSD Web App...")
     print("📂 Truy cập: http://localhost:8000")
     print("⏹️  Nhấn Ctrl+C để dừng server\n")
@@ -0,0 +1,100 @@
+"""
+Đo thời gian khởi động: import main.py, import web_app (run_web.py), và
+spawn một worker của process pool tối ưu
+
+Mỗi phép đo chạy trong interpreter mới (giống lúc khởi động thật), in ra
+median của nhiều lần chạy và các thư viện nặng đã bị import.
+
+Cách chạy (từ thư mục gốc của project):
+    python scripts/benchmark_startup.py
+    python scripts/benchmark_startup.py --repeat 10
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Thư viện tùy chọn chỉ nên được import khi thật sự dùng
+HEAVY_MODULES = ("matplotlib", "mplfinance", "yfinance", "oandapyV20", "uvicorn")
+
+# Code chạy trong interpreter mới: import module, in thời gian + thư viện nặng đã load
+_IMPORT_PROBE = """
+import sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(elapsed)
+print(",".join(m for m in {heavy!r} if m in sys.modules) or "-")
+"""
+
+
+def _import_probe(module: str):
+    """Import `module` trong interpreter mới. Returns (seconds, heavy modules, wall seconds)."""
+    code = _IMPORT_PROBE.format(root=str(ROOT), module=module, heavy=HEAVY_MODULES)
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stdout.strip().splitlines()
+    wall = time.perf_counter() - started
+    return float(output[-2]), [m for m in output[-1].split(",") if m != "-"], wall
+
+
+def _worker_probe():
+    """Chạy trong worker: import những gì job backtest cần."""
+    import src.utils.backtest_utils  # noqa: F401
+    return [m for m in HEAVY_MODULES if m in sys.modules]
+
+
+def _worker_startup():
+    """Thời gian từ lúc tạo pool (spawn) đến khi worker đầu tiên trả kết quả."""
+    sys.path.insert(0, str(ROOT))
+    from src.utils.job_manager import JobManager
+
+    manager = JobManager(max_workers=1)
+    started = time.perf_counter()
+    try:
+        heavy = manager.warm_up(_worker_probe)[0].result()
+        return time.perf_counter() - started, heavy
+    finally:
+        manager.shutdown()
+
+
+def _report(name: str, samples, heavy):
+    median = statistics.median(samples)
+    print(f"{name:<28} median {median * 1000:8.1f} ms   (min {min(samples) * 1000:.1f} ms, n={len(samples)})")
+    print(f"{'':<28} heavy modules: {', '.join(heavy) if heavy else 'none'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark startup time")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement (default: 5)")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("⏱️  Startup benchmark")
+    print("=" * 70)
+
+    for name, module in (("main.py (import main)", "main"), ("run_web.py (import web_app)", "web_app")):
+        imports, walls, heavy = [], [], []
+        for _ in range(args.repeat):
+            seconds, heavy, wall = _import_probe(module)
+            imports.append(seconds)
+            walls.append(wall)
+        _report(name, imports, heavy)
+        print(f"{'':<28} process wall median {statistics.median(walls) * 1000:.1f} ms")
+
+    samples, heavy = [], []
+    for _ in range(args.repeat):
+        seconds, heavy = _worker_startup()
+        samples.append(seconds)
+    _report("optimizer pool worker", samples, heavy)
+
+
+if __name__ == "__main__":
+    main()
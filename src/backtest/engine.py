@@ -2,9 +2,11 @@
 Backtest Engine - Main engine for running backtests
 """
 
-import pandas as pd
 import numpy as np
+import pandas as pd
+from src.config.strategy_config import compile_config
 from src.strategy.rsi_handler import RSIHandler
+from src.utils.calculator import MetricsCalculator, PnLCalculator
 
 
 class BacktestEngine:
@@ -12,6 +14,11 @@ class BacktestEngine:
     Main backtest engine.
 
     Processes historical data and executes strategy logic.
+
+    Data, RSI columns and per-bar buffers (equity, open positions) are
+    prepared once per engine: reconfigure() swaps the strategy parameters
+    and run() can be called repeatedly (e.g. an optimizer sweep) without
+    copying data, recomputing RSI or allocating bar-sized arrays.
     """
 
     def __init__(self, config, data, strategy, portfolio):
@@ -19,211 +26,361 @@ class BacktestEngine:
         Initialize backtest engine.
 
         Args:
-            config: Configuration dict or StrategyConfig instance
+            config: Configuration dict, StrategyConfig or StrategySettings instance
             data: Historical price data (DataFrame with OHLCV)
             strategy: Strategy instance (DCAStrategy)
             portfolio: Portfolio manager instance
         """
         self.config = config
+        self.settings = compile_config(config)
         self.data = data.copy()
         self.strategy = strategy
         self.portfolio = portfolio
         self.results = []
-
-        # Get RSI period from config
-        rsi_period = (
-            config.get("strategy.rsi_period", 14)
-            if hasattr(config, "get")
-            else config.get("strategy", {}).get("rsi_period", 14)
-        )
+        # Log chi tiết từng entry/exit ra console (tắt khi chạy streaming/tối ưu)
+        self.verbose = True
 
         # Mặc định TẮT debug để tránh log quá nhiều (rất chậm với ~500k nến)
         # Chỉ bật khi cần phân tích chi tiết:
         #   rsi_debug = config.get("debug.rsi", False)
         #   self.rsi_handler = RSIHandler(period=rsi_period, debug=rsi_debug)
-        self.rsi_handler = RSIHandler(period=rsi_period, debug=False)
+        self.rsi_handler = RSIHandler(period=self.settings.rsi_period, debug=False)
 
-        # Calculate RSI
+        # Calculate RSI + mảng cột dùng trong vòng lặp
         self._calculate_rsi()
 
+        # Buffer theo nến, cấp phát một lần và dùng lại ở mỗi run()
+        total_bars = len(self.data)
+        self._equity = np.empty(total_bars, dtype=np.float64)
+        self._equity_open = np.empty(total_bars, dtype=np.int32)
+        self._equity_pos = np.empty(total_bars, dtype=np.int64)
+        self._equity_count = 0
+        self._bar = 0
+
         # Track events
         self.events = []          # List of entry/exit/break events
-        self.equity_curve = []    # Track equity over time
 
     def _calculate_rsi(self):
-        """Calculate RSI for all data."""
+        """Calculate RSI for all data (skipped if data already has RSI for this period)."""
         if 'close' not in self.data.columns:
             raise ValueError("Data must contain 'close' column")
 
-        self.data['rsi'] = self.rsi_handler.calculate_rsi(self.data['close'])
-        self.data['rsi_open'] = self.rsi_handler.calculate_rsi(self.data['open'])
+        self.rsi_handler.add_rsi_columns(self.data)
 
-    def run(self):
+        self._close = self.data['close'].to_numpy(dtype=np.float64)
+        self._rsi = self.data['rsi'].to_numpy(dtype=np.float64)
+        self._rsi_open = self.data['rsi_open'].to_numpy(dtype=np.float64)
+        # High/low cho MAE/MFE của bảng chu kỳ (dùng close nếu data không có cột này)
+        self._high = self.data['high'].to_numpy(dtype=np.float64) if 'high' in self.data.columns else self._close
+        self._low = self.data['low'].to_numpy(dtype=np.float64) if 'low' in self.data.columns else self._close
+        self._timestamps = list(self.data.index)
+        # int64 ns của index (cho metrics theo thời gian), None nếu index không phải thời gian
+        index = self.data.index
+        self._times_ns = index.as_unit('ns').asi8 if isinstance(index, pd.DatetimeIndex) else None
+
+    def reconfigure(self, config, strategy=None, portfolio=None):
+        """
+        Đổi cấu hình chiến lược cho lần run() tiếp theo, giữ nguyên data/RSI/buffer.
+
+        RSI chỉ được tính lại nếu config đổi rsi_period. Kết quả của lần chạy
+        trước (events, equity) bị thay thế ở run() kế tiếp.
+
+        Args:
+            config: Configuration dict, StrategyConfig or StrategySettings instance
+            strategy: Strategy instance (default: same strategy class built from config)
+            portfolio: Portfolio instance (default: same class, capital and trading costs from config)
+
+        Returns:
+            BacktestEngine: self
+        """
+        settings = self._apply_config(config, strategy, portfolio)
+
+        rsi_period = settings.rsi_period
+        if rsi_period != self.rsi_handler.period:
+            self.rsi_handler = RSIHandler(period=rsi_period, debug=False)
+            self._calculate_rsi()
+        return self
+
+    def _apply_config(self, config, strategy=None, portfolio=None):
+        """Compile config, dựng lại strategy/portfolio (dùng chung với StreamingEngine.reconfigure)."""
+        self.config = config
+        self.settings = settings = compile_config(config)
+        self.strategy = strategy if strategy is not None else type(self.strategy)(settings)
+        if portfolio is None:
+            portfolio = type(self.portfolio)(
+                settings.initial_capital, pnl_calculator=PnLCalculator.from_config(settings),
+            )
+        self.portfolio = portfolio
+        return settings
+
+    @property
+    def equity_values(self):
+        """Equity sau mỗi nến đã xử lý của lần run() gần nhất (view vào buffer, copy nếu cần giữ)."""
+        return self._equity[:self._equity_count]
+
+    @property
+    def equity_index(self):
+        """Timestamp tương ứng với equity_values."""
+        return self.data.index[self._equity_pos[:self._equity_count]]
+
+    @property
+    def bar_high(self):
+        """High của mỗi nến theo vị trí (cùng chỉ số với entry_bar/exit_bar của lệnh)."""
+        return self._high
+
+    @property
+    def bar_low(self):
+        """Low của mỗi nến theo vị trí."""
+        return self._low
+
+    @property
+    def equity_open(self):
+        """Số lệnh đang mở sau mỗi nến, cùng độ dài với equity_values."""
+        return self._equity_open[:self._equity_count]
+
+    @property
+    def equity_times(self):
+        """Timestamp int64 ns tương ứng với equity_values (None nếu data không có DatetimeIndex)."""
+        if self._times_ns is None:
+            return None
+        return self._times_ns[self._equity_pos[:self._equity_count]]
+
+    @property
+    def equity_curve(self):
+        """Equity dạng list dict {'timestamp', 'equity', 'open_positions'} (dựng từ buffer khi được gọi)."""
+        count = self._equity_count
+        return [
+            {'timestamp': self._timestamps[pos], 'equity': float(equity), 'open_positions': int(open_count)}
+            for pos, equity, open_count in zip(
+                self._equity_pos[:count].tolist(), self._equity[:count], self._equity_open[:count].tolist(),
+            )
+        ]
+
+    def run(self, progress_callback=None, progress_every=10000, summary_only=False):
         """
         Run backtest on historical data.
 
+        Args:
+            progress_callback: Optional callable(bars_done=..., total_bars=...),
+                gọi mỗi `progress_every` nến (dùng cho job queue/progress)
+            progress_every: Number of bars between progress callbacks
+            summary_only: Chỉ trả về các chỉ số tổng hợp, bỏ equity_curve,
+                equity_values và cycle_table (không cấp phát theo số nến; dùng
+                khi tối ưu, đọc lại qua engine.equity_values / cycle_table() nếu cần)
+
         Returns:
             dict: Backtest results
         """
+        self._run_bars(progress_callback, progress_every)
+
+        # Close remaining positions at end of data
+        if self.portfolio.open_count:
+            last_price = self.data.iloc[-1]['close']
+            last_timestamp = self.data.index[-1]
+            self.portfolio.close_all_positions(last_price, last_timestamp, bar_index=len(self.data) - 1)
+            self.events.append({
+                'type': 'exit',
+                'timestamp': last_timestamp,
+                'price': last_price,
+                'rsi': self.data.iloc[-1]['rsi'],
+                'entry_count': self.strategy.current_entry,
+                'reason': 'end_of_data'
+            })
+
+        return self._calculate_results(summary_only)
+
+    def _run_bars(self, progress_callback=None, progress_every=10000):
+        """
+        Reset strategy/portfolio/events rồi xử lý mọi nến của data.
+
+        Lệnh còn mở ở nến cuối được giữ nguyên (run() đóng chúng, còn
+        StreamingEngine.warm_up tiếp tục từ trạng thái này).
+        """
         # Reset strategy, portfolio, and events
         self.strategy.reset()
-        self.portfolio = type(self.portfolio)(self.portfolio.initial_capital)
+        self.portfolio.reset()
         self.events = []  # Reset events để tránh tích lũy khi chạy nhiều lần
+        self._equity_count = 0
 
-        # Get config values
-        use_open_for_exit = (
-            self.config.get("strategy.rsi_exit.use_open", True)
-            if hasattr(self.config, "get")
-            else self.config.get("strategy", {}).get("rsi_exit", {}).get("use_open", True)
-        )
+        use_open_for_exit = self.settings.rsi_exit_use_open
+
+        # Main backtest loop (duyệt mảng cột đã chuẩn bị sẵn, không tạo Series mỗi nến)
+        total_bars = len(self.data)
+        close, rsi, rsi_open, timestamps = self._close, self._rsi, self._rsi_open, self._timestamps
+        for idx in range(total_bars):
+            if progress_callback is not None and idx % progress_every == 0:
+                progress_callback(bars_done=idx, total_bars=total_bars)
 
-        # Main backtest loop
-        for idx, (timestamp, row) in enumerate(self.data.iterrows()):
+            rsi_close = rsi[idx]
             # Skip if RSI not calculated yet
-            if pd.isna(row['rsi']):
+            if rsi_close != rsi_close:
                 continue
 
-            rsi_close = row['rsi']
-            rsi_open = row.get('rsi_open', rsi_close)
-            current_price = row['close']
-
-            # ===== EXIT CHECK =====
-            # EXIT check phải trước BREAK để ưu tiên chốt lệnh khi RSI ≈ 50
-            rsi_for_exit = rsi_open if use_open_for_exit else rsi_close
-            if self.strategy.should_exit(rsi_for_exit):
-                print(f"🚪 EXIT tại Entry #{self.strategy.current_entry}: RSI={rsi_for_exit:.2f} ≈ {self.strategy.rsi_exit_threshold} | Giá: ${current_price:.2f}")
-                if self.portfolio.open_positions:
-                    self.portfolio.close_all_positions(current_price, timestamp)
-                    print(f"   ✅ Đã đóng tất cả lệnh, reset strategy, bắt đầu chu kỳ mới")
-                self.events.append({
-                    'type': 'exit',
-                    'timestamp': timestamp,
-                    'price': current_price,
-                    'rsi': rsi_for_exit,
-                    'entry_count': self.strategy.current_entry,
-                    'was_break': self.strategy.is_break  # Ghi nhận nếu exit sau break
-                })
-                self.strategy.reset()
-
-            # ===== BREAK CHECK =====
-            # Break check phải trước ENTRY để block entry ngay khi break
-            if self.strategy.check_break(rsi_close):
-                break_threshold = self.strategy.rsi_break_sell if self.strategy.direction == "SELL" else self.strategy.rsi_break_buy
-                min_entries = self.strategy.min_entries_before_break
-                trade_start_entry = self.strategy.entry_trade[0]
-                print(f"🛑 BREAK tại Entry #{self.strategy.current_entry}: RSI={rsi_close:.2f} | Ngưỡng break: {break_threshold} | Giá: ${current_price:.2f}")
-                print(f"   ⚠️ Không vào lệnh tiếp, chờ EXIT để chốt lệnh...")
-                if self.strategy.current_entry < trade_start_entry:
-                    print(f"   ⚠️ Break xảy ra sớm (Entry #{self.strategy.current_entry} < {trade_start_entry}) - không thể đạt Entry #{trade_start_entry} để vào lệnh thực tế!")
-                else:
-                    print(f"   ✅ Break xảy ra sau Entry #{self.strategy.current_entry} (đã cho phép vào lệnh từ Entry #{trade_start_entry})")
-                self.events.append({
-                    'type': 'break',
-                    'timestamp': timestamp,
-                    'price': current_price,
-                    'rsi': rsi_close,
-                    'entry_count': self.strategy.current_entry,
-                    'direction': self.strategy.direction
-                })
-                # KHÔNG reset ngay - chờ EXIT để chốt lệnh và reset
-
-            # ===== ENTRY CHECK =====
-            should_enter, should_trade, direction = self.strategy.should_enter(rsi_close)
-            
-            # Debug: Log khi không thể enter (rhythm requirement)
-            if not should_enter and self.strategy.direction is not None:
-                # Chỉ log khi đã có direction (không log khi chưa chọn hướng)
-                if self.strategy.waiting_for_rhythm and not self.strategy.has_rhythm:
-                    if self.strategy.current_entry <= 9:  # Chỉ log cho entry 1-9 để không spam
-                        print(f"⏸️  Entry #{self.strategy.current_entry} chờ rhythm: RSI={rsi_close:.2f} | "
+            self._bar = idx
+            self._process_bar(timestamps[idx], close[idx], rsi_close, rsi_open[idx], use_open_for_exit)
+
+    def _log(self, message: str):
+        """Internal logger (prints only when verbose=True)."""
+        if self.verbose:
+            print(message)
+
+    def _process_bar(self, timestamp, current_price, rsi_close, rsi_open, use_open_for_exit):
+        """
+        Apply EXIT -> BREAK -> ENTRY checks and equity tracking for one bar.
+
+        Shared by the batch loop in run() and by StreamingEngine, so both
+        produce identical events for the same bars.
+
+        Args:
+            timestamp: Bar timestamp
+            current_price: Close price of the bar
+            rsi_close: RSI computed on close prices
+            rsi_open: RSI computed on open prices
+            use_open_for_exit: Use rsi_open instead of rsi_close for EXIT check
+        """
+        # ===== EXIT CHECK =====
+        # EXIT check phải trước BREAK để ưu tiên chốt lệnh khi RSI ≈ 50
+        rsi_for_exit = rsi_open if use_open_for_exit else rsi_close
+        if self.strategy.should_exit(rsi_for_exit):
+            self._log(f"🚪 EXIT tại Entry #{self.strategy.current_entry}: RSI={rsi_for_exit:.2f} ≈ {self.strategy.rsi_exit_threshold} | Giá: ${current_price:.2f}")
+            if self.portfolio.open_count:
+                self.portfolio.close_all_positions(current_price, timestamp, bar_index=self._bar)
+                self._log(f"   ✅ Đã đóng tất cả lệnh, reset strategy, bắt đầu chu kỳ mới")
+            self.events.append({
+                'type': 'exit',
+                'timestamp': timestamp,
+                'price': current_price,
+                'rsi': rsi_for_exit,
+                'entry_count': self.strategy.current_entry,
+                'was_break': self.strategy.is_break  # Ghi nhận nếu exit sau break
+            })
+            self.strategy.reset()
+
+        # ===== BREAK CHECK =====
+        # Break check phải trước ENTRY để block entry ngay khi break
+        if self.strategy.check_break(rsi_close):
+            break_threshold = self.strategy.rsi_break_sell if self.strategy.direction == "SELL" else self.strategy.rsi_break_buy
+            min_entries = self.strategy.min_entries_before_break
+            trade_start_entry = self.strategy.entry_trade[0]
+            self._log(f"🛑 BREAK tại Entry #{self.strategy.current_entry}: RSI={rsi_close:.2f} | Ngưỡng break: {break_threshold} | Giá: ${current_price:.2f}")
+            self._log(f"   ⚠️ Không vào lệnh tiếp, chờ EXIT để chốt lệnh...")
+            if self.strategy.current_entry < trade_start_entry:
+                self._log(f"   ⚠️ Break xảy ra sớm (Entry #{self.strategy.current_entry} < {trade_start_entry}) - không thể đạt Entry #{trade_start_entry} để vào lệnh thực tế!")
+            else:
+                self._log(f"   ✅ Break xảy ra sau Entry #{self.strategy.current_entry} (đã cho phép vào lệnh từ Entry #{trade_start_entry})")
+            self.events.append({
+                'type': 'break',
+                'timestamp': timestamp,
+                'price': current_price,
+                'rsi': rsi_close,
+                'entry_count': self.strategy.current_entry,
+                'direction': self.strategy.direction
+            })
+            # KHÔNG reset ngay - chờ EXIT để chốt lệnh và reset
+
+        # ===== ENTRY CHECK =====
+        should_enter, should_trade, direction = self.strategy.should_enter(rsi_close)
+        
+        # Debug: Log khi không thể enter (rhythm requirement)
+        if not should_enter and self.strategy.direction is not None:
+            # Chỉ log khi đã có direction (không log khi chưa chọn hướng)
+            if self.strategy.waiting_for_rhythm and not self.strategy.has_rhythm:
+                if self.strategy.current_entry <= 9:  # Chỉ log cho entry 1-9 để không spam
+                    self._log(f"⏸️  Entry #{self.strategy.current_entry} chờ rhythm: RSI={rsi_close:.2f} | "
                               f"Cần RSI {'<' if direction == 'SELL' else '>'} {self.strategy.rsi_entry_sell if direction == 'SELL' else self.strategy.rsi_entry_buy}")
 
-            if should_enter:
-                entry_number = self.strategy.current_entry
-                
-                # Lấy ngưỡng RSI tương ứng với direction
-                rsi_threshold = None
+        if should_enter:
+            entry_number = self.strategy.current_entry
+            
+            # Lấy ngưỡng RSI tương ứng với direction
+            rsi_threshold = None
+            if direction == "BUY":
+                rsi_threshold = self.strategy.rsi_entry_buy
+            elif direction == "SELL":
+                rsi_threshold = self.strategy.rsi_entry_sell
+
+            # Log khi quyết định hướng lần đầu (Entry #1)
+            is_first_entry = (entry_number == 1)
+            if is_first_entry:
+                self._log(f"\n{'='*60}")
+                self._log(f"🎯 QUYẾT ĐỊNH HƯỚNG LỆNH:")
+                self._log(f"   Thời gian: {timestamp}")
+                self._log(f"   Giá: ${current_price:.2f}")
+                self._log(f"   RSI: {rsi_close:.2f}")
                 if direction == "BUY":
-                    rsi_threshold = self.strategy.rsi_entry_buy
+                    self._log(f"   ✅ CHỌN HƯỚNG: 🟢 BUY (LỆNH MUA)")
+                    self._log(f"   Lý do: RSI ({rsi_close:.2f}) <= ngưỡng BUY ({rsi_threshold})")
                 elif direction == "SELL":
-                    rsi_threshold = self.strategy.rsi_entry_sell
-
-                # Log khi quyết định hướng lần đầu (Entry #1)
-                is_first_entry = (entry_number == 1)
-                if is_first_entry:
-                    print(f"\n{'='*60}")
-                    print(f"🎯 QUYẾT ĐỊNH HƯỚNG LỆNH:")
-                    print(f"   Thời gian: {timestamp}")
-                    print(f"   Giá: ${current_price:.2f}")
-                    print(f"   RSI: {rsi_close:.2f}")
-                    if direction == "BUY":
-                        print(f"   ✅ CHỌN HƯỚNG: 🟢 BUY (LỆNH MUA)")
-                        print(f"   Lý do: RSI ({rsi_close:.2f}) <= ngưỡng BUY ({rsi_threshold})")
-                    elif direction == "SELL":
-                        print(f"   ✅ CHỌN HƯỚNG: 🔴 SELL (LỆNH BÁN)")
-                        print(f"   Lý do: RSI ({rsi_close:.2f}) >= ngưỡng SELL ({rsi_threshold})")
-                    print(f"{'='*60}\n")
-
-                self.events.append({
-                    'type': 'entry',
-                    'timestamp': timestamp,
-                    'price': current_price,
-                    'rsi': rsi_close,
-                    'entry_number': entry_number,
-                    'direction': direction,
-                    'should_trade': should_trade,
-                    'rsi_threshold': rsi_threshold,  # Thêm thông tin ngưỡng vào event
-                    'is_first_entry': is_first_entry  # Đánh dấu entry đầu tiên
-                })
-
-                # Log tất cả entries để debug
-                if entry_number <= 9:
-                    print(f"📊 Entry #{entry_number}: {direction} | Giá: ${current_price:.2f} | RSI: {rsi_close:.2f} | (Chỉ đếm, không vào lệnh)")
-                elif entry_number >= 10 and entry_number <= 40:
-                    print(f"📈 Entry #{entry_number}: {direction} | Giá: ${current_price:.2f} | RSI: {rsi_close:.2f} | should_trade={should_trade}")
-
-                if should_trade:
-                    lot_size = self.strategy.get_lot_size(entry_number)
-                    if lot_size > 0:
-                        # Log khi thực sự vào lệnh
-                        print(f"💰 VÀO LỆNH #{entry_number}: {direction} | Giá: ${current_price:.2f} | Lot: {lot_size} | RSI: {rsi_close:.2f}")
-                        self.portfolio.open_position(
-                            entry_number=entry_number,
-                            direction=direction,
-                            price=current_price,
-                            lot_size=lot_size,
-                            timestamp=timestamp
-                        )
-                    else:
-                        # Debug: Tại sao lot_size = 0?
-                        print(f"⚠️ Entry #{entry_number} should_trade=True nhưng lot_size=0 (kiểm tra config lot_sizes.entry_{entry_number})")
-
-            # ===== EQUITY TRACKING =====
-            equity = self.portfolio.get_current_equity(current_price)
-            self.equity_curve.append({
-                'timestamp': timestamp,
-                'equity': equity,
-                'open_positions': len(self.portfolio.open_positions)
-            })
+                    self._log(f"   ✅ CHỌN HƯỚNG: 🔴 SELL (LỆNH BÁN)")
+                    self._log(f"   Lý do: RSI ({rsi_close:.2f}) >= ngưỡng SELL ({rsi_threshold})")
+                self._log(f"{'='*60}\n")
 
-        # Close remaining positions at end of data
-        if self.portfolio.open_positions:
-            last_price = self.data.iloc[-1]['close']
-            last_timestamp = self.data.index[-1]
-            self.portfolio.close_all_positions(last_price, last_timestamp)
             self.events.append({
-                'type': 'exit',
-                'timestamp': last_timestamp,
-                'price': last_price,
-                'rsi': self.data.iloc[-1]['rsi'],
-                'entry_count': self.strategy.current_entry,
-                'reason': 'end_of_data'
+                'type': 'entry',
+                'timestamp': timestamp,
+                'price': current_price,
+                'rsi': rsi_close,
+                'entry_number': entry_number,
+                'direction': direction,
+                'should_trade': should_trade,
+                'rsi_threshold': rsi_threshold,  # Thêm thông tin ngưỡng vào event
+                'is_first_entry': is_first_entry  # Đánh dấu entry đầu tiên
             })
 
-        return self._calculate_results()
+            # Log tất cả entries để debug
+            if entry_number <= 9:
+                self._log(f"📊 Entry #{entry_number}: {direction} | Giá: ${current_price:.2f} | RSI: {rsi_close:.2f} | (Chỉ đếm, không vào lệnh)")
+            elif entry_number >= 10 and entry_number <= 40:
+                self._log(f"📈 Entry #{entry_number}: {direction} | Giá: ${current_price:.2f} | RSI: {rsi_close:.2f} | should_trade={should_trade}")
+
+            if should_trade:
+                lot_size = self.strategy.get_lot_size(entry_number)
+                if lot_size > 0:
+                    # Log khi thực sự vào lệnh
+                    self._log(f"💰 VÀO LỆNH #{entry_number}: {direction} | Giá: ${current_price:.2f} | Lot: {lot_size} | RSI: {rsi_close:.2f}")
+                    self.portfolio.open_position(
+                        entry_number=entry_number,
+                        direction=direction,
+                        price=current_price,
+                        lot_size=lot_size,
+                        timestamp=timestamp,
+                        bar_index=self._bar,
+                    )
+                else:
+                    # Debug: Tại sao lot_size = 0?
+                    self._log(f"⚠️ Entry #{entry_number} should_trade=True nhưng lot_size=0 (kiểm tra config lot_sizes.entry_{entry_number})")
+
+        # ===== EQUITY TRACKING =====
+        self._track_equity(timestamp, self.portfolio.get_current_equity(current_price))
+
+    def _track_equity(self, timestamp, equity):
+        """Ghi equity của nến đang xử lý (self._bar) vào buffer."""
+        count = self._equity_count
+        self._equity[count] = equity
+        self._equity_open[count] = self.portfolio.open_count
+        self._equity_pos[count] = self._bar
+        self._equity_count = count + 1
+
+    def cycle_table(self):
+        """
+        Bảng chu kỳ DCA của lần run() gần nhất (MetricsCalculator.cycle_table).
+
+        Returns:
+            dict: numpy columns (cycle, direction, entry/exit time and bar, bars_held,
+            positions, depth, lots, avg_entry_price, exit_price, pnl, mae, mfe)
+        """
+        return MetricsCalculator.cycle_table(
+            self.portfolio.book, self.bar_high, self.bar_low, self.portfolio.pnl_calculator,
+        )
 
-    def _calculate_results(self):
-        """Calculate backtest results."""
+    def _calculate_results(self, summary_only=False):
+        """
+        Calculate backtest results.
+
+        Args:
+            summary_only: Bỏ các kết quả theo từng nến/chu kỳ (equity_curve,
+                equity_values, cycle_table)
+        """
         entry_events = [e for e in self.events if e['type'] == 'entry']
         total_entries = len(entry_events)
         trade_entries = [e for e in entry_events if e.get('should_trade', False)]
@@ -237,25 +394,21 @@ class BacktestEngine:
 
         total_pnl = self.portfolio.get_total_pnl()
 
-        closed_positions = [p for p in self.portfolio.positions if p.exit_price is not None]
-        if closed_positions:
-            winning_trades = sum(1 for p in closed_positions if p.pnl > 0)
-            win_rate = (winning_trades / len(closed_positions)) * 100
+        book = self.portfolio.book
+        closed_pnl = book.pnl[book.closed_mask()]
+        if len(closed_pnl):
+            win_rate = (int(np.count_nonzero(closed_pnl > 0)) / len(closed_pnl)) * 100
         else:
             win_rate = 0.0
 
-        if self.equity_curve:
-            equity_values = [e['equity'] for e in self.equity_curve]
-            peak = equity_values[0]
-            max_drawdown = 0.0
-
-            for equity in equity_values:
-                if equity > peak:
-                    peak = equity
-                drawdown = ((peak - equity) / peak) * 100 if peak > 0 else 0
-                max_drawdown = max(max_drawdown, drawdown)
-        else:
-            max_drawdown = 0.0
+        metrics = MetricsCalculator.calculate_metrics(
+            self.equity_values,
+            open_counts=self.equity_open,
+            times=self.equity_times,
+            book=book,
+            initial_capital=self.portfolio.initial_capital,
+        )
+        max_drawdown = metrics["max_drawdown"]
 
         final_equity = self.portfolio.get_current_equity()
         total_return = (
@@ -263,7 +416,7 @@ class BacktestEngine:
             / self.portfolio.initial_capital
         ) * 100
 
-        return {
+        results = {
             "total_entries": total_entries,
             "total_trades": total_trades,
             "total_pnl": total_pnl,
@@ -273,14 +426,22 @@ class BacktestEngine:
             "final_equity": final_equity,
             "total_return": total_return,
             "total_cycles": len([e for e in self.events if e['type'] == 'exit']),
+            # Drawdown, Sharpe/Sortino, profit factor, chu kỳ, exposure (MetricsCalculator)
+            "metrics": metrics,
             "events": self.events,
-            "equity_curve": self.equity_curve,
             # Thống kê BUY/SELL
             "buy_entries": len(buy_entries),
             "sell_entries": len(sell_entries),
             "buy_trades": len(buy_trades),
             "sell_trades": len(sell_trades)
         }
+        if not summary_only:
+            # Một dòng cho mỗi chu kỳ: độ sâu, số nến giữ lệnh, MAE/MFE (cột numpy)
+            results["cycle_table"] = self.cycle_table()
+            results["equity_curve"] = self.equity_curve
+            # Cùng equity dạng mảng float64 (bản copy, không bị ghi đè ở lần run() sau)
+            results["equity_values"] = self.equity_values.copy()
+        return results
 
     def generate_report(self):
         """Generate backtest report."""
@@ -297,6 +458,8 @@ class BacktestEngine:
                 "initial_capital": results["initial_capital"],
                 "final_equity": results["final_equity"]
             },
+            "metrics": results["metrics"],
             "events": results["events"],
-            "equity_curve": results["equity_curve"]
+            "equity_curve": results["equity_curve"],
+            "equity_values": results["equity_values"]
         }
@@ -2,149 +2,370 @@
 Portfolio Manager - Track positions, P&L, and risk
 """
 
+import numpy as np
+import pandas as pd
 
-class Position:
-    """Represents a single trading position."""
-    
-    def __init__(self, entry_number, direction, price, lot_size, timestamp):
+from src.utils.calculator import DIRECTION_CODES, PnLCalculator
+
+
+# Mã hướng lệnh trong PositionBook
+DIRECTION_NAMES = {1: "BUY", -1: "SELL"}
+
+# Timestamp rỗng (lệnh chưa đóng) trong mảng int64 nanoseconds
+_NAT = np.iinfo(np.int64).min
+
+
+# Cost model mặc định: không spread/slippage/commission
+_NO_COSTS = PnLCalculator(spread_pips=0, slippage_pips=0, commission_per_lot=0)
+
+
+class PositionBook:
+    """
+    Sổ lệnh dạng cột: mỗi lệnh là một dòng trong các mảng NumPy tự giãn.
+
+    Cột: entry_number, direction (1 BUY / -1 SELL / 0), entry_price,
+    exit_price (NaN khi đang mở), lot_size, entry_bar / exit_bar (vị trí
+    nến, -1 nếu không có), entry_time / exit_time (int64 ns) và pnl.
+    Lệnh được thêm theo thứ tự thời gian và đóng theo cả cụm (DCA), nên các
+    lệnh đang mở luôn là các dòng cuối: [open_start, len).
+    """
+
+    COLUMNS = {
+        "entry_number": np.int32,
+        "direction": np.int8,
+        "entry_price": np.float64,
+        "exit_price": np.float64,
+        "lot_size": np.float64,
+        "entry_bar": np.int64,
+        "exit_bar": np.int64,
+        "entry_time": np.int64,
+        "exit_time": np.int64,
+        "pnl": np.float64,
+    }
+
+    def __init__(self, capacity: int = 256):
         """
-        Initialize position.
-        
+        Initialize an empty book.
+
         Args:
-            entry_number: Entry number (10-40)
-            direction: "BUY" or "SELL"
-            price: Entry price
-            lot_size: Lot size
-            timestamp: Entry timestamp
+            capacity: Initial number of rows (doubles when full)
+        """
+        self._arrays = {name: np.empty(max(int(capacity), 1), dtype=dtype) for name, dtype in self.COLUMNS.items()}
+        self.size = 0
+        self.open_start = 0
+        # Timezone của timestamp (None = naive), dùng khi đổi ngược int64 -> Timestamp
+        self.tz = None
+
+    def __len__(self):
+        return self.size
+
+    def __getattr__(self, name):
+        # Cột đã cắt theo số dòng (view, không copy): book.pnl, book.entry_price, ...
+        arrays = self.__dict__.get("_arrays")
+        if arrays is not None and name in arrays:
+            return arrays[name][:self.size]
+        raise AttributeError(name)
+
+    def _grow(self):
+        capacity = len(self._arrays["pnl"]) * 2
+        for name, array in self._arrays.items():
+            grown = np.empty(capacity, dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            self._arrays[name] = grown
+
+    def _time_value(self, timestamp) -> int:
+        if timestamp is None:
+            return _NAT
+        timestamp = pd.Timestamp(timestamp)
+        if timestamp is pd.NaT:
+            return _NAT
+        if self.tz is None and timestamp.tz is not None:
+            self.tz = timestamp.tz
+        return timestamp.value
+
+    def timestamp(self, value: int):
+        """int64 ns trong sổ -> pd.Timestamp (None nếu rỗng)."""
+        if value == _NAT:
+            return None
+        return pd.Timestamp(value, tz=self.tz) if self.tz is not None else pd.Timestamp(value)
+
+    def append(self, entry_number, direction, price, lot_size, timestamp=None, bar_index=-1) -> int:
+        """
+        Thêm một lệnh đang mở.
+
+        Returns:
+            int: Row index of the new position
         """
-        self.entry_number = entry_number
-        self.direction = direction
-        self.entry_price = price
-        self.lot_size = lot_size
-        self.entry_timestamp = timestamp
-        self.exit_price = None
-        self.exit_timestamp = None
-        self.pnl = 0.0
-    
-    def close(self, exit_price, exit_timestamp):
-        """
-        Close position and calculate P&L.
-        
-        For XAUUSD:
-        - 1 lot = 100 oz (standard contract size)
-        - BUY: P&L = (exit_price - entry_price) * lot_size * 100
-        - SELL: P&L = (entry_price - exit_price) * lot_size * 100
-        
+        if self.size == len(self._arrays["pnl"]):
+            self._grow()
+        i = self.size
+        arrays = self._arrays
+        arrays["entry_number"][i] = entry_number
+        arrays["direction"][i] = DIRECTION_CODES.get(direction, 0)
+        arrays["entry_price"][i] = price
+        arrays["exit_price"][i] = np.nan
+        arrays["lot_size"][i] = lot_size
+        arrays["entry_bar"][i] = bar_index
+        arrays["exit_bar"][i] = -1
+        arrays["entry_time"][i] = self._time_value(timestamp)
+        arrays["exit_time"][i] = _NAT
+        arrays["pnl"][i] = 0.0
+        self.size = i + 1
+        return i
+
+    @property
+    def open_count(self) -> int:
+        """Số lệnh đang mở."""
+        return self.size - self.open_start
+
+    def close_open(self, exit_price, timestamp=None, bar_index=-1, calculator: PnLCalculator = None):
+        """
+        Đóng mọi lệnh đang mở tại cùng giá và tính P&L cho cả cụm.
+
         Args:
             exit_price: Exit price
-            exit_timestamp: Exit timestamp
+            timestamp: Exit timestamp
+            bar_index: Position of the exit bar in the data
+            calculator: PnLCalculator (default: no costs)
+
+        Returns:
+            numpy.ndarray: P&L of the closed rows (view)
+        """
+        start, stop = self.open_start, self.size
+        arrays = self._arrays
+        arrays["exit_price"][start:stop] = exit_price
+        arrays["exit_bar"][start:stop] = bar_index
+        arrays["exit_time"][start:stop] = self._time_value(timestamp)
+        pnl = arrays["pnl"][start:stop]
+        pnl[:] = (calculator or _NO_COSTS).calculate_pnl_batch(
+            arrays["entry_price"][start:stop], exit_price,
+            arrays["lot_size"][start:stop], arrays["direction"][start:stop],
+        )
+        self.open_start = stop
+        return pnl
+
+    def cycle_starts(self) -> np.ndarray:
+        """
+        Dòng đầu của mỗi chu kỳ đã đóng (cụm lệnh đóng cùng nến và thời điểm).
+
+        Returns:
+            numpy.ndarray: Row indexes, dùng với np.add.reduceat(..., starts) trên [0, open_start)
+        """
+        stop = self.open_start
+        if not stop:
+            return np.empty(0, dtype=np.int64)
+        bars = self._arrays["exit_bar"][:stop]
+        times = self._arrays["exit_time"][:stop]
+        change = (bars[1:] != bars[:-1]) | (times[1:] != times[:-1])
+        return np.append(0, np.flatnonzero(change) + 1)
+
+    def clear(self):
+        """Xóa mọi lệnh, giữ nguyên bộ nhớ đã cấp phát."""
+        self.size = 0
+        self.open_start = 0
+        self.tz = None
+
+    def closed_mask(self) -> np.ndarray:
+        """Mask các lệnh đã đóng."""
+        return ~np.isnan(self.exit_price)
+
+    def view(self, index: int) -> "Position":
+        """Position view của một dòng."""
+        return Position(self, index)
+
+    def views(self, start: int = 0, stop=None):
+        """Position view của các dòng [start, stop)."""
+        stop = self.size if stop is None else stop
+        return [Position(self, i) for i in range(start, stop)]
+
+
+class Position:
+    """
+    Represents a single trading position.
+
+    View nhẹ (chỉ giữ book + số dòng) vào PositionBook: dữ liệu nằm trong
+    các mảng của sổ lệnh, không có __dict__ riêng cho mỗi lệnh.
+    """
+
+    __slots__ = ("_book", "_index")
+
+    def __init__(self, book: PositionBook, index: int):
+        """
+        Initialize view.
+
+        Args:
+            book: PositionBook holding the data
+            index: Row index in the book
         """
-        self.exit_price = exit_price
-        self.exit_timestamp = exit_timestamp
-        
-        # Calculate P&L for XAUUSD
-        # Contract size: 1 lot = 100 oz
-        contract_size = 100
-        
-        if self.direction == "BUY":
-            # Profit when exit > entry
-            self.pnl = (exit_price - self.entry_price) * self.lot_size * contract_size
-        elif self.direction == "SELL":
-            # Profit when entry > exit
-            self.pnl = (self.entry_price - exit_price) * self.lot_size * contract_size
-        else:
-            self.pnl = 0.0
+        self._book = book
+        self._index = index
+
+    def _get(self, column):
+        return self._book._arrays[column][self._index]
+
+    @property
+    def entry_number(self):
+        return int(self._get("entry_number"))
+
+    @property
+    def direction(self):
+        return DIRECTION_NAMES.get(int(self._get("direction")))
+
+    @property
+    def entry_price(self):
+        return float(self._get("entry_price"))
+
+    @property
+    def lot_size(self):
+        return float(self._get("lot_size"))
+
+    @property
+    def entry_timestamp(self):
+        return self._book.timestamp(int(self._get("entry_time")))
+
+    @property
+    def entry_bar(self):
+        return int(self._get("entry_bar"))
+
+    @property
+    def exit_price(self):
+        value = self._get("exit_price")
+        return None if value != value else float(value)
+
+    @property
+    def exit_timestamp(self):
+        return self._book.timestamp(int(self._get("exit_time")))
+
+    @property
+    def exit_bar(self):
+        return int(self._get("exit_bar"))
+
+    @property
+    def pnl(self):
+        return float(self._get("pnl"))
+
+    def __repr__(self):
+        return (f"Position(#{self.entry_number} {self.direction} {self.lot_size} @ {self.entry_price}"
+                f" -> {self.exit_price}, pnl={self.pnl:.2f})")
 
 
 class Portfolio:
     """
     Portfolio manager - tracks all positions and calculates P&L.
+
+    Lệnh lưu trong PositionBook; realized P&L và tổng lot (có dấu) của các
+    lệnh đang mở được cộng dồn, nên equity mỗi nến là O(1) thay vì duyệt
+    toàn bộ lệnh. P&L (kể cả spread/slippage/commission) do PnLCalculator
+    tính theo mảng khi đóng cả cụm lệnh.
     """
-    
-    def __init__(self, initial_capital=10000):
+
+    def __init__(self, initial_capital=10000, pnl_calculator: PnLCalculator = None):
         """
         Initialize portfolio.
-        
+
         Args:
             initial_capital: Starting capital
+            pnl_calculator: Cost model (default: no spread/slippage/commission,
+                see PnLCalculator.from_config for the config `trading` section)
         """
         self.initial_capital = initial_capital
-        self.current_capital = initial_capital
-        self.positions = []  # List of Position objects
-        self.open_positions = []  # Currently open positions
-    
-    def open_position(self, entry_number, direction, price, lot_size, timestamp):
+        self.pnl_calculator = pnl_calculator or _NO_COSTS
+        self.book = PositionBook()
+        self.reset()
+
+    def reset(self):
+        """Bỏ mọi lệnh và P&L (giữ vốn, cost model và bộ nhớ của sổ lệnh)."""
+        self.current_capital = self.initial_capital
+        self.book.clear()
+        self.realized_pnl = 0.0
+        # Σ dir*lot, Σ dir*lot*entry_price và Σ lot của lệnh đang mở (unrealized P&L)
+        self._open_lots = 0.0
+        self._open_cost = 0.0
+        self._open_volume = 0.0
+
+    @property
+    def positions(self):
+        """All positions (views, oldest first)."""
+        return self.book.views()
+
+    @property
+    def open_positions(self):
+        """Currently open positions (views)."""
+        return self.book.views(self.book.open_start)
+
+    @property
+    def open_count(self) -> int:
+        """Number of open positions."""
+        return self.book.open_count
+
+    def open_position(self, entry_number, direction, price, lot_size, timestamp, bar_index=-1):
         """
         Open a new position.
-        
+
         Args:
             entry_number: Entry number
             direction: "BUY" or "SELL"
             price: Entry price
             lot_size: Lot size
             timestamp: Entry timestamp
-            
+            bar_index: Position of the entry bar in the data (-1 if unknown)
+
         Returns:
             Position: Created position object
         """
-        position = Position(entry_number, direction, price, lot_size, timestamp)
-        self.open_positions.append(position)
-        self.positions.append(position)
-        return position
-    
-    def close_all_positions(self, exit_price, exit_timestamp):
+        index = self.book.append(entry_number, direction, price, lot_size, timestamp, bar_index)
+        code = DIRECTION_CODES.get(direction, 0)
+        signed_lots = code * lot_size
+        self._open_lots += signed_lots
+        self._open_cost += signed_lots * price
+        if code:
+            self._open_volume += lot_size
+        return Position(self.book, index)
+
+    def close_all_positions(self, exit_price, exit_timestamp, bar_index=-1):
         """
         Close all open positions.
-        
+
         Args:
             exit_price: Exit price
             exit_timestamp: Exit timestamp
+            bar_index: Position of the exit bar in the data (-1 if unknown)
         """
-        for position in self.open_positions:
-            position.close(exit_price, exit_timestamp)
-        self.open_positions = []
-    
+        pnl = self.book.close_open(exit_price, exit_timestamp, bar_index, self.pnl_calculator)
+        # Cộng lần lượt theo thứ tự lệnh (cùng kết quả với cộng từng lệnh như trước)
+        for value in pnl.tolist():
+            self.realized_pnl += value
+        self._open_lots = 0.0
+        self._open_cost = 0.0
+        self._open_volume = 0.0
+
     def get_total_pnl(self):
         """
         Calculate total P&L from all closed positions.
-        
+
         Returns:
             float: Total P&L
         """
-        total_pnl = 0.0
-        for position in self.positions:
-            if position.exit_price is not None:  # Only count closed positions
-                total_pnl += position.pnl
-        return total_pnl
-    
+        return self.realized_pnl
+
     def get_current_equity(self, current_price=None):
         """
         Get current equity (capital + unrealized P&L).
-        
+
         Args:
             current_price: Current market price (for unrealized P&L)
-            
+
         Returns:
             float: Current equity
         """
         # Start with realized P&L
-        realized_pnl = self.get_total_pnl()
-        equity = self.initial_capital + realized_pnl
-        
-        # Add unrealized P&L if current price provided
-        if current_price is not None and self.open_positions:
-            contract_size = 100  # 1 lot = 100 oz for XAUUSD
-            unrealized_pnl = 0.0
-            
-            for position in self.open_positions:
-                if position.direction == "BUY":
-                    unrealized_pnl += (current_price - position.entry_price) * position.lot_size * contract_size
-                elif position.direction == "SELL":
-                    unrealized_pnl += (position.entry_price - current_price) * position.lot_size * contract_size
-            
-            equity += unrealized_pnl
-        
-        return equity
-
+        equity = self.initial_capital + self.realized_pnl
 
+        # Add unrealized P&L if current price provided (đã trừ chi phí đóng lệnh)
+        if current_price is not None and self.book.open_count:
+            calculator = self.pnl_calculator
+            equity += (self._open_lots * current_price - self._open_cost) * calculator.contract_size
+            if calculator.cost_per_lot:
+                equity -= self._open_volume * calculator.cost_per_lot
 
+        return equity
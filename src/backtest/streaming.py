@@ -0,0 +1,364 @@
+"""
+Streaming Engine - Live/paper-trading counterpart of BacktestEngine.run
+
+Consumes bars from an async iterator (local CSV replay or any pluggable feed),
+updates RSI incrementally and pushes entry/break/exit events to subscribers.
+"""
+
+import asyncio
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.backtest.engine import BacktestEngine
+from src.config.strategy_config import compile_config
+from src.strategy.rsi_handler import IncrementalRSI
+from src.utils.data_loader import DataLoader
+
+
+class Bar(NamedTuple):
+    """One OHLCV bar delivered by a feed."""
+    timestamp: pd.Timestamp
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float = 0.0
+
+
+class DataFrameReplayFeed:
+    """
+    Replay an OHLCV DataFrame as an async bar feed.
+
+    speed:
+    - None / 0: phát nhanh nhất có thể (chỉ nhường event loop mỗi `yield_every` nến)
+    - > 0: hệ số nhân thời gian thực, ví dụ speed=3600 phát 1 nến H1 mỗi giây
+    """
+
+    def __init__(self, data: pd.DataFrame, speed: Optional[float] = None,
+                 start=None, end=None, yield_every: int = 100):
+        """
+        Initialize replay feed.
+
+        Args:
+            data: DataFrame with DatetimeIndex and open/high/low/close(/volume)
+            speed: Replay speed multiplier (None = as fast as possible)
+            start: Optional start timestamp (inclusive)
+            end: Optional end timestamp (inclusive)
+            yield_every: Bars between event-loop yields when speed is None
+        """
+        if start is not None or end is not None:
+            data = data.loc[start:end]
+        self.index = data.index
+        self.open = data['open'].to_numpy(dtype=float)
+        self.high = data['high'].to_numpy(dtype=float)
+        self.low = data['low'].to_numpy(dtype=float)
+        self.close = data['close'].to_numpy(dtype=float)
+        if 'volume' in data.columns:
+            self.volume = data['volume'].to_numpy(dtype=float)
+        else:
+            self.volume = np.zeros(len(data))
+        self.speed = speed
+        self.yield_every = max(int(yield_every), 1)
+
+    def __len__(self):
+        return len(self.index)
+
+    async def __aiter__(self) -> AsyncIterator[Bar]:
+        loop = asyncio.get_running_loop()
+        # Thời điểm (giây) của từng nến so với nến đầu, dùng để giữ nhịp phát
+        if self.speed and len(self.index) > 0:
+            offsets = (self.index - self.index[0]).total_seconds().to_numpy() / self.speed
+        else:
+            offsets = None
+        started = loop.time()
+
+        for i in range(len(self.index)):
+            if offsets is not None:
+                # Neo theo đồng hồ gốc để không bị trôi nhịp khi consumer chậm
+                delay = started + offsets[i] - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif i % self.yield_every == 0:
+                await asyncio.sleep(0)
+
+            yield Bar(
+                self.index[i],
+                self.open[i],
+                self.high[i],
+                self.low[i],
+                self.close[i],
+                self.volume[i],
+            )
+
+
+class CSVReplayFeed(DataFrameReplayFeed):
+    """Replay a local CSV file (any format DataLoader understands)."""
+
+    def __init__(self, file_path, speed: Optional[float] = None, source="auto", **kwargs):
+        """
+        Initialize CSV replay feed.
+
+        Args:
+            file_path: Path to CSV file
+            speed: Replay speed multiplier (None = as fast as possible)
+            source: DataLoader source format (default: "auto")
+            **kwargs: Passed to DataFrameReplayFeed (start, end, yield_every)
+        """
+        data = DataLoader().load_csv(file_path, source=source)
+        super().__init__(data, speed=speed, **kwargs)
+
+
+class StreamingEngine(BacktestEngine):
+    """
+    Event-driven engine: xử lý từng nến khi nó tới thay vì duyệt cả DataFrame.
+
+    Dùng chung logic EXIT -> BREAK -> ENTRY với BacktestEngine, nên replay
+    cùng một dataset cho ra cùng danh sách events.
+    """
+
+    def __init__(self, config, strategy, portfolio, symbol="XAUUSD", verbose=False):
+        """
+        Initialize streaming engine.
+
+        Args:
+            config: Configuration dict, StrategyConfig or StrategySettings instance
+            strategy: Strategy instance (DCAStrategy), one per symbol
+            portfolio: Portfolio manager instance, one per symbol
+            symbol: Symbol name attached to published events
+            verbose: Print per-entry logs like BacktestEngine (default: False)
+        """
+        self.config = config
+        self.data = None
+        self.strategy = strategy
+        self.portfolio = portfolio
+        self.symbol = symbol
+        self.results = []
+        self.verbose = verbose
+
+        self.settings = compile_config(config)
+        self.rsi_close = IncrementalRSI(self.settings.rsi_period)
+        self.rsi_open = IncrementalRSI(self.settings.rsi_period)
+        self.use_open_for_exit = self.settings.rsi_exit_use_open
+
+        self.events = []
+        self._equity_points = []
+        self.last_bar = None
+        # High/low theo số thứ tự nến (cho MAE/MFE của bảng chu kỳ)
+        self._highs = []
+        self._lows = []
+        # Số thứ tự của nến hiện tại trong feed (bar index của lệnh)
+        self._bar = -1
+        self._subscribers: List[asyncio.Queue] = []
+
+    def _track_equity(self, timestamp, equity):
+        """Nến tới dần, không biết trước số nến: giữ equity dạng list."""
+        self._equity_points.append({
+            'timestamp': timestamp,
+            'equity': equity,
+            'open_positions': self.portfolio.open_count
+        })
+
+    @property
+    def equity_curve(self):
+        return self._equity_points
+
+    @property
+    def equity_values(self):
+        return np.array([point['equity'] for point in self._equity_points], dtype=np.float64)
+
+    @property
+    def equity_index(self):
+        return pd.DatetimeIndex([point['timestamp'] for point in self._equity_points])
+
+    @property
+    def bar_high(self):
+        return np.array(self._highs, dtype=np.float64)
+
+    @property
+    def bar_low(self):
+        return np.array(self._lows, dtype=np.float64)
+
+    @property
+    def equity_open(self):
+        return np.array([point['open_positions'] for point in self._equity_points], dtype=np.int32)
+
+    @property
+    def equity_times(self):
+        return self.equity_index.as_unit('ns').asi8
+
+    def subscribe(self, maxsize: int = 1000) -> asyncio.Queue:
+        """
+        Register a subscriber and return its event queue.
+
+        Queue nhận các event dict (có thêm key 'symbol'); khi engine dừng sẽ
+        nhận event {'type': 'end'}. Nếu consumer quá chậm và queue đầy, event
+        cũ nhất bị bỏ để engine không bao giờ bị chặn.
+
+        Args:
+            maxsize: Queue capacity (default: 1000)
+
+        Returns:
+            asyncio.Queue: Queue of published events
+        """
+        queue = asyncio.Queue(maxsize=maxsize)
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        """Remove a subscriber queue."""
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+    def _publish(self, event: Dict):
+        """Push an event to every subscriber without blocking."""
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def reset(self):
+        """Reset strategy, portfolio, indicators and collected events."""
+        self.strategy.reset()
+        self.portfolio.reset()
+        self.rsi_close.reset()
+        self.rsi_open.reset()
+        self.events = []
+        self._equity_points = []
+        self.last_bar = None
+        # High/low theo số thứ tự nến (cho MAE/MFE của bảng chu kỳ)
+        self._highs = []
+        self._lows = []
+        self._bar = -1
+
+    def reconfigure(self, config, strategy=None, portfolio=None):
+        """
+        Đổi cấu hình chiến lược; engine trở về trạng thái chưa nhận nến nào.
+
+        Không có data batch để giữ lại: RSI tăng dần được tạo lại theo
+        rsi_period mới, events/equity/lệnh bị xóa (subscriber giữ nguyên).
+        Muốn tiếp tục giữa chừng một stream thì gọi warm_up() với các nến đã qua.
+
+        Args:
+            config: Configuration dict, StrategyConfig or StrategySettings instance
+            strategy: Strategy instance (default: same strategy class built from config)
+            portfolio: Portfolio instance (default: same class, capital and trading costs from config)
+
+        Returns:
+            StreamingEngine: self
+        """
+        settings = self._apply_config(config, strategy, portfolio)
+        self.rsi_close = IncrementalRSI(settings.rsi_period)
+        self.rsi_open = IncrementalRSI(settings.rsi_period)
+        self.use_open_for_exit = settings.rsi_exit_use_open
+        self.reset()
+        return self
+
+    def on_bar(self, bar: Bar) -> List[Dict]:
+        """
+        Process one incoming bar and publish the events it produced.
+
+        Args:
+            bar: Incoming bar
+
+        Returns:
+            list: Events generated by this bar
+        """
+        self._bar += 1
+        rsi_close = self.rsi_close.update(bar.close)
+        rsi_open = self.rsi_open.update(bar.open)
+        self.last_bar = bar
+        self._highs.append(bar.high)
+        self._lows.append(bar.low)
+
+        # Chưa đủ nến để có RSI -> bỏ qua như BacktestEngine.run
+        if np.isnan(rsi_close):
+            return []
+
+        first_new = len(self.events)
+        self._process_bar(bar.timestamp, bar.close, rsi_close, rsi_open, self.use_open_for_exit)
+        new_events = self.events[first_new:]
+        for event in new_events:
+            self._publish(dict(event, symbol=self.symbol))
+        return new_events
+
+    def warm_up(self, data: pd.DataFrame) -> int:
+        """
+        Đưa engine về trạng thái sau các nến lịch sử `data` (trước điểm bắt đầu stream).
+
+        Strategy/portfolio được chạy bằng BacktestEngine (RSI tính theo mảng,
+        không publish event, không ghi equity, lệnh đang mở được giữ), RSI
+        tăng dần được seed từ các giá cuối. Đồng bộ và tốn CPU: trong event
+        loop hãy gọi qua run_in_executor.
+
+        Args:
+            data: OHLC DataFrame of the bars before the stream starts
+
+        Returns:
+            int: Number of bars consumed
+        """
+        self.reset()
+        if not len(data):
+            return 0
+        batch = BacktestEngine(self.settings, data, self.strategy, self.portfolio)
+        batch.verbose = self.verbose
+        batch._run_bars()
+
+        self.rsi_close.seed(batch._close)
+        self.rsi_open.seed(data['open'].to_numpy(dtype=np.float64))
+        self._highs = batch.bar_high.tolist()
+        self._lows = batch.bar_low.tolist()
+        self._bar = len(data) - 1
+        last = data.iloc[-1]
+        self.last_bar = Bar(data.index[-1], float(last['open']), float(last['high']), float(last['low']),
+                            float(last['close']), float(last.get('volume', 0.0)))
+        return len(data)
+
+    async def run(self, feed, close_at_end: bool = True):
+        """
+        Consume a feed until it is exhausted.
+
+        Args:
+            feed: Async iterable of Bar (e.g. CSVReplayFeed or a live feed)
+            close_at_end: Close open positions when the feed ends (default: True)
+
+        Returns:
+            dict: Results in the same format as BacktestEngine.run
+        """
+        self.reset()
+
+        async for bar in feed:
+            self.on_bar(bar)
+
+        if close_at_end and self.portfolio.open_count and self.last_bar is not None:
+            bar = self.last_bar
+            self.portfolio.close_all_positions(bar.close, bar.timestamp, bar_index=self._bar)
+            event = {
+                'type': 'exit',
+                'timestamp': bar.timestamp,
+                'price': bar.close,
+                'rsi': self.rsi_close.value,
+                'entry_count': self.strategy.current_entry,
+                'reason': 'end_of_data'
+            }
+            self.events.append(event)
+            self._publish(dict(event, symbol=self.symbol))
+
+        self._publish({'type': 'end', 'symbol': self.symbol})
+        return self._calculate_results()
+
+
+async def run_streams(pairs):
+    """
+    Run several (engine, feed) pairs concurrently in one event loop.
+
+    Args:
+        pairs: Iterable of (StreamingEngine, feed) tuples, one per symbol
+
+    Returns:
+        dict: symbol -> results dict
+    """
+    pairs = list(pairs)
+    results = await asyncio.gather(*(engine.run(feed) for engine, feed in pairs))
+    return {engine.symbol: result for (engine, _), result in zip(pairs, results)}
@@ -3,9 +3,200 @@ Strategy Configuration - Load and validate config files
 """
 
 import json
+import re
 from pathlib import Path
 from typing import Dict, Any
 
+import numpy as np
+
+
+DIRECTION_MODES = ("AUTO", "BUY", "SELL")
+
+# Chi phí giao dịch mặc định khi config thiếu key trong section `trading`
+# (cũng là giá trị mặc định của PnLCalculator)
+TRADING_DEFAULTS = {
+    "spread_pips": 3,
+    "slippage_pips": 1,
+    "commission_per_lot": 0,
+    "pip_size": 0.1,
+    "contract_size": 100,
+}
+
+_LOT_KEY = re.compile(r"^entry_(\d+)$")
+_MISSING = object()
+
+
+def _lookup(config: Dict, key: str, default=None):
+    """Giá trị theo dot path như StrategyConfig.get (None trên đường đi -> default)."""
+    value = config
+    for k in key.split('.'):
+        if not isinstance(value, dict):
+            return default
+        value = value.get(k)
+        if value is None:
+            return default
+    return value
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+class StrategySettings:
+    """
+    Cấu hình đã "biên dịch": giá trị đã kiểm tra, kiểu cố định, không sửa được.
+
+    Dựng một lần từ dict config (StrategyConfig.compiled / compile_config);
+    strategy và engine chỉ đọc attribute, không tách dot key hay tra dict
+    trong vòng lặp nến. lot_sizes là mảng (read-only) theo STT entry:
+    lot_sizes[n] = lot của entry n, 0 ngoài khoảng trade.
+    """
+
+    __slots__ = (
+        "direction_mode", "debug", "rsi_period",
+        "rsi_entry_buy", "rsi_entry_sell", "rsi_break_buy", "rsi_break_sell",
+        "rsi_exit_threshold", "rsi_exit_tolerance", "rsi_exit_use_open",
+        "min_entries_before_break", "entry_count_only", "entry_trade", "entry_wait_exit",
+        "lot_sizes", "initial_capital",
+        "spread_pips", "slippage_pips", "commission_per_lot", "pip_size", "contract_size",
+    )
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            object.__setattr__(self, name, values[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__ if name != "lot_sizes")
+        return f"{type(self).__name__}({fields})"
+
+    @classmethod
+    def from_dict(cls, config: Dict) -> "StrategySettings":
+        """
+        Kiểm tra và biên dịch dict config (thiếu key -> giá trị mặc định).
+
+        Raises:
+            ValueError: Liệt kê mọi giá trị không hợp lệ
+        """
+        if not isinstance(config, dict):
+            raise ValueError(f"Configuration must be a dict, got {type(config).__name__}")
+        errors = []
+
+        def number(key, default, low=None, high=None):
+            value = _lookup(config, key, default)
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                errors.append(f"{key}: expected a number, got {value!r}")
+                return float(default)
+            if high is None and low is not None and value < low:
+                errors.append(f"{key}: {value} must be >= {low}")
+            elif high is not None and not low <= value <= high:
+                errors.append(f"{key}: {value} out of range [{low}, {high}]")
+            return float(value)
+
+        def integer(key, default, low=None):
+            value = _lookup(config, key, default)
+            if not _is_int(value):
+                errors.append(f"{key}: expected an integer, got {value!r}")
+                return default
+            if low is not None and value < low:
+                errors.append(f"{key}: {value} must be >= {low}")
+            return value
+
+        def entry_range(name, default, open_end=False):
+            # Hỗ trợ cả strategy.entry_range.<name> và entry_range.<name>
+            value = _lookup(config, f"strategy.entry_range.{name}", _MISSING)
+            if value is _MISSING:
+                value = _lookup(config, f"entry_range.{name}", default)
+            if isinstance(value, (list, tuple)) and not value:
+                return ()
+            if isinstance(value, (list, tuple)) and len(value) == 2:
+                start, end = value
+                if _is_int(start) and ((open_end and end is None) or (_is_int(end) and start <= end)):
+                    return (start, end)
+            errors.append(f"entry_range.{name}: expected [start, end], got {value!r}")
+            return tuple(default)
+
+        direction_mode = str(_lookup(config, "strategy.direction_mode", "AUTO") or "AUTO").upper()
+        if direction_mode not in DIRECTION_MODES:
+            errors.append(f"strategy.direction_mode: expected one of {DIRECTION_MODES}, got {direction_mode!r}")
+
+        entry_trade = entry_range("trade", (1, 40))
+        if entry_trade and entry_trade[0] < 1:
+            errors.append(f"entry_range.trade: entries start at 1, got {entry_trade!r}")
+
+        # Mảng lot theo STT entry (chỉ khoảng trade có lot > 0)
+        lot_config = _lookup(config, "lot_sizes", {})
+        trade_end = entry_trade[1] if entry_trade else 0
+        lot_sizes = np.zeros(trade_end + 1, dtype=np.float64)
+        if not isinstance(lot_config, dict):
+            errors.append(f"lot_sizes: expected a mapping entry_<n> -> lot, got {lot_config!r}")
+            lot_config = {}
+        for key, lot in lot_config.items():
+            match = _LOT_KEY.match(str(key))
+            if match is None:
+                errors.append(f"lot_sizes.{key}: key must look like entry_<n>")
+                continue
+            if lot is None:
+                continue
+            if isinstance(lot, bool) or not isinstance(lot, (int, float)) or lot < 0:
+                errors.append(f"lot_sizes.{key}: expected a lot size >= 0, got {lot!r}")
+                continue
+            entry = int(match.group(1))
+            if entry_trade and entry_trade[0] <= entry <= entry_trade[1]:
+                lot_sizes[entry] = float(lot)
+        lot_sizes.setflags(write=False)
+
+        settings = dict(
+            direction_mode=direction_mode,
+            debug=bool(_lookup(config, "debug.strategy", False)),
+            rsi_period=integer("strategy.rsi_period", 14, low=1),
+            rsi_entry_buy=number("strategy.rsi_entry_threshold.buy", 30, 0, 100),
+            rsi_entry_sell=number("strategy.rsi_entry_threshold.sell", 70, 0, 100),
+            rsi_break_buy=number("strategy.rsi_break_threshold.buy", 40, 0, 100),
+            rsi_break_sell=number("strategy.rsi_break_threshold.sell", 60, 0, 100),
+            rsi_exit_threshold=number("strategy.rsi_exit.threshold", 50, 0, 100),
+            rsi_exit_tolerance=number("strategy.rsi_exit.tolerance", 1, 0),
+            rsi_exit_use_open=bool(_lookup(config, "strategy.rsi_exit.use_open", True)),
+            min_entries_before_break=integer("strategy.min_entries_before_break", 9, low=0),
+            entry_count_only=entry_range("count_only", ()),
+            entry_trade=entry_trade,
+            entry_wait_exit=entry_range("wait_exit", (41, None), open_end=True),
+            lot_sizes=lot_sizes,
+            initial_capital=number("portfolio.initial_capital", 10000, 0),
+            spread_pips=number("trading.spread_pips", TRADING_DEFAULTS["spread_pips"], 0),
+            slippage_pips=number("trading.slippage_pips", TRADING_DEFAULTS["slippage_pips"], 0),
+            commission_per_lot=number("trading.commission_per_lot", TRADING_DEFAULTS["commission_per_lot"], 0),
+            pip_size=number("trading.pip_size", TRADING_DEFAULTS["pip_size"], 0),
+            contract_size=number("trading.contract_size", TRADING_DEFAULTS["contract_size"], 0),
+        )
+        if settings["initial_capital"] <= 0 and not any(e.startswith("portfolio.") for e in errors):
+            errors.append(f"portfolio.initial_capital: must be > 0, got {settings['initial_capital']}")
+        if errors:
+            raise ValueError("Invalid configuration:\n  - " + "\n  - ".join(errors))
+        return cls(**settings)
+
+
+def compile_config(config) -> StrategySettings:
+    """
+    StrategySettings của một config (StrategyConfig, dict hoặc StrategySettings).
+
+    Raises:
+        ValueError: Nếu config không hợp lệ
+        TypeError: Nếu kiểu config không được hỗ trợ
+    """
+    if isinstance(config, StrategySettings):
+        return config
+    if isinstance(config, StrategyConfig):
+        return config.compiled
+    if isinstance(config, dict):
+        return StrategySettings.from_dict(config)
+    raise TypeError(f"Unsupported config type: {type(config).__name__}")
+
 
 class StrategyConfig:
     """
@@ -21,6 +212,7 @@ class StrategyConfig:
             config_dict: Config dict to use directly (optional, takes precedence over config_path)
         """
         self.config = None
+        self._compiled = None
         if config_dict is not None:
             self.config = config_dict
             self.validate()
@@ -49,18 +241,26 @@ class StrategyConfig:
     
     def validate(self):
         """
-        Validate configuration structure.
-        
+        Validate configuration structure and compile it (see `compiled`).
+
+        Checks value types and ranges (RSI thresholds 0-100, entry ranges,
+        lot sizes >= 0, direction mode, capital > 0, trading costs >= 0). The data file is not
+        checked: callers may run on another file than data.data_file.
+        Call again after editing `self.config` in place.
+
         Raises:
             ValueError: If config is invalid
         """
         if not self.config:
             raise ValueError("Configuration not loaded")
-        
-        # TODO: Add validation logic
-        # - Check required fields
-        # - Validate value ranges
-        # - Check data file exists
+        self._compiled = StrategySettings.from_dict(self.config)
+
+    @property
+    def compiled(self) -> StrategySettings:
+        """StrategySettings đã kiểm tra của config (biên dịch một lần)."""
+        if self._compiled is None:
+            self.validate()
+        return self._compiled
     
     def get(self, key, default=None):
         """
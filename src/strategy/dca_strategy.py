@@ -2,6 +2,8 @@
 DCA Strategy - Core logic for entry counting and position management
 """
 
+from src.config.strategy_config import compile_config
+
 
 class DCAStrategy:
     """
@@ -19,30 +21,14 @@ class DCAStrategy:
         Initialize strategy with configuration.
 
         Args:
-            config: Strategy configuration dict or StrategyConfig instance
+            config: Strategy configuration dict, StrategyConfig or StrategySettings instance
+
+        Raises:
+            ValueError: If the configuration is invalid
         """
-        # Handle both dict and StrategyConfig
-        if hasattr(config, "get"):
-            self.config = config
-        else:
-            # Create a simple wrapper for dict
-            class ConfigWrapper:
-                def __init__(self, cfg):
-                    self._cfg = cfg
-
-                def get(self, key, default=None):
-                    keys = key.split(".")
-                    value = self._cfg
-                    for k in keys:
-                        if isinstance(value, dict):
-                            value = value.get(k)
-                            if value is None:
-                                return default
-                        else:
-                            return default
-                    return value
-
-            self.config = ConfigWrapper(config)
+        # Config được kiểm tra + biên dịch một lần; vòng lặp nến chỉ đọc attribute
+        self.config = config
+        self.settings = settings = compile_config(config)
 
         self.current_entry = 0
         self.direction = None  # "BUY" or "SELL"
@@ -57,46 +43,35 @@ class DCAStrategy:
         # - "AUTO": chọn hướng dựa trên lần chạm ngưỡng RSI đầu tiên (hành vi cũ)
         # - "BUY": chỉ tìm cơ hội BUY (RSI <= buy threshold), bỏ qua SELL
         # - "SELL": chỉ tìm cơ hội SELL (RSI >= sell threshold), bỏ qua BUY
-        self.direction_mode = (
-            (self.config.get("strategy.direction_mode", "AUTO") or "AUTO")
-        ).upper()
+        self.direction_mode = settings.direction_mode
 
         # Debug flag: mặc định False để không spam log (rất chậm với nhiều nến)
         # Có thể bật qua config: "debug.strategy": true
-        self.debug = bool(self.config.get("debug.strategy", False))
+        self.debug = settings.debug
 
         # Get config values
-        self.rsi_entry_buy = self.config.get("strategy.rsi_entry_threshold.buy", 30)
-        self.rsi_entry_sell = self.config.get("strategy.rsi_entry_threshold.sell", 70)
-        self.rsi_break_buy = self.config.get("strategy.rsi_break_threshold.buy", 40)
-        self.rsi_break_sell = self.config.get("strategy.rsi_break_threshold.sell", 60)
-        self.rsi_exit_threshold = self.config.get("strategy.rsi_exit.threshold", 50)
-        self.rsi_exit_tolerance = self.config.get("strategy.rsi_exit.tolerance", 1)
-        self.rsi_exit_use_open = self.config.get("strategy.rsi_exit.use_open", True)
+        self.rsi_entry_buy = settings.rsi_entry_buy
+        self.rsi_entry_sell = settings.rsi_entry_sell
+        self.rsi_break_buy = settings.rsi_break_buy
+        self.rsi_break_sell = settings.rsi_break_sell
+        self.rsi_exit_threshold = settings.rsi_exit_threshold
+        self.rsi_exit_tolerance = settings.rsi_exit_tolerance
+        self.rsi_exit_use_open = settings.rsi_exit_use_open
 
         # Minimum entries before break can occur (to prevent early reset)
         # Default: 9 entries (allows Entry 1-9 to accumulate before break can trigger)
-        self.min_entries_before_break = self.config.get("strategy.min_entries_before_break", 9)
+        self.min_entries_before_break = settings.min_entries_before_break
 
-        # Entry ranges
-        # Support BOTH config layouts:
-        # - strategy.entry_range.trade
-        # - entry_range.trade
+        # Entry ranges (strategy.entry_range.* hoặc entry_range.*)
         # Entry 1-9: count only (no trade, lot = 0)
         # Entry 10-40: count + trade (actual positions with lot size from user input)
         # Entry 41+: count only, wait for exit (lot = 0)
-        self.entry_count_only = self.config.get(
-            "strategy.entry_range.count_only",
-            self.config.get("entry_range.count_only", []),
-        )
-        self.entry_trade = self.config.get(
-            "strategy.entry_range.trade",
-            self.config.get("entry_range.trade", [1, 40]),
-        )
-        self.entry_wait_exit = self.config.get(
-            "strategy.entry_range.wait_exit",
-            self.config.get("entry_range.wait_exit", [41, None]),
-        )
+        self.entry_count_only = settings.entry_count_only
+        self.entry_trade = settings.entry_trade
+        self.entry_wait_exit = settings.entry_wait_exit
+
+        # lot_sizes[n] = lot của entry n (0 ngoài khoảng trade)
+        self.lot_sizes = settings.lot_sizes
 
     def reset(self):
         """Reset strategy state for new cycle."""
@@ -384,17 +359,15 @@ class DCAStrategy:
         # Only return lot size for entries in trade range (10-40)
         # Entry 1-9: count only, no trade, lot = 0
         # Entry 41+: count only, wait for exit, lot = 0
-        if not (self.entry_trade[0] <= entry_number <= self.entry_trade[1]):
+        # (mảng lot đã có 0 ngoài khoảng trade)
+        if not 0 <= entry_number < len(self.lot_sizes):
             return 0.0
+        result = float(self.lot_sizes[entry_number])
 
-        lot_key = f"lot_sizes.entry_{entry_number}"
-        lot_size = self.config.get(lot_key, 0.0)
-        result = float(lot_size) if lot_size else 0.0
-        
         # Debug: Log khi lot_size = 0 cho entry trong trade range
         if result == 0.0 and (self.entry_trade[0] <= entry_number <= self.entry_trade[1]):
             print(f"⚠️ [DEBUG] Entry #{entry_number} trong trade range nhưng lot_size=0.0")
-            print(f"   lot_key={lot_key}, config_value={lot_size}")
+            print(f"   lot_key=lot_sizes.entry_{entry_number}")
             print(f"   entry_trade range: {self.entry_trade[0]}-{self.entry_trade[1]}")
-        
+
         return result
@@ -2,6 +2,9 @@
 RSI Handler - Calculate and process RSI indicators
 """
 
+import math
+from collections import deque
+
 import pandas as pd
 import numpy as np
 
@@ -46,6 +49,30 @@ class RSIHandler:
 
         return rsi
 
+    def add_rsi_columns(self, data):
+        """
+        Add 'rsi' (close) and 'rsi_open' (open) columns to OHLC data in place.
+
+        The period is recorded in data.attrs['rsi_period'] (kept by copy()),
+        so data that already carries RSI for this period is not recomputed.
+
+        Args:
+            data: pandas DataFrame with 'open' and 'close' columns
+
+        Returns:
+            pandas DataFrame: The same DataFrame
+        """
+        if (
+            data.attrs.get("rsi_period") == self.period
+            and 'rsi' in data.columns
+            and 'rsi_open' in data.columns
+        ):
+            return data
+        data['rsi'] = self.calculate_rsi(data['close'])
+        data['rsi_open'] = self.calculate_rsi(data['open'])
+        data.attrs["rsi_period"] = self.period
+        return data
+
     def check_entry_condition(self, rsi_value, direction):
         """
         Check if RSI meets entry condition.
@@ -104,5 +131,90 @@ class RSIHandler:
         return ok
 
 
+class IncrementalRSI:
+    """
+    Streaming RSI: cập nhật từng giá một, cho kết quả giống RSIHandler.calculate_rsi.
+
+    Dùng cùng công thức (trung bình trượt đơn giản của gain/loss trên `period`
+    delta gần nhất) nên giá trị khớp với bản tính theo cả Series, chỉ khác
+    ở sai số dấu phẩy động.
+    """
+
+    def __init__(self, period=14):
+        """
+        Initialize incremental RSI.
+
+        Args:
+            period: RSI period (default: 14)
+        """
+        self.period = period
+        self.reset()
+
+    def reset(self):
+        """Clear price history."""
+        self.prev_price = None
+        self.gains = deque(maxlen=self.period)
+        self.losses = deque(maxlen=self.period)
+        self.value = float('nan')
+
+    @property
+    def ready(self):
+        """True once enough prices have been seen to produce a value."""
+        return len(self.gains) == self.period
 
+    def update(self, price):
+        """
+        Feed the next price and return the current RSI.
 
+        Args:
+            price: Latest price
+
+        Returns:
+            float: RSI value, NaN until `period` prices are available
+        """
+        price = float(price)
+        # Delta đầu tiên là NaN, calculate_rsi coi nó là gain = loss = 0
+        delta = price - self.prev_price if self.prev_price is not None else 0.0
+        self.gains.append(delta if delta > 0 else 0.0)
+        self.losses.append(-delta if delta < 0 else 0.0)
+        self.prev_price = price
+        return self._compute()
+
+    def seed(self, prices):
+        """
+        Đặt trạng thái như sau khi update() lần lượt từng giá trong `prices`.
+
+        Chỉ `period` delta cuối ảnh hưởng tới RSI, nên chỉ phần đuôi của mảng
+        được dùng (không lặp qua toàn bộ lịch sử).
+
+        Args:
+            prices: Price history (oldest first)
+
+        Returns:
+            float: RSI after the last price
+        """
+        self.reset()
+        prices = np.asarray(prices, dtype=np.float64)
+        if len(prices) <= self.period:
+            for price in prices.tolist():
+                self.update(price)
+            return self.value
+        deltas = np.diff(prices[-(self.period + 1):])
+        self.gains.extend(np.where(deltas > 0, deltas, 0.0).tolist())
+        self.losses.extend(np.where(deltas < 0, -deltas, 0.0).tolist())
+        self.prev_price = float(prices[-1])
+        return self._compute()
+
+    def _compute(self):
+        if not self.ready:
+            self.value = float('nan')
+            return self.value
+
+        gain = math.fsum(self.gains) / self.period
+        loss = math.fsum(self.losses) / self.period
+        if loss == 0:
+            # Giống pandas: gain/0 = inf -> RSI 100, 0/0 = NaN
+            self.value = 100.0 if gain > 0 else float('nan')
+        else:
+            self.value = 100 - (100 / (1 + gain / loss))
+        return self.value
@@ -3,15 +3,25 @@ Backtest utility functions - extracted from gui.py for reuse in web app
 """
 
 import json
+import os
+import time
 import traceback
 from pathlib import Path
 from typing import Optional
 
+import numpy as np
+import pandas as pd
+
 from src.utils.data_loader import DataLoader
+from src.utils.dataset_cache import get_dataset_cache
+from src.utils.dataset_registry import get_registry
 from src.strategy.dca_strategy import DCAStrategy
 from src.backtest.portfolio import Portfolio
 from src.backtest.engine import BacktestEngine
+from src.strategy.rsi_handler import RSIHandler
 from src.config.strategy_config import StrategyConfig
+from src.utils.calculator import PnLCalculator
+from src.utils.job_manager import JobCancelled
 
 
 CONFIG_PATH = Path("configs/default_config.json")
@@ -44,10 +54,9 @@ def get_xauusd_average_price(data_file_path=None):
     """
     if data_file_path and Path(data_file_path).exists():
         try:
-            loader = DataLoader()
-            df = loader.load_csv(data_file_path, source="auto")
-            if 'close' in df.columns:
-                avg_price = df['close'].mean()
+            # Giá trung bình lấy từ registry, chỉ load CSV khi file chưa đăng ký hoặc đã đổi
+            avg_price = get_registry().ensure(data_file_path).get('avg_price')
+            if avg_price is not None:
                 return float(avg_price)
         except (FileNotFoundError, ValueError, KeyError, AttributeError, OSError) as e:
             # Lỗi khi load file hoặc xử lý dữ liệu - dùng giá mặc định
@@ -58,6 +67,41 @@ def get_xauusd_average_price(data_file_path=None):
     return DEFAULT_XAUUSD_PRICE
 
 
+def load_backtest_data(data_file, rsi_period: int = 14):
+    """
+    Load nến của file kèm cột RSI cho `rsi_period`, dùng lại nếu file chưa đổi.
+
+    Dữ liệu nằm trong dataset cache của process (biến thể ("rsi", period)):
+    tối ưu/job liên tiếp trên cùng file không phải load và tính RSI lại.
+    BacktestEngine copy data nên bản cache không bị sửa.
+
+    Args:
+        data_file: Path to data CSV
+        rsi_period: RSI period
+
+    Returns:
+        pandas.DataFrame: OHLCV + 'rsi', 'rsi_open' (shared, do not modify)
+    """
+    rsi_period = int(rsi_period)
+    return get_dataset_cache().get(
+        data_file,
+        variant=("rsi", rsi_period),
+        prepare=RSIHandler(period=rsi_period).add_rsi_columns,
+    )
+
+
+def warm_worker(data_file, rsi_period: int = 14):
+    """
+    Nạp sẵn dữ liệu + RSI vào process hiện tại (chạy trong worker lúc server khởi động).
+
+    Returns:
+        dict: {"rows": ..., "seconds": ...}
+    """
+    started = time.perf_counter()
+    df = load_backtest_data(data_file, rsi_period)
+    return {"rows": len(df), "seconds": round(time.perf_counter() - started, 3)}
+
+
 def _extract_backtest_result(result):
     """
     Helper function để extract summary và engine từ kết quả backtest.
@@ -77,24 +121,23 @@ def _extract_backtest_result(result):
         return result, None
 
 
-def run_backtest_with_params(
+def build_strategy_config(
     buy_threshold: float,
     sell_threshold: float,
     lot_data: list,
-    data_file_path: str = None,
-    silent: bool = False,
     direction_mode: str = "AUTO",
     entry_rsi: Optional[float] = None,
     exit_rsi: Optional[float] = None,
     break_rsi: Optional[float] = None,
 ):
     """
-    Chạy backtest với ngưỡng RSI mới và dãy lot/tiền theo STT lệnh.
+    Tạo StrategyConfig từ config gốc + ngưỡng RSI và dãy lot người dùng nhập.
 
-    lot_data: danh sách dict với keys: 'entry_number', 'money_amount', 'lot_size'
-      - Ví dụ: [{'entry_number': 2, 'money_amount': 54, 'lot_size': 0.00027}, ...]
-    data_file_path: đường dẫn file data (nếu None thì dùng từ config)
-    silent: Nếu True, không in thông tin debug ra console
+    Dùng chung cho run_backtest_with_params và các endpoint cần dựng lại
+    đúng cấu hình của lần backtest (ví dụ replay).
+
+    Returns:
+        StrategyConfig: Config đã cập nhật
     """
     if not CONFIG_PATH.exists():
         raise FileNotFoundError(f"Không tìm thấy file config: {CONFIG_PATH}")
@@ -138,68 +181,111 @@ def run_backtest_with_params(
         lot_sizes[f"entry_{entry_num}"] = float(lot_size)
 
     # Tạo config từ dict đã chỉnh (reuse StrategyConfig để tránh code duplication)
-    cfg = StrategyConfig(config_dict=config_data)
+    return StrategyConfig(config_dict=config_data)
+
+
+def run_backtest_with_params(
+    buy_threshold: float,
+    sell_threshold: float,
+    lot_data: list,
+    data_file_path: str = None,
+    silent: bool = False,
+    direction_mode: str = "AUTO",
+    entry_rsi: Optional[float] = None,
+    exit_rsi: Optional[float] = None,
+    break_rsi: Optional[float] = None,
+    progress_callback=None,
+    engine: Optional[BacktestEngine] = None,
+    summary_only: bool = False,
+):
+    """
+    Chạy backtest với ngưỡng RSI mới và dãy lot/tiền theo STT lệnh.
+
+    lot_data: danh sách dict với keys: 'entry_number', 'money_amount', 'lot_size'
+      - Ví dụ: [{'entry_number': 2, 'money_amount': 54, 'lot_size': 0.00027}, ...]
+    data_file_path: đường dẫn file data (nếu None thì dùng từ config)
+    silent: Nếu True, không in thông tin debug ra console
+    progress_callback: callable(bars_done=..., total_bars=...) truyền cho engine.run
+    engine: Engine của lần chạy trước trên cùng file data (ví dụ khi tối ưu): chỉ
+      reconfigure() với tham số mới, không load/copy data và tính RSI lại
+    summary_only: Chỉ tính các chỉ số tổng hợp (engine.run(summary_only=True)),
+      không dựng equity_curve / cycle_table theo từng nến - dùng khi tối ưu
+    """
+    cfg = build_strategy_config(
+        buy_threshold,
+        sell_threshold,
+        lot_data,
+        direction_mode=direction_mode,
+        entry_rsi=entry_rsi,
+        exit_rsi=exit_rsi,
+        break_rsi=break_rsi,
+    )
 
     # Load data
     if not silent:
         print("\n" + "=" * 50)
         print("🚀 Bắt đầu chạy backtest...")
         print("=" * 50)
-    
-    loader = DataLoader()
-    # Sử dụng file đã chọn nếu có, nếu không thì dùng từ config
-    if data_file_path:
-        data_file = data_file_path
+
+    if engine is not None:
+        # Dùng lại data + RSI + buffer của engine, chỉ đổi tham số chiến lược
+        engine.reconfigure(cfg)
+        df = engine.data
     else:
-        data_file = cfg.get("data.data_file", "data/raw/xauusd_h1.csv")
-    if not silent:
-        print(f"📂 Đang load dữ liệu từ: {data_file}")
-    df = loader.load_csv(data_file, source="auto")
-    if not silent:
-        print(f"✅ Đã load {len(df):,} nến dữ liệu")
+        # Sử dụng file đã chọn nếu có, nếu không thì dùng từ config
+        if data_file_path:
+            data_file = data_file_path
+        else:
+            data_file = cfg.get("data.data_file", "data/raw/xauusd_h1.csv")
+        if not silent:
+            print(f"📂 Đang load dữ liệu từ: {data_file}")
+        df = load_backtest_data(data_file, rsi_period=cfg.get("strategy.rsi_period", 14))
+        if not silent:
+            print(f"✅ Đã load {len(df):,} nến dữ liệu")
 
-    # Khởi tạo components
-    if not silent:
-        print("🔧 Đang khởi tạo components...")
-    portfolio_cfg = cfg.get("portfolio", {}) or {}
-    initial_capital = portfolio_cfg.get("initial_capital", 10000)
-    portfolio = Portfolio(initial_capital=initial_capital)
-    strategy = DCAStrategy(cfg)
-    engine = BacktestEngine(config=cfg, data=df, strategy=strategy, portfolio=portfolio)
-    if not silent:
-        print("✅ Components đã sẵn sàng")
+        # Khởi tạo components
+        if not silent:
+            print("🔧 Đang khởi tạo components...")
+        portfolio_cfg = cfg.get("portfolio", {}) or {}
+        initial_capital = portfolio_cfg.get("initial_capital", 10000)
+        portfolio = Portfolio(initial_capital=initial_capital, pnl_calculator=PnLCalculator.from_config(cfg))
+        strategy = DCAStrategy(cfg)
+        engine = BacktestEngine(config=cfg, data=df, strategy=strategy, portfolio=portfolio)
+        if not silent:
+            print("✅ Components đã sẵn sàng")
     
     # Chạy backtest
     if not silent:
         print(f"\n🚀 Đang chạy backtest trên {len(df):,} nến...")
         print("   (Quá trình này có thể mất vài phút, vui lòng đợi...)\n")
-    results = engine.run()
-    report = engine.generate_report()
-    summary = report["summary"]
+    results = engine.run(progress_callback=progress_callback, summary_only=summary_only)
+    total_return = f"{results['total_return']:.2f}%"
     
     if not silent:
         print("\n" + "=" * 50)
         print("✅ Backtest hoàn thành!")
         print("=" * 50)
-        print(f"   Total Entries: {summary['total_entries']}")
-        print(f"   Total Trades: {summary['total_trades']}")
-        print(f"   Total P&L: ${summary['total_pnl']:,.2f}")
-        print(f"   Total Return: {summary['total_return']}")
+        print(f"   Total Entries: {results['total_entries']}")
+        print(f"   Total Trades: {results['total_trades']}")
+        print(f"   Total P&L: ${results['total_pnl']:,.2f}")
+        print(f"   Total Return: {total_return}")
         print("=" * 50 + "\n")
 
     # Trả về tóm tắt cần cho GUI và engine để vẽ biểu đồ
+    # (lấy thẳng từ kết quả của run(), không tính lại qua generate_report())
     results_dict = results if isinstance(results, dict) else {}
     summary_dict = {
-        "total_entries": summary["total_entries"],
-        "total_trades": summary["total_trades"],
-        "total_pnl": summary["total_pnl"],
-        "total_return": summary["total_return"],
-        "initial_capital": summary["initial_capital"],
-        "final_equity": summary["final_equity"],
+        "total_entries": results["total_entries"],
+        "total_trades": results["total_trades"],
+        "total_pnl": results["total_pnl"],
+        "total_return": total_return,
+        "initial_capital": results["initial_capital"],
+        "final_equity": results["final_equity"],
         "buy_entries": results_dict.get("buy_entries", 0),
         "sell_entries": results_dict.get("sell_entries", 0),
         "buy_trades": results_dict.get("buy_trades", 0),
         "sell_trades": results_dict.get("sell_trades", 0),
+        "metrics": results_dict.get("metrics", {}),
     }
     # Trả về tuple (summary, engine) để có thể vẽ biểu đồ sau
     return summary_dict, engine
@@ -212,6 +298,7 @@ def optimize_rsi_thresholds(
     sell_range: tuple = None,
     step: float = None,
     direction_mode: str = "AUTO",
+    progress_callback=None,
 ):
     """
     Tối ưu ngưỡng RSI bằng cách test nhiều giá trị và chọn giá trị tốt nhất.
@@ -223,6 +310,8 @@ def optimize_rsi_thresholds(
         sell_range: Khoảng giá trị RSI cho SELL (min, max), default: DEFAULT_OPTIMIZE_SELL_RANGE
         step: Bước nhảy giữa các giá trị, default: DEFAULT_OPTIMIZE_STEP
         direction_mode: Hướng vào lệnh (AUTO/BUY/SELL)
+        progress_callback: callable(completed=..., total=..., bars_processed=..., best=..., current=...)
+            gọi trong lúc chạy từng tổ hợp và sau mỗi tổ hợp
     
     Returns:
         dict: Kết quả tốt nhất với keys: 'buy_threshold', 'sell_threshold', 'summary', 'all_results'
@@ -252,11 +341,35 @@ def optimize_rsi_thresholds(
     
     total_tests = len(buy_values) * len(sell_values)
     current_test = 0
+    bars_finished = 0  # Tổng số nến của các tổ hợp đã chạy xong
+    engine = None  # Engine dùng lại giữa các tổ hợp (data + RSI + buffer giữ nguyên)
+    
+    def report(completed, bars_processed, current):
+        best = None
+        if best_result is not None:
+            best = {
+                'buy_threshold': best_result['buy_threshold'],
+                'sell_threshold': best_result['sell_threshold'],
+                'total_pnl': float(best_result['total_pnl']),
+            }
+        progress_callback(
+            completed=completed,
+            total=total_tests,
+            bars_processed=bars_processed,
+            best=best,
+            current=current,
+        )
     
     for buy_th in buy_values:
         for sell_th in sell_values:
             current_test += 1
             print(f"\n📊 Test {current_test}/{total_tests}: BUY={buy_th}, SELL={sell_th}")
+            current = {'buy_threshold': buy_th, 'sell_threshold': sell_th}
+            combo_bars = [0]
+            
+            def on_bars(bars_done, total_bars):
+                combo_bars[0] = total_bars
+                report(current_test - 1, bars_finished + bars_done, current)
             
             try:
                 backtest_result = run_backtest_with_params(
@@ -266,9 +379,12 @@ def optimize_rsi_thresholds(
                     data_file_path,
                     silent=True,
                     direction_mode=direction_mode,
+                    progress_callback=on_bars if progress_callback is not None else None,
+                    engine=engine,
+                    summary_only=True,
                 )
                 # Extract summary từ kết quả (hỗ trợ cả tuple và dict)
-                summary, _ = _extract_backtest_result(backtest_result)
+                summary, engine = _extract_backtest_result(backtest_result)
                 pnl = summary.get('total_pnl', 0)
                 
                 result = {
@@ -287,15 +403,21 @@ def optimize_rsi_thresholds(
                     best_result = result
                     print(f"   ✅ MỚI: Kết quả tốt nhất hiện tại!")
                     
+            except JobCancelled:
+                # Job bị hủy (raise từ progress callback): dừng tối ưu ngay
+                raise
             except (FileNotFoundError, ValueError, KeyError, AttributeError) as e:
                 # Lỗi khi chạy backtest với tham số này - bỏ qua và tiếp tục test tiếp theo
                 print(f"   ❌ Lỗi: {e}")
-                continue
             except Exception as e:
                 # Lỗi không lường trước - log và tiếp tục
                 print(f"   ❌ Lỗi không xác định: {e}")
                 traceback.print_exc()
-                continue
+
+            bars_finished += combo_bars[0]
+            # Gọi ngoài try/except để exception từ callback (ví dụ hủy job) không bị nuốt
+            if progress_callback is not None:
+                report(current_test, bars_finished, current)
     
     print("\n" + "=" * 60)
     print("✅ HOÀN THÀNH TỐI ƯU")
@@ -315,3 +437,237 @@ def optimize_rsi_thresholds(
         'all_results': all_results
     }
 
+
+def serialize_event(event):
+    """Convert one engine event to a JSON-serializable dict"""
+    event_dict = {
+        'type': event.get('type'),
+        'timestamp': event.get('timestamp'),
+        'price': event.get('price'),
+        'rsi': event.get('rsi'),
+    }
+    # Add optional fields
+    if 'entry_number' in event:
+        event_dict['entry_number'] = event['entry_number']
+    if 'direction' in event:
+        event_dict['direction'] = event['direction']
+    if 'should_trade' in event:
+        event_dict['should_trade'] = event['should_trade']
+    if 'entry_count' in event:
+        event_dict['entry_count'] = event['entry_count']
+    # Convert timestamp to ISO string if it's a pandas Timestamp
+    if hasattr(event.get('timestamp'), 'isoformat'):
+        event_dict['timestamp'] = event['timestamp'].isoformat()
+    elif isinstance(event.get('timestamp'), pd.Timestamp):
+        event_dict['timestamp'] = event['timestamp'].isoformat()
+    return event_dict
+
+
+def convert_events_to_serializable(engine):
+    """Convert engine events to JSON-serializable format"""
+    if engine and hasattr(engine, 'events'):
+        return [serialize_event(event) for event in engine.events]
+    return []
+
+
+def equity_arrays(engine):
+    """
+    Equity curve của engine dạng mảng (lưu kèm kết quả job cho /equity).
+
+    Returns:
+        dict: {"t": int64 epoch seconds, "equity": float64}
+    """
+    if engine is None or not len(engine.equity_values):
+        return {"t": np.empty(0, dtype=np.int64), "equity": np.empty(0)}
+    stamps = pd.DatetimeIndex(engine.equity_index)
+    if stamps.tz is not None:
+        stamps = stamps.tz_convert('UTC').tz_localize(None)
+    return {
+        "t": stamps.as_unit('ns').asi8 // 10**9,
+        # Copy: buffer của engine bị ghi đè nếu engine được chạy lại
+        "equity": np.array(engine.equity_values, dtype=np.float64),
+    }
+
+
+def cycle_arrays(engine):
+    """
+    Bảng chu kỳ của engine dạng cột (lưu kèm kết quả job cho /cycles).
+
+    Returns:
+        dict: Columns of BacktestEngine.cycle_table, entry_time/exit_time as
+            int64 epoch seconds (UTC) and direction as a list of "BUY"/"SELL"
+    """
+    if engine is None:
+        return {}
+    table = engine.cycle_table()
+    table["entry_time"] = table["entry_time"] // 10**9
+    table["exit_time"] = table["exit_time"] // 10**9
+    table["direction"] = table["direction"].tolist()
+    return table
+
+
+def run_backtest_job(params: dict, progress_callback=None):
+    """
+    Chạy một yêu cầu backtest của web app (thủ công hoặc tự động tối ưu).
+
+    Hàm top-level, nhận/trả dict thuần để chạy được trong worker process
+    của job queue.
+
+    Args:
+        params: Dict theo BacktestRequest (buy_threshold, sell_threshold, lot_data,
+            data_file_path, direction_mode, entry_rsi, exit_rsi, break_rsi, auto_optimize)
+        progress_callback: Optional callable nhận progress dạng keyword
+
+    Returns:
+        dict: Response của /api/backtest, kèm 'params' là tham số đã dùng cho lần chạy cuối
+            'equity_curve' (mảng t/equity, xem equity_arrays) và 'cycles' (xem cycle_arrays)
+    """
+    lot_data = params.get("lot_data", [])
+    data_file_path = params.get("data_file_path")
+    direction = str(params.get("direction_mode", "BUY")).upper()
+
+    if params.get("auto_optimize"):
+        # Chế độ tự động tối ưu
+        result = optimize_rsi_thresholds(
+            lot_data,
+            data_file_path,
+            buy_range=DEFAULT_OPTIMIZE_BUY_RANGE,
+            sell_range=DEFAULT_OPTIMIZE_SELL_RANGE,
+            step=DEFAULT_OPTIMIZE_STEP,
+            direction_mode=direction,
+            progress_callback=progress_callback,
+        )
+
+        # Chạy lại với tham số tốt nhất để lấy engine
+        best_buy = result.get('buy_threshold', 30)
+        best_sell = result.get('sell_threshold', 65)
+        if direction == "BUY":
+            buy_th, sell_th = best_buy, 100.0
+        else:
+            buy_th, sell_th = 0.0, best_sell
+
+        _, engine = run_backtest_with_params(
+            buy_th,
+            sell_th,
+            lot_data,
+            data_file_path,
+            silent=True,
+            direction_mode=direction,
+        )
+
+        return {
+            "success": True,
+            "optimized": True,
+            "best_buy_threshold": best_buy,
+            "best_sell_threshold": best_sell,
+            "summary": result.get('summary', {}),
+            "all_results": result.get('all_results', []),
+            "events": convert_events_to_serializable(engine),
+            "equity_curve": equity_arrays(engine),
+            "cycles": cycle_arrays(engine),
+            "params": {
+                "buy_threshold": buy_th,
+                "sell_threshold": sell_th,
+                "lot_data": lot_data,
+                "direction_mode": direction,
+            },
+        }
+
+    # Chế độ thủ công
+    entry_rsi = params.get("entry_rsi")
+    if direction == "BUY":
+        buy_th = entry_rsi or params.get("buy_threshold")
+        sell_th = 100.0
+    else:
+        buy_th = 0.0
+        sell_th = entry_rsi or params.get("sell_threshold")
+
+    run_params = {
+        "buy_threshold": buy_th,
+        "sell_threshold": sell_th,
+        "lot_data": lot_data,
+        "direction_mode": direction,
+        "entry_rsi": entry_rsi,
+        "exit_rsi": params.get("exit_rsi"),
+        "break_rsi": params.get("break_rsi"),
+    }
+    summary, engine = run_backtest_with_params(
+        data_file_path=data_file_path,
+        silent=True,
+        progress_callback=progress_callback,
+        **run_params,
+    )
+
+    return {
+        "success": True,
+        "optimized": False,
+        "summary": summary,
+        "events": convert_events_to_serializable(engine),
+        "equity_curve": equity_arrays(engine),
+        "cycles": cycle_arrays(engine),
+        "params": run_params,
+    }
+
+
+def render_chart_job(params: dict, progress_callback=None):
+    """
+    Chạy lại backtest và vẽ biểu đồ PNG vào chart cache (chạy trong worker của pool vẽ chart).
+
+    File được ghi ra file tạm rồi rename sang chart_<key>.png, nên request
+    khác chỉ thấy PNG khi đã vẽ xong.
+
+    Args:
+        params: Dict với keys 'key', 'directory' (chart cache), 'data_file_path',
+            'run_params' (tham số run_backtest_with_params), 'max_bars', 'buckets', 'title'
+        progress_callback: Không dùng (giữ chữ ký job)
+
+    Returns:
+        dict: {"filename", "bars", "events", "seconds"}
+    """
+    # Import khi cần: matplotlib/mplfinance chỉ nạp trong worker vẽ chart.
+    # Worker không có màn hình: chọn backend Agg trước khi pyplot được import
+    import matplotlib
+    matplotlib.use("Agg")
+    from src.utils.chart_cache import ChartCache
+    from src.utils.chart_visualizer import ChartVisualizer, DEFAULT_BUCKETS
+    import matplotlib.pyplot as plt
+
+    started = time.perf_counter()
+    run_params = dict(params["run_params"])
+    direction = str(run_params.get("direction_mode", "BUY")).upper()
+    _, engine = run_backtest_with_params(
+        data_file_path=params["data_file_path"],
+        silent=True,
+        **run_params,
+    )
+    events = [event for event in (engine.events or []) if isinstance(event, dict)]
+
+    title = params.get("title")
+    if not title:
+        entries = sum(1 for event in events if event.get('type') == 'entry')
+        exits = sum(1 for event in events if event.get('type') == 'exit')
+        title = f"XAUUSD Backtest {direction} - {entries} entries, {exits} exits"
+
+    cache = ChartCache(params["directory"])
+    partial = cache.partial_path(params["key"])
+    partial.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        ChartVisualizer(data=engine.data, events=events).plot(
+            title=title,
+            save_path=str(partial),
+            show=False,
+            max_bars=params.get("max_bars"),
+            buckets=params.get("buckets") or DEFAULT_BUCKETS,
+        )
+        os.replace(partial, cache.path_for(params["key"]))
+    finally:
+        # Worker sống lâu: không giữ figure giữa các lần vẽ
+        plt.close('all')
+        partial.unlink(missing_ok=True)
+
+    return {
+        "filename": cache.filename(params["key"]),
+        "bars": len(engine.data),
+        "events": len(events),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
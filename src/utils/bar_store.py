@@ -0,0 +1,423 @@
+"""
+Bar Store - Lưu nến OHLCV dạng nhị phân và kim tự tháp resolution M1→M5→M15→H1→H4→D1
+
+Mỗi dataset (một file CSV nguồn) có một thư mục trong store:
+- base.bin: nến gốc (record numpy cố định 48 byte, append-only)
+- M5.bin, H1.bin, ...: các level tổng hợp, mỗi level build từ level ngay dưới
+- meta.json: fingerprint file nguồn, số nến, interval gốc
+
+Khi có nến mới, chỉ phần đuôi được tính lại: nến tổng hợp cuối (có thể chưa
+đủ) bị ghi đè, các nến mới được nối thêm.
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+# Record của một nến trong file .bin
+BAR_DTYPE = np.dtype([
+    ('t', '<i8'),  # epoch seconds (UTC)
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+])
+
+# Level của kim tự tháp (tên, số giây), từ nhỏ đến lớn
+PYRAMID_LEVELS = [
+    ("M1", 60),
+    ("M5", 300),
+    ("M15", 900),
+    ("H1", 3600),
+    ("H4", 14400),
+    ("D1", 86400),
+]
+LEVEL_SECONDS = dict(PYRAMID_LEVELS)
+
+# Tên khác được chấp nhận cho resolution (TradingView / pandas)
+RESOLUTION_ALIASES = {
+    "1": "M1", "1min": "M1",
+    "5": "M5", "5min": "M5",
+    "15": "M15", "15min": "M15",
+    "60": "H1", "1h": "H1",
+    "240": "H4", "4h": "H4",
+    "1D": "D1", "D": "D1", "1d": "D1",
+}
+
+DEFAULT_STORE_DIR = "data/store"
+
+# Lock file cũ hơn thời gian này (giây) coi như bị bỏ lại bởi process đã chết
+LOCK_STALE_SECONDS = 120
+
+
+def normalize_resolution(resolution: str) -> str:
+    """
+    Chuẩn hóa tên resolution về tên level (M1, M5, M15, H1, H4, D1).
+
+    Raises:
+        ValueError: If resolution is not a pyramid level
+    """
+    name = RESOLUTION_ALIASES.get(str(resolution), str(resolution).upper())
+    if name not in LEVEL_SECONDS:
+        raise ValueError(
+            f"Unsupported resolution: {resolution}. "
+            f"Supported: {', '.join(LEVEL_SECONDS)}"
+        )
+    return name
+
+
+def frame_to_records(df: pd.DataFrame) -> np.ndarray:
+    """
+    Convert OHLCV DataFrame (DatetimeIndex, naive = UTC) to BAR_DTYPE records.
+
+    Args:
+        df: DataFrame with open/high/low/close(/volume) columns
+
+    Returns:
+        numpy.ndarray: Records sorted by time
+    """
+    index = df.index
+    if getattr(index, 'tz', None) is not None:
+        index = index.tz_convert('UTC').tz_localize(None)
+    records = np.empty(len(df), dtype=BAR_DTYPE)
+    records['t'] = pd.DatetimeIndex(index).as_unit('ns').asi8 // 10**9
+    for col in ('open', 'high', 'low', 'close'):
+        records[col] = df[col].to_numpy(dtype=np.float64)
+    if 'volume' in df.columns:
+        records['volume'] = np.nan_to_num(df['volume'].to_numpy(dtype=np.float64))
+    else:
+        records['volume'] = 0.0
+    if len(records) > 1 and np.any(np.diff(records['t']) < 0):
+        records = records[np.argsort(records['t'], kind='stable')]
+    return records
+
+
+def records_to_frame(records: np.ndarray) -> pd.DataFrame:
+    """
+    Convert BAR_DTYPE records to a DataFrame like DataLoader.load_csv returns.
+
+    Returns:
+        pandas.DataFrame: OHLCV with naive (UTC) DatetimeIndex named 'timestamp'
+    """
+    index = pd.DatetimeIndex(pd.to_datetime(records['t'], unit='s'), name='timestamp')
+    return pd.DataFrame(
+        {col: np.asarray(records[col]) for col in ('open', 'high', 'low', 'close', 'volume')},
+        index=index,
+    )
+
+
+def aggregate_records(records: np.ndarray, seconds: int) -> np.ndarray:
+    """
+    Gom nến lên khung `seconds` (bucket theo epoch UTC, bỏ bucket rỗng).
+
+    Giống df.resample(freq).agg(first/max/min/last/sum).dropna() nhưng làm
+    trực tiếp trên mảng đã sắp xếp bằng reduceat.
+
+    Args:
+        records: Sorted BAR_DTYPE records
+        seconds: Target bar size in seconds
+
+    Returns:
+        numpy.ndarray: Aggregated BAR_DTYPE records
+    """
+    if len(records) == 0:
+        return np.empty(0, dtype=BAR_DTYPE)
+    buckets = records['t'] - records['t'] % seconds
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(records)] - 1
+
+    out = np.empty(len(starts), dtype=BAR_DTYPE)
+    out['t'] = buckets[starts]
+    out['open'] = records['open'][starts]
+    out['high'] = np.maximum.reduceat(records['high'], starts)
+    out['low'] = np.minimum.reduceat(records['low'], starts)
+    out['close'] = records['close'][ends]
+    out['volume'] = np.add.reduceat(records['volume'], starts)
+    return out
+
+
+class _StoreLock:
+    """Lock liên process đơn giản bằng file tạo với O_EXCL."""
+
+    def __init__(self, path: Path, timeout: float = 60.0):
+        self.path = path
+        self.timeout = timeout
+
+    def __enter__(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.close(fd)
+                return self
+            except FileExistsError:
+                try:
+                    if time.time() - self.path.stat().st_mtime > LOCK_STALE_SECONDS:
+                        self.path.unlink()
+                        continue
+                except FileNotFoundError:
+                    continue
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Timed out waiting for lock: {self.path}")
+                time.sleep(0.05)
+
+    def __exit__(self, *exc):
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class BarPyramid:
+    """
+    Kim tự tháp OHLC đã lưu của một file data nguồn.
+
+    Usage:
+        pyramid = BarPyramid("data/raw/xauusd_m1.csv")
+        if pyramid.is_stale():
+            pyramid.sync(DataLoader().load_csv("data/raw/xauusd_m1.csv"))
+        h4 = pyramid.read("H4")
+    """
+
+    def __init__(self, source_path, store_dir: Optional[str] = None):
+        """
+        Initialize pyramid for a source file.
+
+        Args:
+            source_path: Source data file (CSV)
+            store_dir: Root directory of the bar store (default: data/store)
+        """
+        self.source_path = Path(source_path).resolve()
+        digest = hashlib.sha1(str(self.source_path).encode('utf-8')).hexdigest()[:10]
+        self.directory = Path(store_dir or DEFAULT_STORE_DIR) / f"{self.source_path.stem}-{digest}"
+        self.meta = self._read_meta()
+
+    def _read_meta(self) -> Optional[Dict]:
+        try:
+            with open(self.directory / "meta.json", 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_meta(self, meta: Dict):
+        tmp = self.directory / "meta.json.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp, self.directory / "meta.json")
+        self.meta = meta
+
+    def _source_fingerprint(self) -> List[int]:
+        stat = self.source_path.stat()
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def is_stale(self) -> bool:
+        """True nếu store chưa có hoặc file nguồn đã thay đổi từ lần sync trước."""
+        self.meta = self._read_meta()
+        if self.meta is None:
+            return True
+        try:
+            return self.meta.get("fingerprint") != self._source_fingerprint()
+        except FileNotFoundError:
+            return False
+
+    @property
+    def base_interval(self) -> Optional[int]:
+        """Interval (giây) của nến gốc, None nếu chưa sync."""
+        return self.meta["base_interval"] if self.meta else None
+
+    @property
+    def levels(self) -> List[str]:
+        """Các level đọc được (từ interval gốc trở lên)."""
+        return list(self.meta["levels"]) if self.meta else []
+
+    def _level_path(self, level: str) -> Path:
+        if self.meta and LEVEL_SECONDS[level] == self.meta["base_interval"]:
+            return self.directory / "base.bin"
+        return self.directory / f"{level}.bin"
+
+    @staticmethod
+    def _read_file(path: Path, count: Optional[int] = None, mmap: bool = False) -> np.ndarray:
+        """
+        Đọc records của một file .bin.
+
+        mmap=True chỉ dùng nội bộ khi đang giữ lock (không copy); kết quả trả
+        ra ngoài luôn là bản copy để file có thể bị cắt/ghi tiếp an toàn.
+        """
+        if not path.exists() or path.stat().st_size == 0 or count == 0:
+            return np.empty(0, dtype=BAR_DTYPE)
+        if mmap:
+            records = np.memmap(path, dtype=BAR_DTYPE, mode='r')
+            return records[:count] if count is not None else records
+        return np.fromfile(path, dtype=BAR_DTYPE, count=-1 if count is None else count)
+
+    @staticmethod
+    def _replace_tail(path: Path, from_position: int, records: np.ndarray):
+        """Cắt file tại record `from_position` rồi nối `records` (chỉ ghi phần đuôi)."""
+        with open(path, 'r+b' if path.exists() else 'w+b') as f:
+            f.truncate(from_position * BAR_DTYPE.itemsize)
+            f.seek(0, os.SEEK_END)
+            f.write(records.tobytes())
+
+    @staticmethod
+    def _detect_interval(times: np.ndarray) -> int:
+        diffs = np.diff(times)
+        diffs = diffs[diffs > 0]
+        if len(diffs) == 0:
+            return PYRAMID_LEVELS[0][1]
+        return int(np.median(diffs))
+
+    def sync(self, df: pd.DataFrame) -> Dict:
+        """
+        Đồng bộ store với toàn bộ dữ liệu nguồn.
+
+        Nếu dữ liệu mới chỉ là dữ liệu cũ + nến nối thêm (mọi nến đã lưu giữ
+        nguyên) thì chỉ append phần mới; ngược lại build lại toàn bộ.
+
+        Args:
+            df: Full source data (as returned by DataLoader.load_csv)
+
+        Returns:
+            dict: Store metadata
+        """
+        records = frame_to_records(df)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with _StoreLock(self.directory / ".lock"):
+            self.meta = self._read_meta()
+            rows = self.meta["rows"] if self.meta else 0
+            base = self._read_file(self.directory / "base.bin", rows, mmap=True) if rows else None
+
+            # Append-only khi toàn bộ phần đã lưu trùng từng byte với dữ liệu mới
+            # (file sửa giữa chừng mà giữ nguyên số dòng -> build lại)
+            if (
+                base is not None
+                and len(base) == rows
+                and len(records) >= rows
+                and np.array_equal(records[:rows].view(np.uint8), base.view(np.uint8))
+            ):
+                new = records[rows:]
+                del base
+                if len(new):
+                    self._append_locked(new)
+            else:
+                del base
+                self._rebuild_locked(records)
+
+            meta = dict(self.meta)
+            meta["fingerprint"] = self._source_fingerprint()
+            self._write_meta(meta)
+        return self.meta
+
+    def append(self, df: pd.DataFrame) -> int:
+        """
+        Nối các nến gốc mới (chỉ nến sau nến cuối cùng đã lưu) và cập nhật các level.
+
+        Args:
+            df: New base bars
+
+        Returns:
+            int: Number of bars appended
+        """
+        records = frame_to_records(df)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with _StoreLock(self.directory / ".lock"):
+            self.meta = self._read_meta()
+            if self.meta is None:
+                self._rebuild_locked(records)
+                return len(records)
+            new = records[records['t'] > self.meta["last"]] if self.meta["rows"] else records
+            if len(new):
+                self._append_locked(new)
+            return len(new)
+
+    def _rebuild_locked(self, records: np.ndarray):
+        interval = self._detect_interval(records['t'])
+        levels = [name for name, seconds in PYRAMID_LEVELS if seconds >= interval]
+        for path in self.directory.glob("*.bin"):
+            path.unlink()
+        self.meta = {
+            "source": str(self.source_path),
+            "base_interval": interval,
+            "levels": levels,
+            "rows": 0,
+            "first": None,
+            "last": None,
+            "level_rows": {},
+        }
+        self._append_locked(records)
+
+    def _append_locked(self, new: np.ndarray):
+        """Ghi nến gốc mới rồi tính lại phần đuôi của từng level (lock đang giữ)."""
+        if len(new) == 0:
+            self._write_meta(self.meta)
+            return
+        meta = dict(self.meta)
+        rows = meta["rows"]
+        self._replace_tail(self.directory / "base.bin", rows, new)
+        meta["rows"] = rows + len(new)
+        meta["first"] = meta["first"] if meta["first"] is not None else int(new['t'][0])
+        meta["last"] = int(new['t'][-1])
+        level_rows = dict(meta["level_rows"])
+
+        lower_path = self.directory / "base.bin"
+        lower_count = meta["rows"]
+        changed_from = int(new['t'][0])  # Thời điểm đầu tiên bị thay đổi ở level dưới
+        for level in meta["levels"]:
+            seconds = LEVEL_SECONDS[level]
+            if seconds == meta["base_interval"]:
+                continue  # Level trùng nến gốc đọc thẳng base.bin
+            path = self.directory / f"{level}.bin"
+            stored = self._read_file(path, level_rows.get(level, 0), mmap=True)
+
+            # Bucket đầu tiên bị ảnh hưởng: tính lại từ đó tới hết
+            bucket_start = changed_from - changed_from % seconds
+            lower = self._read_file(lower_path, lower_count, mmap=True)
+            lower_from = int(np.searchsorted(lower['t'], bucket_start, side='left'))
+            tail = aggregate_records(np.array(lower[lower_from:]), seconds)
+            keep = int(np.searchsorted(stored['t'], bucket_start, side='left'))
+            del stored, lower
+
+            self._replace_tail(path, keep, tail)
+            level_rows[level] = keep + len(tail)
+            lower_path, lower_count, changed_from = path, level_rows[level], bucket_start
+
+        meta["level_rows"] = level_rows
+        self._write_meta(meta)
+
+    def read_records(self, resolution: str) -> np.ndarray:
+        """
+        Records của một level (memmap, chỉ đọc).
+
+        Raises:
+            ValueError: If store is empty or level is finer than the base data
+        """
+        level = normalize_resolution(resolution)
+        if self.meta is None:
+            raise ValueError(f"Bar store not built for: {self.source_path}")
+        if level not in self.meta["levels"]:
+            raise ValueError(
+                f"Resolution {level} is finer than the source data "
+                f"({self.meta['base_interval']}s bars)"
+            )
+        if LEVEL_SECONDS[level] == self.meta["base_interval"]:
+            count = self.meta["rows"]
+        else:
+            count = self.meta["level_rows"].get(level, 0)
+        return self._read_file(self._level_path(level), count)
+
+    def read(self, resolution: str) -> pd.DataFrame:
+        """DataFrame OHLCV của một level (index naive UTC tên 'timestamp')."""
+        return records_to_frame(self.read_records(resolution))
+
+    def read_base(self) -> pd.DataFrame:
+        """DataFrame của nến gốc."""
+        if self.meta is None:
+            raise ValueError(f"Bar store not built for: {self.source_path}")
+        return records_to_frame(self._read_file(self.directory / "base.bin", self.meta["rows"]))
@@ -2,46 +2,128 @@
 Calculator - P&L and metric calculations
 """
 
+import numpy as np
+
+from src.config.strategy_config import TRADING_DEFAULTS, compile_config
+
+
+# XAUUSD: 1 lot = 100 oz, 1 pip = 0.1 USD
+CONTRACT_SIZE = TRADING_DEFAULTS["contract_size"]
+DEFAULT_PIP_SIZE = TRADING_DEFAULTS["pip_size"]
+
+# Mã hướng lệnh dùng trong các phép tính theo mảng
+DIRECTION_CODES = {"BUY": 1, "SELL": -1}
+
+
+def direction_codes(directions) -> np.ndarray:
+    """Hướng lệnh -> mảng float 1 (BUY) / -1 (SELL) / 0; nhận mã số hoặc chuỗi."""
+    directions = np.asarray(directions)
+    if directions.dtype.kind in "iuf":
+        return directions.astype(np.float64)
+    return np.where(directions == "BUY", 1.0, np.where(directions == "SELL", -1.0, 0.0))
+
 
 class PnLCalculator:
     """
     Calculate P&L for XAUUSD positions.
+
+    Giá trong data là giá giữa (mid): mỗi lệnh trả nửa spread + slippage khi
+    vào và khi ra, cộng commission mỗi lot (khứ hồi). Tất cả hàm tính theo
+    mảng: một lần gọi cho cả cụm lệnh hoặc toàn bộ sổ lệnh, không lặp từng lệnh.
     """
-    
-    def __init__(self, spread_pips=3, slippage_pips=1, commission_per_lot=0):
+
+    def __init__(self, spread_pips=TRADING_DEFAULTS["spread_pips"],
+                 slippage_pips=TRADING_DEFAULTS["slippage_pips"],
+                 commission_per_lot=TRADING_DEFAULTS["commission_per_lot"],
+                 pip_size=DEFAULT_PIP_SIZE, contract_size=CONTRACT_SIZE):
         """
         Initialize P&L calculator.
-        
+
         Args:
             spread_pips: Bid-ask spread in pips
-            slippage_pips: Slippage in pips
-            commission_per_lot: Commission per lot
+            slippage_pips: Slippage in pips (mỗi lần khớp lệnh)
+            commission_per_lot: Commission per lot (round turn)
+            pip_size: Price value of one pip (XAUUSD: 0.1)
+            contract_size: Units per lot (XAUUSD: 100 oz)
         """
         self.spread_pips = spread_pips
         self.slippage_pips = slippage_pips
         self.commission_per_lot = commission_per_lot
-    
+        self.pip_size = pip_size
+        self.contract_size = contract_size
+        # Chi phí khứ hồi cho 1 lot: spread + slippage 2 chiều + commission
+        self.cost_per_lot = (
+            (spread_pips + 2 * slippage_pips) * pip_size * contract_size + commission_per_lot
+        )
+
+    @classmethod
+    def from_config(cls, config) -> "PnLCalculator":
+        """
+        Calculator theo section `trading` của config.
+
+        Args:
+            config: StrategyConfig, dict or StrategySettings
+        """
+        settings = compile_config(config)
+        return cls(
+            spread_pips=settings.spread_pips,
+            slippage_pips=settings.slippage_pips,
+            commission_per_lot=settings.commission_per_lot,
+            pip_size=settings.pip_size,
+            contract_size=settings.contract_size,
+        )
+
     def calculate_pnl(self, entry_price, exit_price, lot_size, direction):
         """
         Calculate P&L for a position.
-        
+
         Args:
             entry_price: Entry price
             exit_price: Exit price
             lot_size: Lot size
             direction: "BUY" or "SELL"
-            
+
         Returns:
             float: P&L in account currency
         """
-        # TODO: Implement P&L calculation
-        # For XAUUSD:
-        # - BUY: P&L = (exit_price - entry_price) * lot_size * contract_size
-        # - SELL: P&L = (entry_price - exit_price) * lot_size * contract_size
-        # - Subtract spread, slippage, commission
-        
-        return 0.0
-    
+        return float(self.calculate_pnl_batch(entry_price, exit_price, lot_size, [direction])[0])
+
+    def calculate_pnl_batch(self, entry_prices, exit_prices, lot_sizes, directions):
+        """
+        P&L của nhiều lệnh trong một lần tính (broadcast theo NumPy).
+
+        - BUY: (exit - entry) * lot * contract_size - lot * cost_per_lot
+        - SELL: (entry - exit) * lot * contract_size - lot * cost_per_lot
+
+        Args:
+            entry_prices: Entry prices (array or scalar)
+            exit_prices: Exit prices (array or scalar, e.g. one exit price for a DCA cycle)
+            lot_sizes: Lot sizes
+            directions: Direction codes (1 BUY / -1 SELL / 0) or "BUY"/"SELL" strings
+
+        Returns:
+            numpy.ndarray: P&L per position (0 for unknown direction)
+        """
+        codes = direction_codes(directions)
+        entry_prices = np.asarray(entry_prices, dtype=np.float64)
+        exit_prices = np.asarray(exit_prices, dtype=np.float64)
+        lot_sizes = np.asarray(lot_sizes, dtype=np.float64)
+        pnl = codes * (exit_prices - entry_prices) * lot_sizes * self.contract_size
+        if self.cost_per_lot:
+            pnl = pnl - np.abs(codes) * lot_sizes * self.cost_per_lot
+        return pnl
+
+    def reprice(self, book) -> np.ndarray:
+        """
+        Tính lại P&L của sổ lệnh (PositionBook) với chi phí của calculator này.
+
+        Dùng để so sánh các giả định spread/commission mà không chạy lại backtest.
+
+        Returns:
+            numpy.ndarray: P&L per position (NaN for positions still open)
+        """
+        return self.calculate_pnl_batch(book.entry_price, book.exit_price, book.lot_size, book.direction)
+
     def calculate_average_entry_price(self, positions):
         """
         Calculate weighted average entry price for multiple positions.
@@ -67,8 +149,16 @@ class PnLCalculator:
 class MetricsCalculator:
     """
     Calculate backtest metrics (win rate, drawdown, etc.)
+
+    Mọi phép tính chạy trên mảng NumPy (equity theo nến, số lệnh mở theo nến,
+    các cột của PositionBook), không lặp từng nến/lệnh trong Python, nên
+    calculate_metrics() đủ nhẹ để gọi sau mỗi lần chạy của optimizer.
     """
-    
+
+    # Gom lợi nhuận theo ngày, năm hóa với 252 ngày giao dịch
+    PERIOD_SECONDS = 86400
+    PERIODS_PER_YEAR = 252
+
     @staticmethod
     def calculate_win_rate(positions):
         """
@@ -92,20 +182,277 @@ class MetricsCalculator:
         Calculate maximum drawdown.
         
         Args:
-            equity_curve: List of equity values over time
+            equity_curve: Equity values over time (list or array)
             
         Returns:
-            float: Maximum drawdown
+            float: Maximum drawdown in percent of the running peak
         """
-        if not equity_curve:
-            return 0.0
-        
-        # TODO: Implement max drawdown calculation
-        return 0.0
+        return MetricsCalculator.drawdown_stats(equity_curve)["max_drawdown"]
 
+    @staticmethod
+    def drawdown_stats(equity, times=None) -> dict:
+        """
+        Drawdown lớn nhất (% và tiền) và thời gian nằm dưới đỉnh lâu nhất.
 
+        Args:
+            equity: Equity values over time
+            times: Optional int64 timestamps (ns) aligned with equity
+
+        Returns:
+            dict: max_drawdown (%), max_drawdown_amount, max_drawdown_bars
+            (số nến từ đỉnh đến khi lấy lại đỉnh, hoặc đến hết dữ liệu) and
+            max_drawdown_days (None without times)
+        """
+        equity = np.asarray(equity, dtype=np.float64)
+        stats = {"max_drawdown": 0.0, "max_drawdown_amount": 0.0, "max_drawdown_bars": 0,
+                 "max_drawdown_days": 0.0 if times is not None else None}
+        if not len(equity):
+            return stats
+
+        peak = np.maximum.accumulate(equity)
+        drop = peak - equity
+        with np.errstate(divide='ignore', invalid='ignore'):
+            drawdown = np.where(peak > 0, drop / peak * 100, 0.0)
+        stats["max_drawdown"] = max(float(drawdown.max()), 0.0)
+        stats["max_drawdown_amount"] = max(float(drop.max()), 0.0)
+
+        # Vị trí đỉnh gần nhất của mỗi nến -> độ dài giai đoạn dưới đỉnh
+        positions = np.arange(len(equity))
+        last_peak = np.maximum.accumulate(np.where(drop <= 0, positions, 0))
+        stats["max_drawdown_bars"] = int((positions - last_peak).max())
+        if times is not None:
+            times = np.asarray(times, dtype=np.int64)
+            stats["max_drawdown_days"] = float((times - times[last_peak]).max()) / (86400 * 10**9)
+        return stats
+
+    @staticmethod
+    def period_returns(equity, times, period_seconds=PERIOD_SECONDS, start_equity=None) -> np.ndarray:
+        """
+        Lợi nhuận theo kỳ (mặc định theo ngày) từ equity cuối mỗi kỳ.
+
+        Args:
+            equity: Equity values over time
+            times: int64 timestamps (ns) aligned with equity (None = lợi nhuận theo nến)
+            period_seconds: Bucket length in seconds
+            start_equity: Equity before the first bar (e.g. initial capital)
+
+        Returns:
+            numpy.ndarray: Simple returns per period
+        """
+        equity = np.asarray(equity, dtype=np.float64)
+        if not len(equity):
+            return np.empty(0)
+        if times is not None:
+            buckets = np.asarray(times, dtype=np.int64) // (int(period_seconds) * 10**9)
+            # Nến cuối cùng của mỗi kỳ
+            last = np.append(np.flatnonzero(buckets[1:] != buckets[:-1]), len(equity) - 1)
+            equity = equity[last]
+        if start_equity is not None:
+            equity = np.concatenate(([float(start_equity)], equity))
+        if len(equity) < 2:
+            return np.empty(0)
+        previous = equity[:-1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = np.where(previous != 0, np.diff(equity) / previous, 0.0)
+        return returns
+
+    @staticmethod
+    def sharpe_sortino(returns, periods_per_year=PERIODS_PER_YEAR):
+        """
+        Sharpe và Sortino năm hóa (risk-free = 0).
+
+        Returns:
+            tuple: (sharpe, sortino), 0.0 khi không đủ dữ liệu hoặc độ lệch = 0
+        """
+        returns = np.asarray(returns, dtype=np.float64)
+        if len(returns) < 2:
+            return 0.0, 0.0
+        scale = np.sqrt(periods_per_year)
+        mean = returns.mean()
+        std = returns.std(ddof=1)
+        downside = np.sqrt(np.mean(np.minimum(returns, 0.0) ** 2))
+        sharpe = float(mean / std * scale) if std > 0 else 0.0
+        sortino = float(mean / downside * scale) if downside > 0 else 0.0
+        return sharpe, sortino
+
+    @staticmethod
+    def cycle_stats(book) -> dict:
+        """
+        Thống kê theo chu kỳ DCA (cụm lệnh đóng cùng lúc) từ PositionBook.
 
+        Profit factor tính trên P&L của chu kỳ (tổng lãi / tổng lỗ), None nếu
+        không có chu kỳ lỗ.
 
+        Returns:
+            dict: cycles, winning_cycles, cycle_win_rate (%), profit_factor,
+            gross_profit, gross_loss, avg/best/worst_cycle_pnl,
+            avg/max_cycle_positions, avg/max_cycle_bars
+        """
+        starts = book.cycle_starts()
+        stats = {
+            "cycles": len(starts), "winning_cycles": 0, "cycle_win_rate": 0.0,
+            "profit_factor": None, "gross_profit": 0.0, "gross_loss": 0.0,
+            "avg_cycle_pnl": 0.0, "best_cycle_pnl": 0.0, "worst_cycle_pnl": 0.0,
+            "avg_cycle_positions": 0.0, "max_cycle_positions": 0,
+            "avg_cycle_bars": 0.0, "max_cycle_bars": 0,
+        }
+        if not len(starts):
+            return stats
+
+        stop = book.open_start
+        pnl = np.add.reduceat(book.pnl[:stop], starts)
+        sizes = np.diff(np.append(starts, stop))
+        wins = pnl > 0
+        gross_profit = float(pnl[wins].sum())
+        gross_loss = float(-pnl[pnl < 0].sum())
+        stats.update(
+            winning_cycles=int(np.count_nonzero(wins)),
+            cycle_win_rate=float(np.count_nonzero(wins)) / len(pnl) * 100,
+            profit_factor=gross_profit / gross_loss if gross_loss > 0 else None,
+            gross_profit=gross_profit,
+            gross_loss=gross_loss,
+            avg_cycle_pnl=float(pnl.mean()),
+            best_cycle_pnl=float(pnl.max()),
+            worst_cycle_pnl=float(pnl.min()),
+            avg_cycle_positions=float(sizes.mean()),
+            max_cycle_positions=int(sizes.max()),
+        )
+        # Số nến giữ lệnh: từ lệnh đầu tiên đến nến EXIT (bỏ chu kỳ không có vị trí nến)
+        entry_bars = book.entry_bar[starts]
+        exit_bars = book.exit_bar[starts]
+        known = (entry_bars >= 0) & (exit_bars >= 0)
+        if known.any():
+            held = exit_bars[known] - entry_bars[known]
+            stats["avg_cycle_bars"] = float(held.mean())
+            stats["max_cycle_bars"] = int(held.max())
+        return stats
+
+    @staticmethod
+    def cycle_table(book, high=None, low=None, calculator: PnLCalculator = None) -> dict:
+        """
+        Bảng theo chu kỳ DCA (một dòng cho mỗi cụm lệnh đóng cùng lúc), dạng cột.
+
+        MAE/MFE là P&L thả nổi thấp nhất/cao nhất của cả cụm (đã trừ chi phí
+        đóng lệnh như get_current_equity), tính bằng high/low của các nến
+        giữ lệnh: lệnh mở ở giá close của nến k được tính từ nến k+1 đến nến
+        EXIT. Tổng lot/giá vốn theo nến dựng bằng cumsum, min/max theo từng
+        chu kỳ bằng np.minimum.reduceat / np.maximum.reduceat trên các đoạn
+        [nến sau lệnh đầu, nến EXIT].
+
+        Args:
+            book: PositionBook
+            high: High price per bar position (same positions as entry_bar/exit_bar)
+            low: Low price per bar position
+            calculator: PnLCalculator used for the run (contract size, closing costs)
+
+        Returns:
+            dict: numpy columns cycle, direction, entry_time, exit_time (int64 ns),
+            entry_bar, exit_bar, bars_held, positions, depth (entry_number cao nhất),
+            lots, avg_entry_price, exit_price, pnl, mae, mfe (NaN khi thiếu high/low
+            hoặc vị trí nến)
+        """
+        calculator = calculator or PnLCalculator(0, 0, 0)
+        starts = book.cycle_starts()
+        stop = book.open_start
+        count = len(starts)
+        sizes = np.diff(np.append(starts, stop)).astype(np.int64)
+        lot_size = book.lot_size[:stop]
+        entry_price = book.entry_price[:stop]
+        pnl = np.add.reduceat(book.pnl[:stop], starts) if count else np.empty(0)
+        lots = np.add.reduceat(lot_size, starts) if count else np.empty(0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            avg_entry = np.add.reduceat(lot_size * entry_price, starts) / lots if count else np.empty(0)
+        entry_bar = book.entry_bar[starts]
+        exit_bar = book.exit_bar[starts]
+        codes = book.direction[starts]
+
+        table = {
+            "cycle": np.arange(1, count + 1),
+            "direction": np.where(codes > 0, "BUY", np.where(codes < 0, "SELL", "")),
+            "entry_time": book.entry_time[starts],
+            "exit_time": book.exit_time[starts],
+            "entry_bar": entry_bar,
+            "exit_bar": exit_bar,
+            "bars_held": np.where((entry_bar >= 0) & (exit_bar >= 0), exit_bar - entry_bar, -1),
+            "positions": sizes,
+            "depth": np.maximum.reduceat(book.entry_number[:stop], starts) if count else np.empty(0, dtype=np.int32),
+            "lots": lots,
+            "avg_entry_price": avg_entry,
+            "exit_price": book.exit_price[starts],
+            "pnl": pnl,
+            "mae": np.full(count, np.nan),
+            "mfe": np.full(count, np.nan),
+        }
+        if not count or high is None or low is None:
+            return table
+        bars = book.entry_bar[:stop]
+        closes = book.exit_bar[:stop]
+        if bars.min() < 0 or closes.min() < 0:
+            return table
+
+        # Lot có dấu, giá vốn có dấu và khối lượng đang mở ở mỗi nến (lệnh tính từ nến sau nến vào)
+        total_bars = len(high)
+        signed = book.direction[:stop] * lot_size
+        open_lots = np.zeros(total_bars + 1)
+        open_cost = np.zeros(total_bars + 1)
+        open_volume = np.zeros(total_bars + 1)
+        for column, values in ((open_lots, signed), (open_cost, signed * entry_price),
+                               (open_volume, np.abs(signed))):
+            np.add.at(column, bars + 1, values)
+            np.subtract.at(column, closes + 1, values)
+        np.cumsum(open_lots, out=open_lots)
+        np.cumsum(open_cost, out=open_cost)
+        np.cumsum(open_volume, out=open_volume)
+
+        high = np.append(np.asarray(high, dtype=np.float64), 0.0)
+        low = np.append(np.asarray(low, dtype=np.float64), 0.0)
+        long_side = open_lots > 0
+        closing_cost = open_volume * calculator.cost_per_lot
+        worst = (open_lots * np.where(long_side, low, high) - open_cost) * calculator.contract_size - closing_cost
+        best = (open_lots * np.where(long_side, high, low) - open_cost) * calculator.contract_size - closing_cost
+
+        # Đoạn [nến sau lệnh đầu, nến EXIT] của từng chu kỳ, xen kẽ với khoảng trống giữa các chu kỳ
+        first = entry_bar + 1
+        last = exit_bar + 1
+        bounds = np.column_stack((first, last)).ravel()
+        held = last > first
+        mae = np.minimum.reduceat(worst, bounds)[::2]
+        mfe = np.maximum.reduceat(best, bounds)[::2]
+        # Chu kỳ không giữ qua nến nào (vào và đóng cùng nến): chỉ có P&L đã chốt
+        table["mae"] = np.minimum(np.where(held, mae, pnl), pnl)
+        table["mfe"] = np.maximum(np.where(held, mfe, pnl), pnl)
+        return table
+
+    @staticmethod
+    def calculate_metrics(equity, open_counts=None, times=None, book=None, initial_capital=None,
+                          period_seconds=PERIOD_SECONDS, periods_per_year=PERIODS_PER_YEAR) -> dict:
+        """
+        Bộ chỉ số hiệu suất của một lần backtest.
+
+        Args:
+            equity: Equity after each processed bar
+            open_counts: Open positions after each bar (for exposure)
+            times: int64 timestamps (ns) of the bars (None = lợi nhuận theo nến)
+            book: PositionBook (for cycle statistics and profit factor)
+            initial_capital: Equity before the first bar
+            period_seconds: Return resampling period for Sharpe/Sortino
+            periods_per_year: Annualization factor for Sharpe/Sortino
+
+        Returns:
+            dict: JSON-serializable metrics (drawdown_stats, sharpe, sortino,
+            return_periods, exposure (% nến có lệnh mở) and cycle_stats keys)
+        """
+        metrics = MetricsCalculator.drawdown_stats(equity, times)
 
+        returns = MetricsCalculator.period_returns(equity, times, period_seconds, initial_capital)
+        metrics["sharpe"], metrics["sortino"] = MetricsCalculator.sharpe_sortino(returns, periods_per_year)
+        metrics["return_periods"] = len(returns)
 
+        if open_counts is not None and len(open_counts):
+            metrics["exposure"] = float(np.count_nonzero(open_counts)) / len(open_counts) * 100
+        else:
+            metrics["exposure"] = 0.0
 
+        if book is not None:
+            metrics.update(MetricsCalculator.cycle_stats(book))
+        return metrics
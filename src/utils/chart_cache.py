@@ -0,0 +1,208 @@
+"""
+Chart Cache - Biểu đồ PNG đã render, đặt tên theo nội dung (content-addressed)
+
+Tên file là hash của (fingerprint dataset, cấu hình backtest, khoảng nến,
+style): cùng yêu cầu trên cùng file data luôn ra cùng tên, nên biểu đồ đã
+vẽ được dùng lại giữa các request (và sau khi restart server). File data
+đổi -> fingerprint đổi -> key mới; file cũ bị dọn theo tuổi/dung lượng.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.utils.dataset_registry import file_fingerprint
+
+
+# Tăng khi cách vẽ thay đổi để không dùng lại PNG cũ
+RENDER_VERSION = 1
+
+# Giới hạn mặc định của thư mục cache
+DEFAULT_MAX_AGE = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# File tạm chưa render xong (worker chết giữa chừng) bị xóa sau khoảng này
+PARTIAL_MAX_AGE = 3600
+
+CHART_PREFIX = "chart_"
+_CHART_NAME = re.compile(r"^chart_[0-9a-f]{40}\.png$")
+
+
+def chart_key(data_file, run_params: Dict, window: Dict, style: Dict) -> str:
+    """
+    Key của một biểu đồ: sha1 của dataset (đường dẫn + fingerprint) và các tham số vẽ.
+
+    Args:
+        data_file: Path to data CSV
+        run_params: Backtest parameters (thresholds, lot_data, direction...)
+        window: Bars shown (e.g. {"max_bars": 1000} or {"max_bars": None, "buckets": 1200})
+        style: Rendering options (title...)
+
+    Returns:
+        str: 40-char hex digest
+
+    Raises:
+        FileNotFoundError: If the data file does not exist
+    """
+    path = str(Path(data_file).resolve())
+    payload = {
+        "version": RENDER_VERSION,
+        "dataset": [path, list(file_fingerprint(path))],
+        "run": run_params,
+        "window": window,
+        "style": style,
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+class ChartCache:
+    """
+    Thư mục PNG theo key, dọn theo tuổi và tổng dung lượng.
+
+    - lookup(): đường dẫn PNG nếu đã có (cập nhật mtime = lần dùng gần nhất)
+    - partial_path(): file tạm để worker ghi, rename sang path_for() khi xong
+      nên không request nào đọc phải PNG ghi dở
+    - evict(): bỏ file quá max_age, sau đó file dùng lâu nhất cho đến khi
+      tổng dung lượng <= max_bytes
+    Chỉ quản lý file chart_<key>.png, không động vào file khác trong thư mục.
+    """
+
+    def __init__(self, directory: str = "results/charts", max_age: float = DEFAULT_MAX_AGE,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Initialize cache.
+
+        Args:
+            directory: Directory holding rendered charts
+            max_age: Seconds since last use before a chart is removed
+            max_bytes: Size budget of all cached charts
+        """
+        self.directory = Path(directory)
+        self.max_age = float(max_age)
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def filename(key: str) -> str:
+        return f"{CHART_PREFIX}{key}.png"
+
+    def path_for(self, key: str) -> Path:
+        """Đường dẫn PNG của key (có thể chưa tồn tại)."""
+        return self.directory / self.filename(key)
+
+    def partial_path(self, key: str) -> Path:
+        """File tạm cho một lần render của key (riêng cho mỗi process)."""
+        return self.directory / f".{CHART_PREFIX}{key}.{os.getpid()}.png"
+
+    def lookup(self, key: str) -> Optional[Path]:
+        """PNG của key nếu đã render và chưa quá hạn, ngược lại None."""
+        path = self.path_for(key)
+        try:
+            stat = path.stat()
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        now = time.time()
+        if now - stat.st_mtime > self.max_age:
+            path.unlink(missing_ok=True)
+            with self._lock:
+                self.misses += 1
+                self.evictions += 1
+            return None
+        # mtime = lần dùng gần nhất (cho evict theo LRU)
+        os.utime(path, (now, now))
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def resolve(self, filename: str) -> Optional[Path]:
+        """
+        Đường dẫn của một tên file chart (từ URL), None nếu tên không hợp lệ.
+
+        Chỉ nhận tên dạng chart_<key>.png nên không thể đọc file ngoài thư mục.
+        """
+        if not _CHART_NAME.match(filename):
+            return None
+        return self.directory / filename
+
+    @staticmethod
+    def key_of(filename: str) -> Optional[str]:
+        """Key trong tên file chart, None nếu tên không hợp lệ."""
+        if not _CHART_NAME.match(filename):
+            return None
+        return filename[len(CHART_PREFIX):-len(".png")]
+
+    def _files(self):
+        """(path, size, mtime) của các PNG trong cache."""
+        files = []
+        for path in self.directory.glob(f"{CHART_PREFIX}*.png"):
+            if not _CHART_NAME.match(path.name):
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((path, stat.st_size, stat.st_mtime))
+        return files
+
+    def evict(self) -> int:
+        """
+        Dọn cache theo max_age rồi max_bytes (file dùng lâu nhất bị xóa trước).
+
+        Returns:
+            int: Number of charts removed
+        """
+        if not self.directory.exists():
+            return 0
+        now = time.time()
+        removed = 0
+        with self._lock:
+            for path in self.directory.glob(f".{CHART_PREFIX}*.png"):
+                try:
+                    if now - path.stat().st_mtime > PARTIAL_MAX_AGE:
+                        path.unlink()
+                except OSError:
+                    pass
+
+            files = []
+            for path, size, mtime in self._files():
+                if now - mtime > self.max_age:
+                    path.unlink(missing_ok=True)
+                    removed += 1
+                else:
+                    files.append((mtime, size, path))
+
+            total = sum(size for _, size, _ in files)
+            for mtime, size, path in sorted(files, key=lambda item: item[0]):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                removed += 1
+            self.evictions += removed
+        return removed
+
+    def stats(self) -> Dict:
+        """Số file, dung lượng và giới hạn, hits/misses/evictions."""
+        files = self._files() if self.directory.exists() else []
+        with self._lock:
+            return {
+                "directory": str(self.directory),
+                "files": len(files),
+                "bytes": sum(size for _, size, _ in files),
+                "max_bytes": self.max_bytes,
+                "max_age": self.max_age,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
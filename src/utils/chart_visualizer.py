@@ -46,10 +46,39 @@ elif 'Agg' not in matplotlib.get_backend() and 'TkAgg' not in matplotlib.get_bac
 
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
+from matplotlib.lines import Line2D
 from matplotlib.patches import Rectangle
+from matplotlib.ticker import FuncFormatter
 from pathlib import Path
 from typing import Optional, List, Dict
 
+from src.utils.downsample import aggregate_ohlc, bucket_starts
+
+
+# Số bucket mặc định khi vẽ toàn bộ lịch sử (~ số cột pixel của vùng vẽ)
+DEFAULT_BUCKETS = 1200
+
+
+def _legend_handles():
+    """Legend cho các loại marker (entry BUY/SELL, exit, break)."""
+    return [
+        Line2D([0], [0], marker='^', color='w', markerfacecolor='#10b981',
+               markersize=12, label='Entry BUY', markeredgecolor='#ffffff', markeredgewidth=1.5),
+        Line2D([0], [0], marker='v', color='w', markerfacecolor='#ef4444',
+               markersize=12, label='Entry SELL', markeredgecolor='#ffffff', markeredgewidth=1.5),
+        Line2D([0], [0], marker='X', color='w', markerfacecolor='#f59e0b',
+               markersize=12, label='Exit', markeredgecolor='#ffffff', markeredgewidth=1.5),
+        Line2D([0], [0], marker='*', color='w', markerfacecolor='#9333ea',
+               markersize=12, label='Break/Stop Loss', markeredgecolor='#ffffff', markeredgewidth=1.5),
+    ]
+
+
+# Loại event được đánh dấu trên biểu đồ
+MARKER_TYPES = ('entry', 'exit', 'break')
+
+# Event lệch tối đa bao nhiêu so với nến gần nhất thì vẫn được đánh dấu
+EVENT_TOLERANCE = pd.Timedelta(hours=1)
+
 
 class ChartVisualizer:
     """
@@ -99,12 +128,274 @@ class ChartVisualizer:
                     # Đảm bảo RSI trong khoảng 0-100
                     self.data['rsi'] = self.data['rsi'].clip(0, 100)
 
+    def _event_markers(self, plot_index: pd.Index, tolerance: pd.Timedelta = EVENT_TOLERANCE) -> Dict[str, Dict]:
+        """
+        Gắn events vào vị trí nến trong plot_index.
+
+        Timestamp của event được khớp chính xác hoặc với nến gần nhất trong
+        khoảng `tolerance` (searchsorted trên index đã sắp xếp); event ngoài
+        khoảng vẽ bị bỏ. Nhiều event cùng loại trên một nến: giữ event cuối.
+
+        Args:
+            plot_index: DatetimeIndex của dữ liệu đang vẽ (tăng dần)
+            tolerance: Khoảng cách tối đa tới nến gần nhất
+
+        Returns:
+            dict: {"entry"|"exit"|"break": {"pos", "price", "entry_number", "entry_count",
+                   "direction", "should_trade"}} - mỗi field là numpy array
+        """
+        by_type = {event_type: [] for event_type in MARKER_TYPES}
+        for event in self.events:
+            if event.get('type') in by_type:
+                by_type[event['type']].append(event)
+
+        markers = {}
+        for event_type, events in by_type.items():
+            positions, events = self._align(events, plot_index, tolerance)
+            if len(positions):
+                # Giữ event cuối cùng của mỗi nến
+                reverse_unique = np.unique(positions[::-1], return_index=True)[1]
+                keep = len(positions) - 1 - reverse_unique
+                positions = positions[keep]
+                events = [events[i] for i in keep]
+            markers[event_type] = {
+                'pos': positions,
+                'price': np.array([event.get('price', np.nan) for event in events], dtype=float),
+                'entry_number': np.array([event.get('entry_number', 0) for event in events], dtype=int),
+                'entry_count': np.array([event.get('entry_count', 0) for event in events], dtype=int),
+                'direction': np.array([event.get('direction', 'BUY') for event in events], dtype=object),
+                'should_trade': np.array([bool(event.get('should_trade', False)) for event in events], dtype=bool),
+            }
+        return markers
+
+    def _align(self, events: List[Dict], plot_index: pd.Index, tolerance: pd.Timedelta):
+        """Vị trí nến của từng event (bỏ event không khớp). Returns (positions, events)."""
+        if not events or len(plot_index) == 0:
+            return np.empty(0, dtype=np.int64), []
+
+        timestamps = [event['timestamp'] for event in events]
+        if self.index_mapping is not None:
+            # Index gốc không phải thời gian: chỉ khớp qua mapping
+            pairs = [(self.index_mapping[ts], event) for ts, event in zip(timestamps, events) if ts in self.index_mapping]
+            timestamps = [ts for ts, _ in pairs]
+            events = [event for _, event in pairs]
+            if not events:
+                return np.empty(0, dtype=np.int64), []
+
+        stamps = pd.to_datetime(pd.Series(timestamps), errors='coerce')
+        # Đưa timestamp về cùng timezone với index
+        index_tz = getattr(plot_index, 'tz', None)
+        if stamps.dt.tz is not None and index_tz is None:
+            stamps = stamps.dt.tz_convert('UTC').dt.tz_localize(None)
+        elif stamps.dt.tz is None and index_tz is not None:
+            stamps = stamps.dt.tz_localize(index_tz)
+        valid = stamps.notna().to_numpy()
+        times = pd.DatetimeIndex(stamps[valid]).as_unit('ns').asi8
+        events = [event for event, ok in zip(events, valid) if ok]
+
+        bars = pd.DatetimeIndex(plot_index).as_unit('ns').asi8
+        right = np.searchsorted(bars, times, side='left').clip(0, len(bars) - 1)
+        left = (right - 1).clip(0, len(bars) - 1)
+        # Nến gần nhất (bằng nhau thì lấy nến trước, như argmin)
+        use_left = np.abs(times - bars[left]) <= np.abs(bars[right] - times)
+        nearest = np.where(use_left, left, right)
+        within = np.abs(bars[nearest] - times) <= tolerance.value
+        keep = np.flatnonzero(within)
+        return nearest[keep], [events[i] for i in keep]
+
+    @staticmethod
+    def _draw_markers(ax_price, markers: Dict[str, Dict], price_span: float):
+        """Vẽ entry/exit/break markers (một scatter mỗi nhóm) và text label."""
+        entries = markers['entry']
+        is_buy = entries['direction'] == 'BUY'
+        for group, color, marker in ((is_buy, '#10b981', '^'), (~is_buy, '#ef4444', 'v')):
+            if not group.any():
+                continue
+            # Kích thước: lớn hơn nếu should_trade=True (vào lệnh thực tế)
+            sizes = np.where(entries['should_trade'][group], 200, 100) * 2.0
+            ax_price.scatter(
+                entries['pos'][group], entries['price'][group], c=color, s=sizes, marker=marker,
+                edgecolors='#ffffff', linewidths=2.5, zorder=10, alpha=0.95,
+            )
+        # Text label chỉ cho các entry quan trọng (entry số <= 20 hoặc should_trade=True)
+        for pos, price, number, buy, trade in zip(
+            entries['pos'], entries['price'], entries['entry_number'], is_buy, entries['should_trade']
+        ):
+            if number > 20 and not trade:
+                continue
+            color = '#10b981' if buy else '#ef4444'
+            ax_price.annotate(
+                f"E{number}" + ("💰" if trade else ""),
+                xy=(pos, price),
+                xytext=(0, price_span * 0.02 if buy else -price_span * 0.02),
+                textcoords='offset points',
+                fontsize=8,
+                fontweight='bold',
+                color=color,
+                ha='center',
+                va='bottom' if buy else 'top',
+                bbox=dict(boxstyle='round,pad=0.3', facecolor='white', edgecolor=color, alpha=0.8, linewidth=1),
+                zorder=11
+            )
+
+        for event_type, color, marker, size, label, direction in (
+            ('exit', '#f59e0b', 'X', 250, 'Exit', 1),
+            ('break', '#9333ea', '*', 280, 'Break', -1),
+        ):
+            group = markers[event_type]
+            if len(group['pos']) == 0:
+                continue
+            ax_price.scatter(
+                group['pos'], group['price'], c=color, s=size, marker=marker,
+                edgecolors='#ffffff', linewidths=2.5, zorder=10, alpha=0.95,
+            )
+            for pos, price, entry_count in zip(group['pos'], group['price'], group['entry_count']):
+                ax_price.annotate(
+                    f"{label} (E{entry_count})",
+                    xy=(pos, price),
+                    xytext=(0, direction * price_span * 0.03),
+                    textcoords='offset points',
+                    fontsize=8,
+                    fontweight='bold',
+                    color=color,
+                    ha='center',
+                    va='bottom' if direction > 0 else 'top',
+                    bbox=dict(boxstyle='round,pad=0.3', facecolor='white', edgecolor=color, alpha=0.8, linewidth=1),
+                    zorder=11
+                )
+
+    def plot_decimated(
+        self,
+        title: str = "XAUUSD - Candlestick + RSI",
+        save_path: Optional[str] = None,
+        show: bool = True,
+        buckets: int = DEFAULT_BUCKETS,
+    ):
+        """
+        Vẽ toàn bộ lịch sử: nến được gom thành `buckets` bucket (~ một cột pixel).
+
+        Mỗi bucket vẽ OHLC của các nến trong bucket, RSI vẽ dải min/max + giá
+        trị cuối bucket; các event trong cùng bucket gom thành một marker
+        (kích thước theo số event). Thời gian/bộ nhớ vẽ cố định theo số
+        bucket, không phụ thuộc số nến (dùng matplotlib trực tiếp, không qua
+        mplfinance).
+
+        Args:
+            title: Tiêu đề biểu đồ
+            save_path: Đường dẫn lưu file (nếu None thì không lưu)
+            show: Hiển thị biểu đồ (default: True)
+            buckets: Số bucket (default: DEFAULT_BUCKETS)
+
+        Returns:
+            tuple: (fig, [ax_price, ax_rsi])
+        """
+        data = self.data.dropna(subset=['open', 'high', 'low', 'close'])
+        if len(data) == 0:
+            raise ValueError("Dữ liệu rỗng, không thể vẽ biểu đồ")
+
+        starts = bucket_starts(len(data), buckets)
+        ohlc = aggregate_ohlc(data['open'], data['high'], data['low'], data['close'], starts)
+        x = np.arange(len(starts))
+        up = ohlc['close'] >= ohlc['open']
+
+        has_rsi = 'rsi' in data.columns
+        if has_rsi:
+            fig, (ax_price, ax_rsi) = plt.subplots(
+                2, 1, figsize=(18, 11), sharex=True, gridspec_kw={'height_ratios': [3, 1]},
+            )
+        else:
+            fig, ax_price = plt.subplots(figsize=(18, 11))
+            ax_rsi = None
+
+        # Nến của bucket: râu high-low + thân open-close
+        colors = np.where(up, '#10b981', '#ef4444')
+        ax_price.vlines(x, ohlc['low'], ohlc['high'], colors=colors, linewidth=0.8)
+        body_low = np.minimum(ohlc['open'], ohlc['close'])
+        body_height = np.abs(ohlc['close'] - ohlc['open'])
+        ax_price.bar(x, body_height, bottom=body_low, width=0.8, color=colors, linewidth=0)
+
+        # Events gom theo bucket
+        markers = self._event_markers(data.index)
+        for event_type, color, marker, mask_fn in (
+            ('entry', '#10b981', '^', lambda group: group['direction'] == 'BUY'),
+            ('entry', '#ef4444', 'v', lambda group: group['direction'] != 'BUY'),
+            ('exit', '#f59e0b', 'X', None),
+            ('break', '#9333ea', '*', None),
+        ):
+            group = markers[event_type]
+            positions, prices = group['pos'], group['price']
+            if mask_fn is not None:
+                mask = mask_fn(group)
+                positions, prices = positions[mask], prices[mask]
+            if len(positions) == 0:
+                continue
+            bucket = np.searchsorted(starts, positions, side='right') - 1
+            counts = np.bincount(bucket, minlength=len(starts))
+            price_sums = np.bincount(bucket, weights=prices, minlength=len(starts))
+            used = np.flatnonzero(counts)
+            ax_price.scatter(
+                used, price_sums[used] / counts[used], c=color, marker=marker,
+                s=60 * np.sqrt(counts[used]), edgecolors='#ffffff', linewidths=1.0, zorder=10, alpha=0.9,
+            )
+
+        if ax_rsi is not None:
+            rsi = data['rsi'].to_numpy(dtype=np.float64).clip(0, 100)
+            rsi_min = np.fmin.reduceat(rsi, starts)
+            rsi_max = np.fmax.reduceat(rsi, starts)
+            rsi_last = rsi[np.r_[starts[1:], len(rsi)] - 1]
+            ax_rsi.fill_between(x, rsi_min, rsi_max, color='#6366f1', alpha=0.25, linewidth=0)
+            ax_rsi.plot(x, rsi_last, color='#6366f1', linewidth=1.0)
+            for level, color in ((30, '#10b981'), (50, '#f59e0b'), (70, '#ef4444')):
+                ax_rsi.axhline(level, color=color, linestyle='--', linewidth=1.0, alpha=0.7)
+            ax_rsi.set_ylim(0, 100)
+            ax_rsi.set_yticks([0, 30, 50, 70, 100])
+            ax_rsi.set_ylabel('RSI')
+            ax_rsi.grid(True, alpha=0.3, linestyle='--', linewidth=0.5)
+            ax_rsi.set_facecolor('#f9fafb')
+
+        # Trục x là số thứ tự bucket -> hiển thị thời gian bắt đầu bucket
+        bucket_times = data.index[starts]
+
+        def format_time(value, _position):
+            i = int(round(value))
+            if 0 <= i < len(bucket_times):
+                return bucket_times[i].strftime('%Y-%m-%d')
+            return ''
+
+        bottom_ax = ax_rsi if ax_rsi is not None else ax_price
+        bottom_ax.xaxis.set_major_formatter(FuncFormatter(format_time))
+        bottom_ax.set_xlim(-1, len(starts))
+        plt.setp(bottom_ax.xaxis.get_majorticklabels(), rotation=45, ha='right')
+
+        ax_price.set_ylabel('Price (USD)')
+        ax_price.grid(True, alpha=0.3, linestyle='-', linewidth=0.5)
+        ax_price.legend(handles=_legend_handles(), loc='upper left', frameon=True, fontsize=10)
+        fig.suptitle(
+            f"{title} ({len(data):,} nến, {len(data) / len(starts):.0f} nến/bucket)",
+            fontsize=16, fontweight='bold', color='#111827',
+        )
+        fig.patch.set_facecolor('#ffffff')
+        fig.tight_layout(rect=[0, 0, 1, 0.97])
+
+        if save_path:
+            save_path = Path(save_path)
+            save_path.parent.mkdir(parents=True, exist_ok=True)
+            fig.savefig(save_path, dpi=150)
+            print(f"✅ Đã lưu biểu đồ: {save_path}")
+        if show:
+            plt.show(block=False)
+            plt.pause(0.1)
+        elif not save_path:
+            plt.close(fig)
+        return fig, [ax for ax in (ax_price, ax_rsi) if ax is not None]
+
     def plot(
         self,
         title: str = "XAUUSD - Candlestick + RSI",
         save_path: Optional[str] = None,
         show: bool = True,
-        max_bars: int = 1000,
+        max_bars: Optional[int] = 1000,
+        buckets: int = DEFAULT_BUCKETS,
     ):
         """
         Vẽ biểu đồ nến + RSI + điểm vào lệnh.
@@ -113,8 +404,15 @@ class ChartVisualizer:
             title: Tiêu đề biểu đồ
             save_path: Đường dẫn lưu file (nếu None thì không lưu)
             show: Hiển thị biểu đồ (default: True)
-            max_bars: Số nến tối đa để vẽ (để tránh quá tải, default: 1000)
+            max_bars: Số nến tối đa để vẽ (để tránh quá tải, default: 1000).
+                None = toàn bộ lịch sử (gom nến bằng plot_decimated nếu nhiều hơn `buckets`)
+            buckets: Số bucket khi vẽ toàn bộ lịch sử (default: DEFAULT_BUCKETS)
         """
+        if max_bars is None:
+            if len(self.data) > buckets:
+                return self.plot_decimated(title=title, save_path=save_path, show=show, buckets=buckets)
+            max_bars = len(self.data)
+        
         # Kiểm tra dữ liệu có đủ cột cần thiết
         required_cols = ['open', 'high', 'low', 'close']
         missing_cols = [col for col in required_cols if col not in self.data.columns]
@@ -187,158 +485,8 @@ class ChartVisualizer:
                     first_valid = plot_data[col].dropna().iloc[0] if len(plot_data[col].dropna()) > 0 else 0
                     plot_data[col] = plot_data[col].fillna(first_valid)
         
-        # Chuẩn bị markers cho entry/exit/break points
-        entry_markers = []
-        exit_markers = []
-        break_markers = []
-        
-        # Tạo dict để map timestamp -> price cho markers
-        entry_dict = {}
-        exit_dict = {}
-        break_dict = {}
-        
-        for event in self.events:
-            if event['type'] == 'entry':
-                timestamp = event['timestamp']
-                price = event['price']
-                direction = event.get('direction', 'BUY')
-                entry_number = event.get('entry_number', 0)
-                should_trade = event.get('should_trade', False)
-                
-                # Chuyển đổi timestamp để khớp với index của plot_data
-                # Sử dụng index_mapping nếu có (khi index gốc không phải DatetimeIndex)
-                if self.index_mapping is not None:
-                    # Tìm timestamp trong mapping
-                    if timestamp in self.index_mapping:
-                        timestamp = self.index_mapping[timestamp]
-                    else:
-                        continue  # Bỏ qua nếu không tìm thấy trong mapping
-                else:
-                    # Nếu index là DatetimeIndex, chuyển timestamp sang datetime
-                    if isinstance(plot_data.index, pd.DatetimeIndex):
-                        if not isinstance(timestamp, pd.Timestamp):
-                            try:
-                                timestamp = pd.to_datetime(timestamp)
-                            except (ValueError, TypeError):
-                                continue
-                
-                # Tìm timestamp gần nhất trong index nếu không khớp chính xác
-                if timestamp not in plot_data.index:
-                    # Tìm timestamp gần nhất (trong vòng 1 giờ)
-                    try:
-                        if isinstance(plot_data.index, pd.DatetimeIndex):
-                            time_diff = abs(plot_data.index - timestamp)
-                            closest_idx = time_diff.argmin()
-                            if time_diff.iloc[closest_idx] <= pd.Timedelta(hours=1):
-                                timestamp = plot_data.index[closest_idx]
-                            else:
-                                continue  # Bỏ qua nếu quá xa
-                        else:
-                            continue  # Không khớp và không phải DatetimeIndex
-                    except (ValueError, TypeError, AttributeError):
-                        continue  # Bỏ qua nếu có lỗi
-                
-                # Chỉ đánh dấu nếu trong phạm vi data đang vẽ
-                if timestamp in plot_data.index:
-                    # Màu: xanh cho BUY, đỏ cho SELL
-                    # Kích thước: lớn hơn nếu should_trade=True (vào lệnh thực tế)
-                    color = 'green' if direction == 'BUY' else 'red'
-                    size = 200 if should_trade else 100
-                    
-                    entry_dict[timestamp] = {
-                        'price': price,
-                        'color': color,
-                        'size': size,
-                        'entry_number': entry_number,
-                        'direction': direction
-                    }
-            
-            elif event['type'] == 'exit':
-                timestamp = event['timestamp']
-                price = event['price']
-                
-                # Chuyển đổi timestamp để khớp với index của plot_data
-                if self.index_mapping is not None:
-                    if timestamp in self.index_mapping:
-                        timestamp = self.index_mapping[timestamp]
-                    else:
-                        continue
-                else:
-                    if isinstance(plot_data.index, pd.DatetimeIndex):
-                        if not isinstance(timestamp, pd.Timestamp):
-                            try:
-                                timestamp = pd.to_datetime(timestamp)
-                            except (ValueError, TypeError):
-                                continue
-                
-                # Tìm timestamp gần nhất trong index nếu không khớp chính xác
-                if timestamp not in plot_data.index:
-                    try:
-                        if isinstance(plot_data.index, pd.DatetimeIndex):
-                            time_diff = abs(plot_data.index - timestamp)
-                            closest_idx = time_diff.argmin()
-                            if time_diff.iloc[closest_idx] <= pd.Timedelta(hours=1):
-                                timestamp = plot_data.index[closest_idx]
-                            else:
-                                continue
-                        else:
-                            continue
-                    except (ValueError, TypeError, AttributeError):
-                        continue
-                
-                if timestamp in plot_data.index:
-                    exit_dict[timestamp] = price
-            
-            elif event['type'] == 'break':
-                timestamp = event['timestamp']
-                price = event['price']
-                direction = event.get('direction', 'BUY')
-                
-                # Chuyển đổi timestamp để khớp với index của plot_data
-                if self.index_mapping is not None:
-                    if timestamp in self.index_mapping:
-                        timestamp = self.index_mapping[timestamp]
-                    else:
-                        continue
-                else:
-                    if isinstance(plot_data.index, pd.DatetimeIndex):
-                        if not isinstance(timestamp, pd.Timestamp):
-                            try:
-                                timestamp = pd.to_datetime(timestamp)
-                            except (ValueError, TypeError):
-                                continue
-                
-                # Tìm timestamp gần nhất trong index nếu không khớp chính xác
-                if timestamp not in plot_data.index:
-                    try:
-                        if isinstance(plot_data.index, pd.DatetimeIndex):
-                            time_diff = abs(plot_data.index - timestamp)
-                            closest_idx = time_diff.argmin()
-                            if time_diff.iloc[closest_idx] <= pd.Timedelta(hours=1):
-                                timestamp = plot_data.index[closest_idx]
-                            else:
-                                continue
-                        else:
-                            continue
-                    except (ValueError, TypeError, AttributeError):
-                        continue
-                
-                if timestamp in plot_data.index:
-                    break_dict[timestamp] = {
-                        'price': price,
-                        'direction': direction
-                    }
-        
-        # Tạo list markers cho mplfinance
-        # Format: [(timestamp, price, marker_style), ...]
-        for ts, info in entry_dict.items():
-            entry_markers.append((ts, info['price'], info['color'], info['size']))
-        
-        for ts, price in exit_dict.items():
-            exit_markers.append((ts, price, 'orange', 150))
-        
-        for ts, info in break_dict.items():
-            break_markers.append((ts, info['price'], 'purple', 180))
+        # Gắn events vào nến đang vẽ (một lần cho mọi loại event)
+        markers = self._event_markers(plot_data.index)
         
         # Chuẩn bị RSI panel (nếu có)
         rsi_plot = []
@@ -386,23 +534,6 @@ class ChartVisualizer:
                     ),
                 ]
         
-        # Thêm markers vào plot
-        if entry_markers:
-            # Tạo DataFrame cho markers
-            entry_df = pd.DataFrame(index=plot_data.index)
-            entry_df['entry_price'] = np.nan
-            entry_df['entry_color'] = ''
-            entry_df['entry_size'] = 0
-            
-            for ts, price, color, size in entry_markers:
-                if ts in entry_df.index:
-                    entry_df.loc[ts, 'entry_price'] = price
-                    entry_df.loc[ts, 'entry_color'] = color
-                    entry_df.loc[ts, 'entry_size'] = size
-            
-            # Vẽ entry markers bằng scatter (sẽ thêm sau)
-            # Note: mplfinance không hỗ trợ scatter trực tiếp, cần dùng matplotlib
-            
         # Tạo custom style đẹp hơn
         # Lưu ý: Một số phiên bản mplfinance không hỗ trợ cú pháp make_marketcolors với 'up'/'down'
         # Dùng style có sẵn hoặc mặc định để tránh lỗi tương thích
@@ -513,232 +644,13 @@ class ChartVisualizer:
                 # Nếu không chỉnh được linewidth, không sao - chỉ là styling
                 print(f"⚠️ Không thể chỉnh linewidth cho RSI: {e}")
         
-        # Vẽ entry markers với styling đẹp hơn và text labels
-        buy_marker_drawn = False
-        sell_marker_drawn = False
-        entry_info_dict = {}  # Lưu thông tin entry để hiển thị text
-        
-        # Thu thập thông tin entry từ events
-        for event in self.events:
-            if event['type'] == 'entry':
-                timestamp = event['timestamp']
-                # Chuyển đổi timestamp nếu cần
-                if self.index_mapping is not None:
-                    if timestamp in self.index_mapping:
-                        timestamp = self.index_mapping[timestamp]
-                    else:
-                        continue
-                else:
-                    if isinstance(plot_data.index, pd.DatetimeIndex):
-                        if not isinstance(timestamp, pd.Timestamp):
-                            try:
-                                timestamp = pd.to_datetime(timestamp)
-                            except (ValueError, TypeError):
-                                continue
-                
-                if timestamp in plot_data.index:
-                    entry_info_dict[timestamp] = {
-                        'entry_number': event.get('entry_number', 0),
-                        'direction': event.get('direction', 'BUY'),
-                        'should_trade': event.get('should_trade', False)
-                    }
-        
-        for ts, price, color, size in entry_markers:
-            if ts in plot_data.index:
-                marker_color = '#10b981' if color == 'green' else '#ef4444'
-                marker_style = '^' if color == 'green' else 'v'
-                label = ''
-                if color == 'green' and not buy_marker_drawn:
-                    label = 'Entry BUY'
-                    buy_marker_drawn = True
-                elif color == 'red' and not sell_marker_drawn:
-                    label = 'Entry SELL'
-                    sell_marker_drawn = True
-                
-                # Vẽ marker
-                ax_price.scatter(
-                    ts,
-                    price,
-                    c=marker_color,
-                    s=size * 2.0,  # Tăng kích thước để dễ nhìn hơn
-                    marker=marker_style,
-                    edgecolors='#ffffff',
-                    linewidths=2.5,
-                    zorder=10,
-                    alpha=0.95,
-                    label=label if label else ''
-                )
-                
-                # Thêm text label với entry number nếu có
-                if ts in entry_info_dict:
-                    entry_info = entry_info_dict[ts]
-                    entry_num = entry_info['entry_number']
-                    should_trade = entry_info.get('should_trade', False)
-                    # Chỉ hiển thị text cho các entry quan trọng (entry số <= 20 hoặc should_trade=True)
-                    if entry_num <= 20 or should_trade:
-                        text_label = f"E{entry_num}"
-                        if should_trade:
-                            text_label += "💰"
-                        # Đặt text phía trên marker cho BUY, phía dưới cho SELL
-                        y_offset = (plot_data['High'].max() - plot_data['Low'].min()) * 0.02 if color == 'green' else -(plot_data['High'].max() - plot_data['Low'].min()) * 0.02
-                        ax_price.annotate(
-                            text_label,
-                            xy=(ts, price),
-                            xytext=(0, y_offset),
-                            textcoords='offset points',
-                            fontsize=8,
-                            fontweight='bold',
-                            color=marker_color,
-                            ha='center',
-                            va='bottom' if color == 'green' else 'top',
-                            bbox=dict(boxstyle='round,pad=0.3', facecolor='white', edgecolor=marker_color, alpha=0.8, linewidth=1),
-                            zorder=11
-                        )
-        
-        # Vẽ exit markers với styling đẹp hơn và text labels
-        exit_count = 0
-        exit_info_dict = {}  # Lưu thông tin exit
-        
-        # Thu thập thông tin exit từ events
-        for event in self.events:
-            if event['type'] == 'exit':
-                timestamp = event['timestamp']
-                # Chuyển đổi timestamp nếu cần
-                if self.index_mapping is not None:
-                    if timestamp in self.index_mapping:
-                        timestamp = self.index_mapping[timestamp]
-                    else:
-                        continue
-                else:
-                    if isinstance(plot_data.index, pd.DatetimeIndex):
-                        if not isinstance(timestamp, pd.Timestamp):
-                            try:
-                                timestamp = pd.to_datetime(timestamp)
-                            except (ValueError, TypeError):
-                                continue
-                
-                if timestamp in plot_data.index:
-                    exit_info_dict[timestamp] = {
-                        'entry_count': event.get('entry_count', 0),
-                        'was_break': event.get('was_break', False)
-                    }
-        
-        for ts, price in exit_dict.items():
-            if ts in plot_data.index:
-                ax_price.scatter(
-                    ts,
-                    price,
-                    c='#f59e0b',
-                    s=250,  # Tăng kích thước
-                    marker='X',
-                    edgecolors='#ffffff',
-                    linewidths=2.5,
-                    zorder=10,
-                    alpha=0.95,
-                    label='Exit' if exit_count == 0 else ''
-                )
-                
-                # Thêm text label
-                if ts in exit_info_dict:
-                    exit_info = exit_info_dict[ts]
-                    entry_count = exit_info.get('entry_count', 0)
-                    text_label = f"Exit (E{entry_count})"
-                    y_offset = (plot_data['High'].max() - plot_data['Low'].min()) * 0.03
-                    ax_price.annotate(
-                        text_label,
-                        xy=(ts, price),
-                        xytext=(0, y_offset),
-                        textcoords='offset points',
-                        fontsize=8,
-                        fontweight='bold',
-                        color='#f59e0b',
-                        ha='center',
-                        va='bottom',
-                        bbox=dict(boxstyle='round,pad=0.3', facecolor='white', edgecolor='#f59e0b', alpha=0.8, linewidth=1),
-                        zorder=11
-                    )
-                
-                exit_count += 1
-        
-        # Vẽ break markers (stop loss) với styling đẹp hơn và text labels
-        break_count = 0
-        break_info_dict = {}  # Lưu thông tin break
-        
-        # Thu thập thông tin break từ events
-        for event in self.events:
-            if event['type'] == 'break':
-                timestamp = event['timestamp']
-                # Chuyển đổi timestamp nếu cần
-                if self.index_mapping is not None:
-                    if timestamp in self.index_mapping:
-                        timestamp = self.index_mapping[timestamp]
-                    else:
-                        continue
-                else:
-                    if isinstance(plot_data.index, pd.DatetimeIndex):
-                        if not isinstance(timestamp, pd.Timestamp):
-                            try:
-                                timestamp = pd.to_datetime(timestamp)
-                            except (ValueError, TypeError):
-                                continue
-                
-                if timestamp in plot_data.index:
-                    break_info_dict[timestamp] = {
-                        'entry_count': event.get('entry_count', 0),
-                        'direction': event.get('direction', 'BUY')
-                    }
-        
-        for ts, info in break_dict.items():
-            if ts in plot_data.index:
-                ax_price.scatter(
-                    ts,
-                    info['price'],
-                    c='#9333ea',  # Purple color for break/stop loss
-                    s=280,  # Tăng kích thước
-                    marker='*',  # Star marker for break
-                    edgecolors='#ffffff',
-                    linewidths=2.5,
-                    zorder=10,
-                    alpha=0.95,
-                    label='Break/Stop Loss' if break_count == 0 else ''
-                )
-                
-                # Thêm text label
-                if ts in break_info_dict:
-                    break_info = break_info_dict[ts]
-                    entry_count = break_info.get('entry_count', 0)
-                    text_label = f"Break (E{entry_count})"
-                    y_offset = -(plot_data['High'].max() - plot_data['Low'].min()) * 0.03
-                    ax_price.annotate(
-                        text_label,
-                        xy=(ts, info['price']),
-                        xytext=(0, y_offset),
-                        textcoords='offset points',
-                        fontsize=8,
-                        fontweight='bold',
-                        color='#9333ea',
-                        ha='center',
-                        va='top',
-                        bbox=dict(boxstyle='round,pad=0.3', facecolor='white', edgecolor='#9333ea', alpha=0.8, linewidth=1),
-                        zorder=11
-                    )
-                
-                break_count += 1
+        # Vẽ markers tại vị trí nến (mplfinance dùng trục x là số thứ tự nến)
+        price_span = plot_data['High'].max() - plot_data['Low'].min()
+        self._draw_markers(ax_price, markers, price_span)
         
         # Cải thiện legend
-        from matplotlib.lines import Line2D
-        legend_elements = [
-            Line2D([0], [0], marker='^', color='w', markerfacecolor='#10b981', 
-                   markersize=12, label='Entry BUY', markeredgecolor='#ffffff', markeredgewidth=1.5),
-            Line2D([0], [0], marker='v', color='w', markerfacecolor='#ef4444', 
-                   markersize=12, label='Entry SELL', markeredgecolor='#ffffff', markeredgewidth=1.5),
-            Line2D([0], [0], marker='X', color='w', markerfacecolor='#f59e0b', 
-                   markersize=12, label='Exit', markeredgecolor='#ffffff', markeredgewidth=1.5),
-            Line2D([0], [0], marker='*', color='w', markerfacecolor='#9333ea', 
-                   markersize=12, label='Break/Stop Loss', markeredgecolor='#ffffff', markeredgewidth=1.5),
-        ]
         ax_price.legend(
-            handles=legend_elements, 
+            handles=_legend_handles(), 
             loc='upper left',
             frameon=True,
             fancybox=True,
@@ -11,6 +11,8 @@ from pathlib import Path
 from typing import Optional, Union
 from datetime import datetime, timedelta
 
+from src.utils.bar_store import BarPyramid
+
 
 class DataLoader:
     """
@@ -127,6 +129,70 @@ class DataLoader:
         
         return df
     
+    def load(self, file_path, resolution=None, symbol="XAUUSD", source="auto", store_dir=None):
+        """
+        Load data, optionally at a pre-aggregated resolution.
+        
+        Without `resolution` this is load_csv. With a resolution (M1, M5, M15,
+        H1, H4, D1 or TradingView names "1", "5", "15", "60", "240", "1D") the
+        bars come from the persisted pyramid in the bar store; the CSV is only
+        parsed when the store is missing or the file changed (new bars are
+        appended, the pyramid is updated incrementally).
+        
+        Args:
+            file_path: Path to CSV file
+            resolution: Target resolution (default: None = raw CSV bars)
+            symbol: Symbol name (default: XAUUSD)
+            source: Data source format (default: "auto")
+            store_dir: Bar store directory (default: data/store)
+            
+        Returns:
+            pandas.DataFrame: OHLCV data with datetime index
+            
+        Raises:
+            ValueError: If resolution is unsupported or finer than the source data
+        """
+        if resolution is None:
+            return self.load_csv(file_path, symbol=symbol, source=source)
+        
+        if not Path(file_path).exists():
+            raise FileNotFoundError(f"Data file not found: {file_path}")
+        
+        pyramid = BarPyramid(file_path, store_dir=store_dir)
+        if pyramid.is_stale():
+            pyramid.sync(self.load_csv(file_path, symbol=symbol, source=source))
+        return pyramid.read(resolution)
+    
+    def load_bars(self, file_path, symbol="XAUUSD", source="auto", store_dir=None):
+        """
+        Load the source bars, from the bar store when it is up to date.
+        
+        Same bars as load_csv, but a file that was already normalized into the
+        bar store (on upload or an earlier load) is read from the binary base
+        file instead of parsing the CSV again. A missing or stale store is
+        rebuilt from the parsed CSV first.
+        
+        The result always comes from the store, so it does not depend on
+        whether the store was up to date: index naive UTC named 'timestamp',
+        float open/high/low/close/volume columns only.
+        
+        Args:
+            file_path: Path to CSV file
+            symbol: Symbol name (default: XAUUSD)
+            source: Data source format (default: "auto")
+            store_dir: Bar store directory (default: data/store)
+            
+        Returns:
+            pandas.DataFrame: OHLCV data with naive UTC datetime index
+        """
+        if not Path(file_path).exists():
+            raise FileNotFoundError(f"Data file not found: {file_path}")
+        
+        pyramid = BarPyramid(file_path, store_dir=store_dir)
+        if pyramid.is_stale():
+            pyramid.sync(self.load_csv(file_path, symbol=symbol, source=source))
+        return pyramid.read_base()
+    
     def _detect_format(self, df):
         """
         Auto-detect CSV format from column names.
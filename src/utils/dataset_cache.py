@@ -0,0 +1,188 @@
+"""
+Dataset Cache - Cache dữ liệu đã load (DataFrame) dùng chung trong process
+
+Key là đường dẫn file (+ biến thể, ví dụ dữ liệu kèm RSI của một period);
+entry chỉ được dùng khi fingerprint (size, mtime_ns) còn khớp với file trên
+đĩa. Tổng bộ nhớ của các DataFrame bị giới hạn, bỏ entry dùng lâu nhất (LRU).
+
+DataFrame trả về được dùng chung: không sửa trực tiếp, copy() trước nếu cần.
+"""
+
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+import pandas as pd
+
+from src.utils.data_loader import DataLoader
+from src.utils.dataset_registry import file_fingerprint
+
+
+# Giới hạn bộ nhớ mặc định (~10 triệu nến M1 OHLCV)
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    """Số byte của DataFrame (dữ liệu + index)."""
+    return int(df.memory_usage(index=True, deep=False).sum())
+
+
+class DatasetCache:
+    """
+    LRU cache các dataset đã load, thread-safe.
+
+    - get(): trả về bản cache nếu file chưa đổi, ngược lại load lại (qua
+      DataLoader.load_bars, tức là đọc bar store nếu có)
+    - Mỗi key chỉ load một lần dù nhiều thread cùng yêu cầu
+    - Biến thể (variant) được dựng từ dataset gốc bằng hàm `prepare`
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Initialize cache.
+
+        Args:
+            max_bytes: Memory budget for all cached DataFrames
+        """
+        self.max_bytes = int(max_bytes)
+        # (path, variant) -> {"fingerprint", "data", "nbytes"}
+        self._entries: "OrderedDict[Tuple[str, Hashable], Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple[str, Hashable], threading.Lock] = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _path(file_path) -> str:
+        return str(Path(file_path).resolve())
+
+    def _lookup(self, key, fingerprint) -> Optional[pd.DataFrame]:
+        """Dữ liệu của key nếu còn khớp fingerprint (lock đang giữ)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry["fingerprint"] != fingerprint:
+            # File đã đổi: bỏ mọi biến thể của file này
+            self._drop_path(key[0])
+            return None
+        self._entries.move_to_end(key)
+        return entry["data"]
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry["nbytes"]
+
+    def _drop_path(self, path: str):
+        for key in [key for key in self._entries if key[0] == path]:
+            self._drop(key)
+
+    def _store(self, key, fingerprint, data: pd.DataFrame):
+        """Lưu entry và bỏ entry cũ nhất cho đến khi vừa giới hạn bộ nhớ (lock đang giữ)."""
+        nbytes = frame_nbytes(data)
+        if nbytes > self.max_bytes:
+            # Quá lớn để cache: chỉ trả về, không đẩy các entry khác ra
+            return
+        self._drop(key)
+        self._entries[key] = {"fingerprint": fingerprint, "data": data, "nbytes": nbytes}
+        self.total_bytes += nbytes
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _key_lock(self, key) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get(self, file_path, variant: Hashable = None,
+            prepare: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+            source: str = "auto") -> pd.DataFrame:
+        """
+        Lấy dataset, load (hoặc dựng biến thể) nếu chưa có hoặc file đã đổi.
+
+        Args:
+            file_path: Path to data CSV
+            variant: Hashable tag of a derived dataset (None = dữ liệu gốc)
+            prepare: Builds the variant from a copy of the base data (required if variant is set)
+            source: DataLoader source format
+
+        Returns:
+            pandas.DataFrame: Shared data (do not modify in place)
+
+        Raises:
+            FileNotFoundError: If the file does not exist
+        """
+        path = self._path(file_path)
+        if not Path(path).exists():
+            raise FileNotFoundError(f"Data file not found: {file_path}")
+        key = (path, variant)
+
+        # Fingerprint trước khi load: file đổi trong lúc load sẽ bị load lại lần sau
+        fingerprint = file_fingerprint(path)
+        with self._lock:
+            data = self._lookup(key, fingerprint)
+            if data is not None:
+                self.hits += 1
+                return data
+
+        with self._key_lock(key):
+            with self._lock:
+                data = self._lookup(key, fingerprint)
+                if data is not None:
+                    self.hits += 1
+                    return data
+                self.misses += 1
+
+            if variant is None:
+                data = DataLoader().load_bars(path, source=source)
+            else:
+                if prepare is None:
+                    raise ValueError(f"prepare is required for dataset variant {variant!r}")
+                data = prepare(self.get(path, source=source).copy())
+
+            with self._lock:
+                self._store(key, fingerprint, data)
+            return data
+
+    def invalidate(self, file_path=None):
+        """Bỏ cache của một file (mọi biến thể), hoặc toàn bộ nếu file_path là None."""
+        with self._lock:
+            if file_path is None:
+                self._entries.clear()
+                self.total_bytes = 0
+            else:
+                self._drop_path(self._path(file_path))
+
+    def stats(self) -> Dict:
+        """Số entry, bộ nhớ đang dùng, hits/misses/evictions."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "datasets": [
+                    {"path": path, "variant": repr(variant) if variant is not None else None,
+                     "rows": len(entry["data"]), "bytes": entry["nbytes"]}
+                    for (path, variant), entry in self._entries.items()
+                ],
+            }
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_dataset_cache() -> DatasetCache:
+    """Dataset cache dùng chung trong process."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = DatasetCache()
+        return _default_cache
@@ -0,0 +1,218 @@
+"""
+Dataset Registry - Thống kê của các file data, lưu trong một file index nhỏ
+
+Mỗi file data được đăng ký một lần (khi upload/ingest hoặc lần đầu cần):
+số nến, khoảng thời gian, interval, giá trung bình/min/max, số gap và
+fingerprint. Các endpoint đọc thống kê từ index thay vì parse lại CSV, và
+cache có thể dùng fingerprint làm key.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.utils.bar_store import BarPyramid
+from src.utils.data_loader import DataLoader
+
+
+DEFAULT_INDEX_PATH = "data/store/registry.json"
+
+# Khoảng cách giữa hai nến lớn hơn GAP_FACTOR * interval được tính là một gap
+GAP_FACTOR = 1.5
+
+
+def file_fingerprint(file_path) -> Tuple[int, int]:
+    """
+    Fingerprint rẻ của một file: (size, mtime_ns).
+
+    Args:
+        file_path: Path to file
+
+    Returns:
+        tuple: (size in bytes, modification time in ns)
+    """
+    stat = os.stat(file_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def compute_stats(df: pd.DataFrame) -> Dict:
+    """
+    Thống kê của một DataFrame OHLCV (index thời gian).
+
+    Returns:
+        dict: rows, start, end, interval_seconds, avg_price, min_price, max_price, gaps
+    """
+    rows = len(df)
+    if rows == 0:
+        return {
+            "rows": 0, "start": None, "end": None, "interval_seconds": None,
+            "avg_price": None, "min_price": None, "max_price": None, "gaps": 0,
+        }
+
+    times = pd.DatetimeIndex(df.index).as_unit('ns').asi8 // 10**9
+    diffs = np.diff(times)
+    positive = diffs[diffs > 0]
+    interval = int(np.median(positive)) if len(positive) else None
+    gaps = int(np.count_nonzero(diffs > GAP_FACTOR * interval)) if interval else 0
+
+    return {
+        "rows": rows,
+        "start": df.index[0].isoformat(),
+        "end": df.index[-1].isoformat(),
+        "interval_seconds": interval,
+        "avg_price": float(df['close'].mean()),
+        "min_price": float(df['low'].min()),
+        "max_price": float(df['high'].max()),
+        "gaps": gaps,
+    }
+
+
+class DatasetRegistry:
+    """
+    Index thống kê các file data, lưu thành JSON.
+
+    Entry chỉ được dùng khi fingerprint còn khớp với file trên đĩa; file đã
+    thay đổi được tính lại ở lần ensure() tiếp theo.
+    """
+
+    def __init__(self, index_path: str = DEFAULT_INDEX_PATH):
+        """
+        Initialize registry.
+
+        Args:
+            index_path: JSON index file (default: data/store/registry.json)
+        """
+        self.index_path = Path(index_path)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = self._read_index()
+
+    @staticmethod
+    def _key(file_path) -> str:
+        return str(Path(file_path).resolve())
+
+    def _read_index(self) -> Dict[str, Dict]:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get("datasets", {})
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write_index(self):
+        """Ghi index (lock đang giữ), thay file nguyên khối để không bị ghi dở."""
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_suffix(".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"datasets": self._entries}, f, indent=2)
+        os.replace(tmp, self.index_path)
+
+    def get(self, file_path) -> Optional[Dict]:
+        """
+        Entry của file nếu đã đăng ký và file chưa thay đổi.
+
+        Returns:
+            dict or None
+        """
+        entry = self._entries.get(self._key(file_path))
+        if entry is None:
+            return None
+        try:
+            if tuple(entry["fingerprint"]) != file_fingerprint(file_path):
+                return None
+        except OSError:
+            return None
+        return entry
+
+    def register(self, file_path, df: Optional[pd.DataFrame] = None, source: str = "auto") -> Dict:
+        """
+        Tính thống kê và lưu vào index.
+
+        Args:
+            file_path: Data file path
+            df: Already loaded data (from the dataset cache if None)
+            source: DataLoader source format
+
+        Returns:
+            dict: Registry entry
+        """
+        # Fingerprint trước khi đọc: file đổi trong lúc đọc sẽ bị coi là stale
+        fingerprint = file_fingerprint(file_path)
+        if df is None:
+            # Import trong hàm: dataset_cache import file_fingerprint từ module này
+            from src.utils.dataset_cache import get_dataset_cache
+            df = get_dataset_cache().get(file_path, source=source)
+
+        entry = {
+            "name": Path(file_path).name,
+            "path": str(file_path),
+            "fingerprint": list(fingerprint),
+            "registered_at": datetime.now().isoformat(timespec="seconds"),
+            **compute_stats(df),
+        }
+        with self._lock:
+            self._entries[self._key(file_path)] = entry
+            self._write_index()
+        return entry
+
+    def ingest(self, file_path, source: str = "auto", store_dir: Optional[str] = None) -> Dict:
+        """
+        Normalize file vào bar store (nến gốc + pyramid) và đăng ký thống kê.
+
+        Dùng sau khi upload: CSV chỉ bị parse một lần ở đây, các lần load sau
+        (backtest, TradingView) đọc từ bar store.
+
+        Args:
+            file_path: Data file path
+            source: DataLoader source format
+            store_dir: Bar store directory (default: data/store)
+
+        Returns:
+            dict: Registry entry
+        """
+        df = DataLoader().load_csv(file_path, source=source)
+        BarPyramid(file_path, store_dir=store_dir).sync(df)
+        return self.register(file_path, df, source=source)
+
+    def ensure(self, file_path, source: str = "auto") -> Dict:
+        """Entry của file, đăng ký (load CSV) nếu chưa có hoặc đã cũ."""
+        return self.get(file_path) or self.register(file_path, source=source)
+
+    def remove(self, file_path):
+        """Xóa file khỏi index."""
+        with self._lock:
+            if self._entries.pop(self._key(file_path), None) is not None:
+                self._write_index()
+
+    def entries(self, file_paths: Iterable) -> List[Dict]:
+        """
+        Thông tin của nhiều file, không load file nào.
+
+        Returns:
+            list: {"name", "path", "registered": bool, **stats} (stats chỉ có khi đã đăng ký)
+        """
+        result = []
+        for file_path in file_paths:
+            entry = self.get(file_path)
+            if entry is None:
+                result.append({"name": Path(file_path).name, "path": str(file_path), "registered": False})
+            else:
+                result.append(dict(entry, path=str(file_path), registered=True))
+        return result
+
+
+_default_registry = None
+_default_lock = threading.Lock()
+
+
+def get_registry() -> DatasetRegistry:
+    """Registry dùng chung trong process (index mặc định)."""
+    global _default_registry
+    with _default_lock:
+        if _default_registry is None:
+            _default_registry = DatasetRegistry()
+        return _default_registry
@@ -0,0 +1,153 @@
+"""
+Downsample - Giảm số điểm của chuỗi thời gian để vẽ biểu đồ
+
+LTTB (Largest-Triangle-Three-Buckets) giữ lại hình dạng đường cong với số
+điểm cố định; kèm min/max của từng bucket để vẽ dải bao (envelope) và giữ
+nguyên đỉnh/đáy của drawdown lớn nhất. Nến OHLC được gom theo bucket cố
+định (mỗi bucket ~ một cột pixel) để vẽ toàn bộ lịch sử.
+"""
+
+from typing import Dict
+
+import numpy as np
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """
+    Chọn `points` vị trí đại diện bằng Largest-Triangle-Three-Buckets.
+
+    Điểm đầu và cuối luôn được giữ; phần còn lại chia thành points - 2 bucket,
+    mỗi bucket chọn điểm tạo tam giác lớn nhất với điểm đã chọn ở bucket
+    trước và trung bình của bucket sau.
+
+    Args:
+        x: X values (e.g. epoch seconds), increasing
+        y: Y values
+        points: Output point budget (>= 3)
+
+    Returns:
+        numpy.ndarray: Selected positions (sorted)
+    """
+    n = len(x)
+    if points >= n or points < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = _bucket_edges(n, points)
+
+    selected = np.empty(points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for i in range(points - 2):
+        start, end = edges[i], edges[i + 1]
+        # Trung bình của bucket kế tiếp (bucket cuối dùng điểm cuối cùng)
+        next_start, next_end = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        px, py = x[previous], y[previous]
+        areas = np.abs(
+            (px - avg_x) * (y[start:end] - py)
+            - (px - x[start:end]) * (avg_y - py)
+        )
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+    return selected
+
+
+def _bucket_edges(n: int, points: int) -> np.ndarray:
+    """Biên của points - 2 bucket phủ các điểm 1..n-2 (phần tử cuối luôn là n - 1)."""
+    return 1 + np.floor(np.arange(points - 1) * (n - 2) / (points - 2)).astype(np.int64)
+
+
+def max_drawdown_indices(y: np.ndarray):
+    """
+    Vị trí (đỉnh, đáy) của drawdown lớn nhất.
+
+    Returns:
+        tuple: (peak_index, trough_index); (0, 0) nếu chuỗi rỗng
+    """
+    if len(y) == 0:
+        return 0, 0
+    running_peak = np.maximum.accumulate(y)
+    trough = int(np.argmax(running_peak - y))
+    peak = int(np.argmax(y[:trough + 1])) if trough > 0 else 0
+    return peak, trough
+
+
+def decimate_series(x: np.ndarray, y: np.ndarray, points: int = 1000) -> Dict[str, np.ndarray]:
+    """
+    Giảm chuỗi (x, y) về khoảng `points` điểm cho biểu đồ.
+
+    - "x", "y": điểm LTTB, cộng thêm đỉnh/đáy của drawdown lớn nhất (nên có
+      thể nhiều hơn `points` tối đa 2 điểm)
+    - "envelope_x", "envelope_min", "envelope_max": min/max của từng bucket
+      (cùng cách chia bucket với LTTB) để vẽ dải bao dao động bị lược bớt
+
+    Args:
+        x: X values (e.g. epoch seconds), increasing
+        y: Y values (e.g. equity)
+        points: Output point budget
+
+    Returns:
+        dict: Arrays described above
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n == 0:
+        empty = np.empty(0)
+        return {"x": x, "y": y, "envelope_x": x, "envelope_min": empty, "envelope_max": empty}
+
+    indices = lttb_indices(x, y, points)
+    if len(indices) < n:
+        peak, trough = max_drawdown_indices(y)
+        indices = np.union1d(indices, [peak, trough])
+
+    # Envelope: min/max mỗi bucket (không decimate thì mỗi điểm là một bucket)
+    if points >= 3 and points < n:
+        starts = np.r_[0, _bucket_edges(n, points)]
+    else:
+        starts = np.arange(n)
+
+    return {
+        "x": x[indices],
+        "y": y[indices],
+        "envelope_x": x[starts],
+        "envelope_min": np.minimum.reduceat(y, starts),
+        "envelope_max": np.maximum.reduceat(y, starts),
+    }
+
+
+def bucket_starts(n: int, buckets: int) -> np.ndarray:
+    """
+    Vị trí bắt đầu của `buckets` bucket liên tiếp, gần bằng nhau, phủ n điểm.
+
+    Returns:
+        numpy.ndarray: Start positions (len = min(n, buckets))
+    """
+    buckets = max(min(int(buckets), n), 1)
+    return np.floor(np.arange(buckets) * n / buckets).astype(np.int64)
+
+
+def aggregate_ohlc(open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                   starts: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    OHLC của từng bucket: open đầu, high max, low min, close cuối.
+
+    Args:
+        open_, high, low, close: Bar arrays (same length)
+        starts: Bucket start positions (from bucket_starts)
+
+    Returns:
+        dict: "open", "high", "low", "close" arrays (one value per bucket)
+    """
+    ends = np.r_[starts[1:], len(close)] - 1
+    return {
+        "open": np.asarray(open_, dtype=np.float64)[starts],
+        "high": np.maximum.reduceat(np.asarray(high, dtype=np.float64), starts),
+        "low": np.minimum.reduceat(np.asarray(low, dtype=np.float64), starts),
+        "close": np.asarray(close, dtype=np.float64)[ends],
+    }
@@ -0,0 +1,226 @@
+"""
+Event Store - Index events của một lần backtest theo thời gian
+
+Events được sắp xếp một lần theo timestamp (epoch giây); truy vấn theo khoảng
+thời gian dùng binary search, và có thể gom các events rơi vào cùng một nến
+thành một marker cho TradingView (marks / timescale marks).
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# Màu marker theo loại event (giống drawBacktestMarkers ở frontend)
+EVENT_COLORS = {
+    "entry_BUY": "#10b981",
+    "entry_SELL": "#ef4444",
+    "entry": "#6b7280",
+    "exit": "#3b82f6",
+    "break": "#f59e0b",
+}
+
+# Field của event khi trả về dạng columnar (ngoài 'time' epoch giây)
+COLUMN_FIELDS = (
+    "type",
+    "timestamp",
+    "price",
+    "rsi",
+    "direction",
+    "entry_number",
+    "entry_count",
+    "should_trade",
+)
+
+# Events hiển thị trên nến (marks) và trên trục thời gian (timescale marks)
+BAR_MARK_TYPES = ("entry",)
+TIMESCALE_MARK_TYPES = ("exit", "break")
+
+
+def _event_key(event: Dict) -> str:
+    if event.get("type") == "entry" and event.get("direction") in ("BUY", "SELL"):
+        return f"entry_{event['direction']}"
+    return event.get("type", "")
+
+
+def _event_text(event: Dict) -> str:
+    """Mô tả ngắn một event (dùng làm text/tooltip của marker)."""
+    event_type = event.get("type")
+    price = event.get("price")
+    price_text = f" @ {price:.2f}" if isinstance(price, (int, float)) else ""
+    if event_type == "entry":
+        direction = f" {event['direction']}" if event.get("direction") else ""
+        return f"Entry #{event.get('entry_number', '')}{direction}{price_text}"
+    if event_type == "exit":
+        return f"Exit #{event.get('entry_count', '')}{price_text}"
+    if event_type == "break":
+        return f"Break #{event.get('entry_count', '')}{price_text}"
+    return f"{event_type}{price_text}"
+
+
+class EventIndex:
+    """
+    Events sắp xếp theo thời gian + mảng epoch giây để tìm kiếm nhị phân.
+
+    Events đầu vào là dict đã serialize (timestamp ISO string hoặc Timestamp);
+    timestamp không có timezone được hiểu là UTC như nến trong /api/tv/history.
+    """
+
+    def __init__(self, events: List[Dict]):
+        """
+        Initialize index.
+
+        Args:
+            events: Serialized events (type, timestamp, price, rsi, ...)
+        """
+        if events:
+            stamps = pd.to_datetime([event.get("timestamp") for event in events], utc=True)
+            times = stamps.as_unit('ns').asi8 // 10**9
+            order = np.argsort(times, kind='stable')
+        else:
+            times = np.empty(0, dtype=np.int64)
+            order = np.empty(0, dtype=np.int64)
+        self.times = times[order]
+        self.events = [events[i] for i in order]
+        self.types = np.array([event.get("type", "") for event in self.events], dtype=object)
+
+        # Cột dạng object (None nếu event không có field) để trả về dạng columnar
+        self.columns = {
+            field: np.array([event.get(field) for event in self.events], dtype=object)
+            for field in COLUMN_FIELDS
+        }
+
+    def __len__(self):
+        return len(self.events)
+
+    def range(self, from_time: int, to_time: int) -> Tuple[int, int]:
+        """
+        Vị trí [lo, hi) của events có from_time <= t <= to_time.
+
+        Args:
+            from_time: Start (epoch seconds, inclusive)
+            to_time: End (epoch seconds, inclusive)
+
+        Returns:
+            tuple: (lo, hi)
+        """
+        lo = int(np.searchsorted(self.times, from_time, side="left"))
+        hi = int(np.searchsorted(self.times, to_time, side="right"))
+        return lo, max(lo, hi)
+
+    def counts(self) -> Dict[str, int]:
+        """Số event theo loại."""
+        types, counts = np.unique(self.types.astype(str), return_counts=True)
+        return {str(t): int(n) for t, n in zip(types, counts)}
+
+    def select(self, types: Optional[Iterable[str]] = None,
+               from_time: Optional[int] = None, to_time: Optional[int] = None) -> np.ndarray:
+        """
+        Vị trí (theo thứ tự thời gian) của các events khớp bộ lọc.
+
+        Args:
+            types: Event types to keep (None = all)
+            from_time: Start (epoch seconds, inclusive, None = không giới hạn)
+            to_time: End (epoch seconds, inclusive, None = không giới hạn)
+
+        Returns:
+            numpy.ndarray: Positions into self.events
+        """
+        lo = 0 if from_time is None else int(np.searchsorted(self.times, from_time, side="left"))
+        hi = len(self.times) if to_time is None else int(np.searchsorted(self.times, to_time, side="right"))
+        hi = max(lo, hi)
+        if types is None:
+            return np.arange(lo, hi)
+        return lo + np.flatnonzero(np.isin(self.types[lo:hi], list(types)))
+
+    def rows(self, positions: np.ndarray) -> List[Dict]:
+        """Events (dict) tại các vị trí."""
+        return [self.events[i] for i in positions]
+
+    def columnar(self, positions: np.ndarray) -> Dict[str, list]:
+        """
+        Events tại các vị trí dạng cột: {"time": [...], "type": [...], "price": [...], ...}.
+
+        Gọn hơn nhiều so với list dict khi có hàng chục nghìn events.
+        """
+        data = {"time": self.times[positions].tolist()}
+        for field, values in self.columns.items():
+            data[field] = values[positions].tolist()
+        return data
+
+    def _grouped(self, from_time: int, to_time: int, bucket_seconds: int, types):
+        """Yield (bucket_time, [positions]) của events thuộc `types`, gom theo nến."""
+        lo, hi = self.range(from_time, to_time)
+        positions = lo + np.flatnonzero(np.isin(self.types[lo:hi], types))
+        if len(positions) == 0:
+            return
+        times = self.times[positions]
+        buckets = times - times % bucket_seconds if bucket_seconds > 0 else times
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(positions)]
+        for start, end in zip(starts, ends):
+            yield int(buckets[start]), positions[start:end]
+
+    def marks(self, from_time: int, to_time: int, bucket_seconds: int = 0) -> List[Dict]:
+        """
+        TradingView marks (trên nến) cho các entry trong khoảng thời gian.
+
+        Nhiều entry trong cùng một nến được gom thành một marker, label là số
+        lượng entry và text liệt kê từng entry.
+
+        Args:
+            from_time: Start (epoch seconds)
+            to_time: End (epoch seconds)
+            bucket_seconds: Bar size of the chart resolution (0 = không gom)
+
+        Returns:
+            list: Mark dicts (id, time, color, text, label, labelFontColor, minSize)
+        """
+        marks = []
+        for bucket, positions in self._grouped(from_time, to_time, bucket_seconds, BAR_MARK_TYPES):
+            events = [self.events[i] for i in positions]
+            first = events[0]
+            color = EVENT_COLORS.get(_event_key(first), EVENT_COLORS["entry"])
+            if len(events) == 1:
+                label = "B" if first.get("direction") == "BUY" else "S" if first.get("direction") == "SELL" else "E"
+                text = _event_text(first)
+            else:
+                label = str(len(events)) if len(events) < 10 else "+"
+                text = f"{len(events)} entries\n" + "\n".join(_event_text(event) for event in events)
+            marks.append({
+                "id": f"{bucket}-{int(positions[0])}",
+                "time": bucket,
+                "color": {"border": color, "background": color},
+                "text": text,
+                "label": label,
+                "labelFontColor": "#ffffff",
+                "minSize": 14 if len(events) == 1 else 20,
+            })
+        return marks
+
+    def timescale_marks(self, from_time: int, to_time: int, bucket_seconds: int = 0) -> List[Dict]:
+        """
+        TradingView timescale marks cho exit/break trong khoảng thời gian.
+
+        Args:
+            from_time: Start (epoch seconds)
+            to_time: End (epoch seconds)
+            bucket_seconds: Bar size of the chart resolution (0 = không gom)
+
+        Returns:
+            list: Timescale mark dicts (id, time, color, label, tooltip)
+        """
+        marks = []
+        for bucket, positions in self._grouped(from_time, to_time, bucket_seconds, TIMESCALE_MARK_TYPES):
+            events = [self.events[i] for i in positions]
+            # Exit quan trọng hơn break: nến có exit hiển thị màu exit
+            has_exit = any(event.get("type") == "exit" for event in events)
+            marks.append({
+                "id": f"ts-{bucket}-{int(positions[0])}",
+                "time": bucket,
+                "color": EVENT_COLORS["exit" if has_exit else "break"],
+                "label": "X" if has_exit else "!",
+                "tooltip": [_event_text(event) for event in events],
+            })
+        return marks
@@ -0,0 +1,182 @@
+"""
+File Watcher - Theo dõi thư mục data (polling) và báo khi file thay đổi
+
+Mỗi lần poll chỉ stat các file; hash một phần (đầu + cuối file) chỉ được
+tính khi size/mtime đổi, để phân biệt:
+- "added" / "removed": file mới / bị xóa
+- "appended": file dài ra và phần đầu giữ nguyên (downloader nối thêm nến)
+- "modified": nội dung thay đổi
+File chỉ bị touch (mtime đổi, size + hash giữ nguyên) không tạo event.
+"""
+
+import hashlib
+import os
+import threading
+import traceback
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# Số byte đầu/cuối file dùng để hash
+HASH_BYTES = 64 * 1024
+
+# Loại thay đổi
+FILE_ADDED = "added"
+FILE_REMOVED = "removed"
+FILE_APPENDED = "appended"
+FILE_MODIFIED = "modified"
+
+
+def _hash_range(path: str, offset: int, length: int) -> str:
+    """sha1 của `length` byte bắt đầu từ `offset`."""
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        return hashlib.sha1(f.read(length)).hexdigest()
+
+
+class FileState:
+    """Trạng thái đã biết của một file: size, mtime và hash đầu/cuối."""
+
+    __slots__ = ("size", "mtime_ns", "head_length", "head_hash", "tail_hash")
+
+    def __init__(self, path: str, size: int, mtime_ns: int):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.head_length = min(size, HASH_BYTES)
+        self.head_hash = _hash_range(path, 0, self.head_length)
+        tail_length = min(size, HASH_BYTES)
+        self.tail_hash = _hash_range(path, size - tail_length, tail_length)
+
+
+class DataDirWatcher:
+    """
+    Poll một thư mục theo chu kỳ và gọi callback(path, kind) khi file thay đổi.
+
+    Giữ danh sách file hiện có (files(), latest()) để các endpoint không
+    phải glob/stat cả thư mục ở mỗi request.
+    """
+
+    def __init__(self, directory: str = "data/raw", pattern: str = "*.csv", interval: float = 2.0):
+        """
+        Initialize watcher.
+
+        Args:
+            directory: Directory to watch
+            pattern: Glob pattern of watched files
+            interval: Seconds between polls
+        """
+        self.directory = Path(directory)
+        self.pattern = pattern
+        self.interval = float(interval)
+        self._states: Dict[str, FileState] = {}
+        self._callbacks: List[Callable[[str, str], None]] = []
+        self._lock = threading.Lock()
+        # Chỉ một lần poll tại một thời điểm (thread nền và lần quét đầu từ request)
+        self._poll_lock = threading.Lock()
+        self._scanned = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, callback: Callable[[str, str], None]):
+        """Đăng ký callback(path, kind), gọi trong thread của watcher."""
+        self._callbacks.append(callback)
+
+    def _classify(self, path: str, old: Optional[FileState], size: int, mtime_ns: int):
+        """Trả về (kind hoặc None, state mới)."""
+        if old is not None and old.size == size and old.mtime_ns == mtime_ns:
+            return None, old
+        state = FileState(path, size, mtime_ns)
+        if old is None:
+            return FILE_ADDED, state
+        if size == old.size and state.head_hash == old.head_hash and state.tail_hash == old.tail_hash:
+            # Chỉ bị touch
+            return None, state
+        if size > old.size and _hash_range(path, 0, old.head_length) == old.head_hash:
+            return FILE_APPENDED, state
+        return FILE_MODIFIED, state
+
+    def poll(self) -> List[Tuple[str, str]]:
+        """
+        Quét thư mục một lần, cập nhật trạng thái và gọi callback.
+
+        Lần quét đầu tiên chỉ ghi nhận trạng thái ban đầu, không tạo event.
+
+        Returns:
+            list: (path, kind) của các thay đổi
+        """
+        with self._poll_lock:
+            return self._poll_locked()
+
+    def _poll_locked(self) -> List[Tuple[str, str]]:
+        changes = []
+        seen = {}
+        paths = sorted(self.directory.glob(self.pattern)) if self.directory.exists() else []
+        for file in paths:
+            path = str(file)
+            try:
+                stat = os.stat(path)
+                kind, state = self._classify(path, self._states.get(path), stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                # File đang bị ghi/xóa: xử lý ở lần poll sau
+                continue
+            seen[path] = state
+            if kind is not None:
+                changes.append((path, kind))
+        changes.extend((path, FILE_REMOVED) for path in self._states if path not in seen)
+
+        with self._lock:
+            first_scan = not self._scanned
+            self._states = seen
+            self._scanned = True
+        if first_scan:
+            return []
+
+        for path, kind in changes:
+            for callback in self._callbacks:
+                try:
+                    callback(path, kind)
+                except Exception:
+                    traceback.print_exc()
+        return changes
+
+    def _ensure_scanned(self):
+        if not self._scanned:
+            self.poll()
+
+    def files(self) -> List[str]:
+        """Các file đang có (theo tên)."""
+        self._ensure_scanned()
+        with self._lock:
+            return sorted(self._states)
+
+    def latest(self) -> Optional[str]:
+        """File sửa đổi gần nhất, None nếu thư mục rỗng."""
+        self._ensure_scanned()
+        with self._lock:
+            if not self._states:
+                return None
+            return max(self._states, key=lambda path: self._states[path].mtime_ns)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                traceback.print_exc()
+
+    def start(self):
+        """Chạy poll trong thread nền (quét ban đầu ngay lập tức)."""
+        if self._thread is not None:
+            return
+        self._ensure_scanned()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="data-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Dừng thread nền."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=self.interval + 1)
+        self._thread = None
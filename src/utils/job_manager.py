@@ -0,0 +1,311 @@
+"""
+Job Manager - Chạy backtest/tối ưu trong process pool giới hạn, không chặn web server
+"""
+
+import multiprocessing as mp
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+
+# Trạng thái job
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+FINISHED_STATES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+# Khoảng cách tối thiểu (giây) giữa hai lần worker gửi progress
+PROGRESS_MIN_INTERVAL = 0.2
+
+# Set trong mỗi worker process bởi _init_worker
+_progress_queue = None
+_cancel_flags = None
+
+
+class JobCancelled(Exception):
+    """Raised inside a worker when its job has been cancelled."""
+
+
+def _init_worker(progress_queue, cancel_flags):
+    """Process pool initializer: keep the shared progress queue and cancel flags."""
+    global _progress_queue, _cancel_flags
+    _progress_queue = progress_queue
+    _cancel_flags = cancel_flags
+
+
+def check_cancelled(job_id: str):
+    """Raise JobCancelled nếu job đã bị hủy (gọi trong worker)."""
+    if _cancel_flags is not None and _cancel_flags.get(job_id):
+        raise JobCancelled(job_id)
+
+
+def report_progress(job_id: str, **progress):
+    """
+    Gửi progress từ worker về process chính (không chờ, không giữ lock chung).
+
+    Đồng thời là điểm kiểm tra hủy: raise JobCancelled nếu job đã bị hủy.
+
+    Args:
+        job_id: Job id
+        **progress: Progress fields (e.g. completed=3, total=36)
+    """
+    check_cancelled(job_id)
+    if _progress_queue is not None:
+        _progress_queue.put((job_id, "progress", progress))
+
+
+def _run_job(job_id: str, func: Callable, params: Dict):
+    """Worker entry point: run `func(params, progress_callback=...)`."""
+    # Job đã nằm sẵn trong hàng đợi của pool (future.cancel() thất bại) nhưng bị hủy trước khi chạy
+    check_cancelled(job_id)
+    if _progress_queue is not None:
+        _progress_queue.put((job_id, "started", {}))
+    last_sent = [0.0]
+
+    def progress_callback(**progress):
+        # Hủy được kiểm tra ở mỗi lần gọi, kể cả khi progress bị bỏ do giới hạn tần suất
+        check_cancelled(job_id)
+        # Giới hạn tần suất: chỉ gửi bản mới nhất, mỗi worker tự đếm giờ riêng
+        now = time.monotonic()
+        if now - last_sent[0] < PROGRESS_MIN_INTERVAL:
+            return
+        last_sent[0] = now
+        report_progress(job_id, **progress)
+
+    return func(params, progress_callback=progress_callback)
+
+
+class Job:
+    """One submitted unit of work and its current state."""
+
+    def __init__(self, job_id: str, kind: str, params: Dict):
+        self.job_id = job_id
+        self.kind = kind
+        self.params = params
+        self.status = JOB_PENDING
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        # Tăng mỗi khi status/progress thay đổi (SSE chỉ gửi khi version đổi)
+        self.version = 0
+
+    def progress_snapshot(self):
+        """
+        Progress kèm các giá trị suy ra: elapsed, fraction, eta_seconds, bars_per_sec.
+
+        Worker báo `completed`/`total` (số tổ hợp tối ưu) hoặc `bars_done`/`total_bars`
+        (một backtest), và tùy chọn `bars_processed` (tổng số nến đã chạy).
+        """
+        progress = dict(self.progress)
+        if self.started_at is None:
+            return progress
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        progress["elapsed"] = elapsed
+
+        if progress.get("total"):
+            fraction = progress.get("completed", 0) / progress["total"]
+        elif progress.get("total_bars"):
+            fraction = progress.get("bars_done", 0) / progress["total_bars"]
+        else:
+            fraction = None
+        if self.status == JOB_DONE:
+            fraction = 1.0
+        if fraction is not None:
+            progress["fraction"] = fraction
+            if fraction > 0 and self.status not in FINISHED_STATES:
+                progress["eta_seconds"] = elapsed * (1 - fraction) / fraction
+
+        bars = progress.get("bars_processed", progress.get("bars_done"))
+        if bars is not None and elapsed > 0:
+            progress["bars_per_sec"] = bars / elapsed
+        return progress
+
+    def to_dict(self):
+        """Status snapshot (without the result payload)."""
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress_snapshot(),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    Quản lý job chạy trong ProcessPoolExecutor.
+
+    - submit() trả về job ngay, công việc chạy ở worker process
+    - Tối đa `max_workers` job chạy đồng thời, job khác xếp hàng (pending)
+    - Progress từ worker đi qua một multiprocessing.Queue, thread listener
+      ở process chính cập nhật vào Job
+    - cancel(): job pending bị bỏ khỏi hàng đợi; job đang chạy dừng ở lần
+      báo progress tiếp theo
+    """
+
+    def __init__(self, max_workers: int = 2, max_finished: int = 50):
+        """
+        Initialize job manager.
+
+        Args:
+            max_workers: Maximum concurrently running jobs (process pool size)
+            max_finished: Finished jobs kept for status/result queries
+        """
+        self.max_workers = max(int(max_workers), 1)
+        self.max_finished = max_finished
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._manager = None
+        self._cancel_flags = None
+        self._progress_queue = None
+        self._listener = None
+
+    def _ensure_started(self):
+        """Start the pool, shared state and listener thread on first use."""
+        if self._executor is not None:
+            return
+        # spawn: an toàn với thread của web server và giống hành vi trên Windows
+        ctx = mp.get_context("spawn")
+        self._manager = ctx.Manager()
+        self._cancel_flags = self._manager.dict()
+        self._progress_queue = ctx.Queue()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(self._progress_queue, self._cancel_flags),
+        )
+        self._listener = threading.Thread(target=self._listen, name="job-progress", daemon=True)
+        self._listener.start()
+
+    def _listen(self):
+        """Drain progress messages from workers."""
+        while True:
+            message = self._progress_queue.get()
+            if message is None:
+                break
+            job_id, kind, payload = message
+            with self._lock:
+                job = self.jobs.get(job_id)
+                if job is None or job.status in FINISHED_STATES:
+                    continue
+                if kind == "started":
+                    job.status = JOB_RUNNING
+                    job.started_at = time.time()
+                elif kind == "progress":
+                    job.progress.update(payload)
+                job.version += 1
+
+    def submit(self, kind: str, func: Callable, params: Dict) -> Job:
+        """
+        Submit a job.
+
+        Args:
+            kind: Job type label (e.g. "backtest")
+            func: Top-level picklable callable(params, progress_callback=...)
+            params: Plain-dict parameters passed to func
+
+        Returns:
+            Job: The created job (status pending)
+        """
+        self._ensure_started()
+        job = Job(uuid.uuid4().hex, kind, params)
+        with self._lock:
+            self.jobs[job.job_id] = job
+            self._prune()
+        job.future = self._executor.submit(_run_job, job.job_id, func, params)
+        job.future.add_done_callback(lambda future, job=job: self._on_done(job, future))
+        return job
+
+    def warm_up(self, func: Callable, *args) -> List[Future]:
+        """
+        Start all workers and run `func(*args)` once per worker slot.
+
+        Workers are spawned (and import the backtest stack) before the first
+        job instead of on it; `func` can preload per-process caches. Not a
+        job: no progress, not listed.
+
+        Args:
+            func: Top-level picklable callable
+            *args: Arguments for func
+
+        Returns:
+            list: One Future per worker slot
+        """
+        self._ensure_started()
+        return [self._executor.submit(func, *args) for _ in range(self.max_workers)]
+
+    def _on_done(self, job: Job, future):
+        """Record the outcome of a finished future."""
+        with self._lock:
+            job.finished_at = time.time()
+            try:
+                job.result = future.result()
+                job.status = JOB_DONE
+            except (CancelledError, JobCancelled):
+                job.status = JOB_CANCELLED
+            except Exception as e:
+                job.status = JOB_FAILED
+                job.error = str(e)
+                traceback.print_exception(type(e), e, e.__traceback__)
+            job.version += 1
+            if self._cancel_flags is not None:
+                self._cancel_flags.pop(job.job_id, None)
+
+    def _prune(self):
+        """Drop the oldest finished jobs beyond max_finished (lock held)."""
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in FINISHED_STATES]
+        for job_id in finished[:max(len(finished) - self.max_finished, 0)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return a job by id, or None."""
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list(self):
+        """Status snapshots of all known jobs, oldest first."""
+        with self._lock:
+            return [job.to_dict() for job in self.jobs.values()]
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job.
+
+        Args:
+            job_id: Job id
+
+        Returns:
+            bool: False if the job is unknown or already finished
+        """
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED_STATES:
+            return False
+        if not job.future.cancel():
+            # Đang chạy: worker sẽ dừng ở lần report_progress tiếp theo
+            self._cancel_flags[job_id] = True
+        return True
+
+    def shutdown(self):
+        """Stop the pool and listener (pending jobs are cancelled)."""
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._progress_queue.put(None)
+        self._manager.shutdown()
+        self._executor = None
@@ -0,0 +1,258 @@
+"""
+Series Cache - Cache dữ liệu OHLCV đã resample theo (file fingerprint, resolution)
+
+Dùng cho TradingView /api/tv/history: lấy nến từ bar store (kim tự tháp đã lưu)
+một lần cho mỗi file và resolution, sau đó mỗi request chỉ cần searchsorted
+để cắt khoảng thời gian.
+"""
+
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.utils.bar_store import BarPyramid, RESOLUTION_ALIASES
+from src.utils.data_loader import DataLoader
+from src.utils.dataset_cache import get_dataset_cache
+from src.utils.dataset_registry import file_fingerprint, get_registry
+
+
+# TradingView resolution -> pandas frequency (chỉ các resolution intraday được resample,
+# 1D/1W/1M trả về nến gốc như trước đây)
+RESAMPLE_FREQ = {
+    "1": "1min",
+    "5": "5min",
+    "15": "15min",
+    "30": "30min",
+    "60": "1h",
+    "240": "4h",
+}
+
+# Resolution được build sẵn khi warm()
+COMMON_RESOLUTIONS = ("1", "5", "15", "60", "240")
+
+
+class ResampledSeries:
+    """OHLCV của một resolution, index UTC tăng dần + mảng epoch giây để tra cứu."""
+
+    def __init__(self, frame: pd.DataFrame):
+        """
+        Initialize series.
+
+        Args:
+            frame: DataFrame with tz-aware UTC DatetimeIndex (sorted) and OHLCV columns
+        """
+        self.frame = frame
+        # as_unit('ns'): index có thể ở đơn vị s/ms/us tùy cách parse
+        self.times = frame.index.as_unit('ns').asi8 // 10**9
+        # Mảng cột liên tục để cắt và serialize trực tiếp (không qua từng row)
+        self.open = frame['open'].to_numpy(dtype=np.float64)
+        self.high = frame['high'].to_numpy(dtype=np.float64)
+        self.low = frame['low'].to_numpy(dtype=np.float64)
+        self.close = frame['close'].to_numpy(dtype=np.float64)
+        if 'volume' in frame.columns:
+            self.volume = frame['volume'].to_numpy(dtype=np.float64)
+        else:
+            self.volume = np.zeros(len(frame))
+
+    def __len__(self):
+        return len(self.times)
+
+    def range(self, from_time: int, to_time: int) -> Tuple[int, int]:
+        """
+        Vị trí [lo, hi) của các nến có from_time <= t <= to_time.
+
+        Args:
+            from_time: Start (epoch seconds, inclusive)
+            to_time: End (epoch seconds, inclusive)
+
+        Returns:
+            tuple: (lo, hi) positions for iloc slicing
+        """
+        lo = int(np.searchsorted(self.times, from_time, side="left"))
+        hi = int(np.searchsorted(self.times, to_time, side="right"))
+        return lo, max(lo, hi)
+
+    def last_n(self, to_time: int, count: int) -> Tuple[int, int]:
+        """
+        Vị trí [lo, hi) của tối đa `count` nến cuối cùng có t <= to_time.
+
+        Args:
+            to_time: End (epoch seconds, inclusive)
+            count: Number of bars
+
+        Returns:
+            tuple: (lo, hi) positions for iloc slicing
+        """
+        hi = int(np.searchsorted(self.times, to_time, side="right"))
+        return max(hi - count, 0), hi
+
+    def columns(self, lo: int, hi: int) -> Dict[str, np.ndarray]:
+        """
+        Các cột UDF (t/o/h/l/c/v) của khoảng [lo, hi), là view không copy.
+
+        Returns:
+            dict: "t" int64 epoch seconds, "o"/"h"/"l"/"c"/"v" float64
+        """
+        return {
+            "t": self.times[lo:hi],
+            "o": self.open[lo:hi],
+            "h": self.high[lo:hi],
+            "l": self.low[lo:hi],
+            "c": self.close[lo:hi],
+            "v": self.volume[lo:hi],
+        }
+
+
+class ResampledSeriesCache:
+    """
+    Cache ResampledSeries theo file và resolution.
+
+    - Mỗi file giữ fingerprint (size, mtime); khi file thay đổi toàn bộ
+      resolution của file đó bị bỏ và build lại ở lần truy cập sau
+    - Tra cứu không cần lock (chỉ đọc dict); lock chỉ dùng khi build
+    - Giữ tối đa `max_files` file, bỏ file dùng lâu nhất
+    """
+
+    def __init__(self, max_files: int = 4, source: str = "auto", store_dir: Optional[str] = None):
+        """
+        Initialize cache.
+
+        Args:
+            max_files: Maximum number of data files kept in memory
+            source: DataLoader source format used to load files
+            store_dir: Bar store directory (default: data/store)
+        """
+        self.max_files = max(int(max_files), 1)
+        self.source = source
+        self.store_dir = store_dir
+        # path -> {"fingerprint", "pyramid", "base": DataFrame, "series": {resolution: ResampledSeries}}
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(file_path) -> str:
+        return str(Path(file_path).resolve())
+
+    def _fresh_entry(self, key: str) -> Optional[Dict]:
+        """Entry của file nếu fingerprint còn khớp, ngược lại None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        try:
+            if entry["fingerprint"] != file_fingerprint(key):
+                return None
+        except OSError:
+            return None
+        return entry
+
+    def peek(self, file_path, resolution: str) -> Optional[ResampledSeries]:
+        """
+        Lấy series đã có sẵn mà không load/resample (an toàn để gọi trong event loop).
+
+        Returns:
+            ResampledSeries or None if not cached or stale
+        """
+        key = self._key(file_path)
+        entry = self._fresh_entry(key)
+        if entry is None:
+            return None
+        # Đánh dấu file vừa dùng (LRU). Không lấy lock vì lock có thể đang giữ trong lúc load;
+        # move_to_end là một thao tác nguyên tử, chỉ cần bỏ qua khi entry vừa bị bỏ.
+        try:
+            self._entries.move_to_end(key)
+        except KeyError:
+            pass
+        return entry["series"].get(resolution)
+
+    def get(self, file_path, resolution: str) -> ResampledSeries:
+        """
+        Lấy series, load file và resample nếu chưa có hoặc file đã thay đổi.
+
+        Args:
+            file_path: Path to data CSV
+            resolution: TradingView resolution ("1", "5", "60", "1D", ...)
+
+        Returns:
+            ResampledSeries
+        """
+        series = self.peek(file_path, resolution)
+        if series is not None:
+            return series
+
+        key = self._key(file_path)
+        with self._lock:
+            entry = self._fresh_entry(key)
+            if entry is None:
+                entry = self._load(key)
+                self._entries[key] = entry
+                while len(self._entries) > self.max_files:
+                    self._entries.popitem(last=False)
+            self._entries.move_to_end(key)
+
+            series = entry["series"].get(resolution)
+            if series is None:
+                series = ResampledSeries(self._resample(entry, resolution))
+                entry["series"][resolution] = series
+            return series
+
+    def warm(self, file_path, resolutions: Iterable[str] = COMMON_RESOLUTIONS):
+        """Build sẵn các resolution thường dùng cho một file."""
+        for resolution in resolutions:
+            self.get(file_path, resolution)
+
+    def invalidate(self, file_path=None):
+        """Bỏ cache của một file (hoặc toàn bộ nếu file_path là None)."""
+        with self._lock:
+            if file_path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(self._key(file_path), None)
+
+    def _load(self, key: str) -> Dict:
+        """Đồng bộ bar store của file (nếu cần) và lấy nến gốc với index UTC."""
+        # Lấy fingerprint trước khi đọc: nếu file đổi trong lúc đọc, lần sau sẽ build lại
+        fingerprint = file_fingerprint(key)
+        pyramid = BarPyramid(key, store_dir=self.store_dir)
+        if pyramid.is_stale():
+            if self.store_dir is None:
+                # Dataset cache load qua DataLoader.load_bars, đồng bộ luôn bar store mặc định
+                df = get_dataset_cache().get(key, source=self.source)
+            else:
+                df = DataLoader().load_csv(key, source=self.source)
+            if pyramid.is_stale():
+                pyramid.sync(df)
+            get_registry().register(key, df)
+        base = _to_utc(pyramid.read_base())
+        return {"fingerprint": fingerprint, "pyramid": pyramid, "base": base, "series": {}}
+
+    @staticmethod
+    def _resample(entry: Dict, resolution: str) -> pd.DataFrame:
+        """
+        Nến của một resolution: level có sẵn trong pyramid nếu được, ngược lại
+        resample nến gốc (intraday); 1D/1W/1M giữ nguyên nến gốc.
+        """
+        freq = RESAMPLE_FREQ.get(resolution)
+        if freq is None:
+            return entry["base"]
+        level = RESOLUTION_ALIASES.get(resolution)
+        if level in entry["pyramid"].levels:
+            return _to_utc(entry["pyramid"].read(level))
+
+        df = entry["base"]
+        return df.resample(freq).agg({
+            'open': 'first',
+            'high': 'max',
+            'low': 'min',
+            'close': 'last',
+            'volume': 'sum',
+        }).dropna()
+
+
+def _to_utc(df: pd.DataFrame) -> pd.DataFrame:
+    """Gắn timezone UTC cho index naive của bar store."""
+    df.index = df.index.tz_localize('UTC')
+    return df
@@ -0,0 +1,67 @@
+"""
+Shared fixtures: dữ liệu nến tổng hợp (tất định) và config chiến lược
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def make_bars(count=6000, seed=7, start="2023-01-02", freq="h"):
+    """Random-walk OHLCV (index naive UTC tên 'timestamp') như DataLoader.load_csv trả về."""
+    rng = np.random.default_rng(seed)
+    close = 1800 + np.cumsum(rng.normal(0, 2.0, count))
+    open_ = np.r_[close[0], close[:-1]]
+    wick = np.abs(rng.normal(0, 1.0, count))
+    index = pd.date_range(start, periods=count, freq=freq, name="timestamp")
+    return pd.DataFrame({
+        "open": open_,
+        "high": np.maximum(open_, close) + wick,
+        "low": np.minimum(open_, close) - wick,
+        "close": close,
+        "volume": 1.0,
+    }, index=index)
+
+
+def write_csv(path, bars):
+    """Ghi nến ra CSV dạng standard (timestamp,open,high,low,close,volume)."""
+    bars.reset_index().to_csv(path, index=False)
+    return path
+
+
+def make_config(direction_mode="AUTO", trading=None):
+    """Config dict đầy đủ (lot 0.01 * STT entry, vào lệnh từ entry 1)."""
+    config = {
+        "strategy": {
+            "direction_mode": direction_mode,
+            "rsi_period": 14,
+            "rsi_entry_threshold": {"buy": 35, "sell": 65},
+            "rsi_break_threshold": {"buy": 40, "sell": 60},
+            "rsi_exit": {"threshold": 50, "tolerance": 1, "use_open": True},
+            "min_entries_before_break": 3,
+            "entry_range": {"count_only": [], "trade": [1, 40], "wait_exit": [41, None]},
+        },
+        "lot_sizes": {f"entry_{i}": round(0.01 * i, 2) for i in range(1, 41)},
+        "portfolio": {"initial_capital": 10000},
+    }
+    if trading is not None:
+        config["trading"] = trading
+    return config
+
+
+@pytest.fixture(scope="session")
+def bars():
+    return make_bars()
+
+
+@pytest.fixture
+def isolated_store(tmp_path, monkeypatch):
+    """Bar store, dataset cache và registry dùng chung trỏ vào thư mục tạm (không ghi vào data/store)."""
+    from src.utils import bar_store, dataset_cache, dataset_registry
+
+    store_dir = tmp_path / "store"
+    monkeypatch.setattr(bar_store, "DEFAULT_STORE_DIR", str(store_dir))
+    monkeypatch.setattr(dataset_cache, "_default_cache", dataset_cache.DatasetCache())
+    monkeypatch.setattr(dataset_registry, "_default_registry",
+                        dataset_registry.DatasetRegistry(store_dir / "registry.json"))
+    return store_dir
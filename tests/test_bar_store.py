@@ -0,0 +1,124 @@
+"""
+Tests for BarPyramid (append-only sync, rebuild khi dữ liệu cũ thay đổi, các level tổng hợp)
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils.bar_store import BarPyramid, aggregate_records, frame_to_records, records_to_frame
+from tests.conftest import make_bars
+
+
+@pytest.fixture
+def m1():
+    return make_bars(count=3000, freq="min")
+
+
+@pytest.fixture
+def pyramid(tmp_path, monkeypatch):
+    source = tmp_path / "xauusd_m1.csv"
+    source.write_text("timestamp,open,high,low,close,volume\n")
+    pyramid = BarPyramid(source, store_dir=tmp_path / "store")
+
+    # Đếm số lần build lại toàn bộ
+    rebuilds = []
+    original = pyramid._rebuild_locked
+
+    def spy(records):
+        rebuilds.append(len(records))
+        return original(records)
+
+    monkeypatch.setattr(pyramid, "_rebuild_locked", spy)
+    pyramid.rebuilds = rebuilds
+    return pyramid
+
+
+def _resample(df, freq):
+    return df.resample(freq).agg({
+        "open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum",
+    }).dropna()
+
+
+def _assert_frame(actual, expected):
+    pd.testing.assert_frame_equal(actual, expected, check_freq=False, check_index_type=False)
+
+
+def test_aggregate_records_matches_resample(m1):
+    for seconds, freq in [(300, "5min"), (3600, "h"), (14400, "4h")]:
+        actual = records_to_frame(aggregate_records(frame_to_records(m1), seconds))
+        _assert_frame(actual, _resample(m1, freq))
+
+
+def test_sync_builds_levels(pyramid, m1):
+    pyramid.sync(m1)
+
+    assert pyramid.rebuilds == [3000]
+    assert pyramid.base_interval == 60
+    assert pyramid.levels == ["M1", "M5", "M15", "H1", "H4", "D1"]
+    assert not pyramid.is_stale()
+    _assert_frame(pyramid.read_base(), m1)
+    _assert_frame(pyramid.read("M1"), m1)
+    _assert_frame(pyramid.read("H1"), _resample(m1, "h"))
+    _assert_frame(pyramid.read("1D"), _resample(m1, "D"))
+
+
+def test_sync_appends_new_bars(pyramid, m1):
+    # Cắt giữa một nến H1 để nến tổng hợp cuối phải được tính lại
+    pyramid.sync(m1.iloc[:2030])
+    pyramid.sync(m1)
+
+    assert pyramid.rebuilds == [2030]
+    assert pyramid.meta["rows"] == 3000
+    _assert_frame(pyramid.read_base(), m1)
+    for level, freq in [("M5", "5min"), ("M15", "15min"), ("H1", "h"), ("H4", "4h")]:
+        _assert_frame(pyramid.read(level), _resample(m1, freq))
+
+    # Không có gì mới: không build lại
+    pyramid.sync(m1)
+    assert pyramid.rebuilds == [2030]
+
+
+def test_sync_rebuilds_when_stored_bar_changes(pyramid, m1):
+    pyramid.sync(m1)
+
+    # Sửa một nến giữa file, giữ nguyên số dòng và nến đầu/cuối
+    edited = m1.copy()
+    edited.iloc[500, edited.columns.get_loc("close")] = 1900.0
+    pyramid.sync(edited)
+
+    assert pyramid.rebuilds == [3000, 3000]
+    assert pyramid.read_base()["close"].iloc[500] == 1900.0
+    _assert_frame(pyramid.read("H1"), _resample(edited, "h"))
+
+
+def test_sync_rebuilds_when_data_shrinks(pyramid, m1):
+    pyramid.sync(m1)
+    pyramid.sync(m1.iloc[:1000])
+
+    assert pyramid.rebuilds == [3000, 1000]
+    _assert_frame(pyramid.read_base(), m1.iloc[:1000])
+    _assert_frame(pyramid.read("M15"), _resample(m1.iloc[:1000], "15min"))
+
+
+def test_append_only_adds_later_bars(pyramid, m1):
+    pyramid.sync(m1.iloc[:2000])
+
+    # Nến trùng với phần đã lưu bị bỏ qua
+    assert pyramid.append(m1.iloc[1990:]) == 1000
+    assert pyramid.append(m1.iloc[:10]) == 0
+
+    _assert_frame(pyramid.read_base(), m1)
+    _assert_frame(pyramid.read("H4"), _resample(m1, "4h"))
+
+
+def test_read_rejects_finer_resolution(pyramid, m1):
+    pyramid.sync(_resample(m1, "h"))
+
+    assert pyramid.base_interval == 3600
+    assert pyramid.levels == ["H1", "H4", "D1"]
+    with pytest.raises(ValueError):
+        pyramid.read("M5")
+    with pytest.raises(ValueError):
+        pyramid.read("W1")
+    np.testing.assert_array_equal(pyramid.read("60")["close"], _resample(m1, "h")["close"])
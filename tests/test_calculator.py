@@ -0,0 +1,84 @@
+"""
+Tests for PnLCalculator (chi phí giao dịch, P&L theo mảng)
+"""
+
+import numpy as np
+import pytest
+
+from src.backtest.portfolio import PositionBook
+from src.config.strategy_config import TRADING_DEFAULTS
+from src.utils.calculator import PnLCalculator
+
+
+def test_cost_per_lot_formula():
+    calculator = PnLCalculator(spread_pips=3, slippage_pips=1, commission_per_lot=7,
+                               pip_size=0.1, contract_size=100)
+    # (spread + 2 * slippage) * pip * contract + commission
+    assert calculator.cost_per_lot == pytest.approx((3 + 2 * 1) * 0.1 * 100 + 7)
+    assert PnLCalculator(spread_pips=0, slippage_pips=0, commission_per_lot=0).cost_per_lot == 0
+
+
+def test_defaults_shared_with_config():
+    default = PnLCalculator()
+    configured = PnLCalculator.from_config({})
+
+    for key, value in TRADING_DEFAULTS.items():
+        assert getattr(default, key) == value
+        assert getattr(configured, key) == value
+    assert default.cost_per_lot == configured.cost_per_lot == 50.0
+
+
+def test_from_config_reads_trading_section():
+    calculator = PnLCalculator.from_config({"trading": {"spread_pips": 2, "slippage_pips": 0,
+                                                        "commission_per_lot": 5}})
+    assert calculator.cost_per_lot == pytest.approx(2 * 0.1 * 100 + 5)
+
+
+def test_batch_pnl_directions_and_costs():
+    calculator = PnLCalculator(spread_pips=2, slippage_pips=0, commission_per_lot=0)  # 20 / lot
+    entry = np.array([1800.0, 1800.0, 1800.0, 1790.0])
+    lots = np.array([0.1, 0.2, 0.5, 0.1])
+
+    pnl = calculator.calculate_pnl_batch(entry, 1810.0, lots, ["BUY", "SELL", "HOLD", "BUY"])
+    expected = [10 * 0.1 * 100 - 2, -10 * 0.2 * 100 - 4, 0.0, 20 * 0.1 * 100 - 2]
+    np.testing.assert_allclose(pnl, expected)
+
+    # Mã số (như trong PositionBook) cho cùng kết quả với chuỗi
+    codes = np.array([1, -1, 0, 1], dtype=np.int8)
+    np.testing.assert_allclose(calculator.calculate_pnl_batch(entry, 1810.0, lots, codes), expected)
+
+    # Giá ra theo từng lệnh
+    exits = np.array([1810.0, 1790.0, 1700.0, 1790.0])
+    np.testing.assert_allclose(
+        calculator.calculate_pnl_batch(entry, exits, lots, codes),
+        [10 * 0.1 * 100 - 2, 10 * 0.2 * 100 - 4, 0.0, -2.0],
+    )
+
+
+def test_scalar_pnl_matches_batch():
+    calculator = PnLCalculator()
+    assert calculator.calculate_pnl(1800.0, 1805.0, 0.1, "BUY") == pytest.approx(5 * 0.1 * 100 - 5)
+    assert calculator.calculate_pnl(1800.0, 1805.0, 0.1, "SELL") == pytest.approx(-5 * 0.1 * 100 - 5)
+    assert isinstance(calculator.calculate_pnl(1800.0, 1805.0, 0.1, "BUY"), float)
+
+
+def test_reprice_book_with_other_costs():
+    book = PositionBook()
+    book.append(1, "BUY", 1800.0, 0.1)
+    book.append(2, "SELL", 1805.0, 0.2)
+    book.close_open(1803.0)
+    book.append(1, "BUY", 1803.0, 0.1)  # Còn mở
+
+    assert book.pnl.tolist()[:2] == pytest.approx([30.0, 40.0])
+    repriced = PnLCalculator(spread_pips=3, slippage_pips=1, commission_per_lot=0).reprice(book)
+    np.testing.assert_allclose(repriced[:2], [30.0 - 5.0, 40.0 - 10.0])
+    assert np.isnan(repriced[2])
+
+
+def test_average_entry_price():
+    book = PositionBook()
+    book.append(1, "BUY", 1800.0, 0.1)
+    book.append(2, "BUY", 1790.0, 0.3)
+    calculator = PnLCalculator()
+    assert calculator.calculate_average_entry_price(book.views()) == pytest.approx(1792.5)
+    assert calculator.calculate_average_entry_price([]) == 0.0
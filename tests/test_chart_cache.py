@@ -0,0 +1,121 @@
+"""
+Tests for ChartCache (key theo fingerprint, dọn theo tuổi/dung lượng, whitelist tên file)
+"""
+
+import os
+import time
+
+import pytest
+
+from src.utils.chart_cache import PARTIAL_MAX_AGE, ChartCache, chart_key
+
+
+RUN = {"rsi_entry_buy": 30, "direction": "SELL"}
+WINDOW = {"max_bars": 1000}
+STYLE = {"title": "XAUUSD"}
+
+
+def _age(path, seconds):
+    """Lùi mtime của file về `seconds` giây trước."""
+    stamp = time.time() - seconds
+    os.utime(path, (stamp, stamp))
+
+
+def _chart(cache, key, size=100, age=0):
+    path = cache.path_for(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"\x89PNG" + b"\0" * (size - 4))
+    _age(path, age)
+    return path
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ChartCache(tmp_path / "charts", max_age=3600, max_bytes=300)
+
+
+def test_chart_key(tmp_path):
+    source = tmp_path / "xauusd_h1.csv"
+    source.write_text("timestamp,open,high,low,close,volume\n")
+    key = chart_key(source, RUN, WINDOW, STYLE)
+
+    assert len(key) == 40 and int(key, 16) >= 0
+    assert chart_key(source, dict(reversed(list(RUN.items()))), WINDOW, STYLE) == key
+    assert chart_key(source, {**RUN, "rsi_entry_buy": 25}, WINDOW, STYLE) != key
+    assert chart_key(source, RUN, {"max_bars": None, "buckets": 1200}, STYLE) != key
+
+    # File data đổi (chỉ mtime) -> key mới
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert chart_key(source, RUN, WINDOW, STYLE) != key
+
+    with pytest.raises(FileNotFoundError):
+        chart_key(tmp_path / "missing.csv", RUN, WINDOW, STYLE)
+
+
+def test_lookup_touches_and_expires(cache):
+    assert cache.lookup("a" * 40) is None
+
+    fresh = _chart(cache, "a" * 40, age=600)
+    assert cache.lookup("a" * 40) == fresh
+    assert time.time() - fresh.stat().st_mtime < 60  # mtime = lần dùng gần nhất
+
+    expired = _chart(cache, "b" * 40, age=7200)
+    assert cache.lookup("b" * 40) is None
+    assert not expired.exists()
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 2, 1)
+
+
+def test_evict_by_age_then_bytes(cache):
+    old = _chart(cache, "0" * 40, age=7200)
+    charts = [_chart(cache, f"{i}" * 40, age=age) for i, age in [(1, 300), (2, 100), (3, 200), (4, 50)]]
+    # File khác trong thư mục không bị động tới
+    other = cache.directory / "notes.png"
+    other.write_bytes(b"x" * 1000)
+    partial = cache.partial_path("5" * 40)
+    partial.write_bytes(b"x" * 1000)
+    stale_partial = cache.directory / f".chart_{'6' * 40}.1.png"
+    stale_partial.write_bytes(b"x" * 1000)
+    _age(stale_partial, PARTIAL_MAX_AGE + 60)
+
+    # 4 chart 100 byte, giới hạn 300: bỏ file quá hạn và file dùng lâu nhất (1)
+    assert cache.evict() == 2
+    assert not old.exists() and not charts[0].exists()
+    assert all(path.exists() for path in charts[1:])
+    assert other.exists() and partial.exists() and not stale_partial.exists()
+    assert cache.stats()["files"] == 3 and cache.stats()["bytes"] == 300
+
+    # Dùng lại chart 3 -> chart 2 thành file cũ nhất
+    cache.max_bytes = 200
+    cache.lookup("3" * 40)
+    assert cache.evict() == 1
+    assert not charts[1].exists() and charts[2].exists() and charts[3].exists()
+    assert cache.evictions == 3
+
+
+def test_evict_missing_directory(tmp_path):
+    cache = ChartCache(tmp_path / "none")
+    assert cache.evict() == 0
+    assert cache.stats()["files"] == 0
+
+
+@pytest.mark.parametrize("filename", [
+    "../chart_" + "a" * 40 + ".png",
+    "chart_abc.png",
+    "chart_" + "A" * 40 + ".png",
+    "chart_" + "a" * 40 + ".png.tmp",
+    ".chart_" + "a" * 40 + ".png",
+    "chart_" + "a" * 40 + ".svg",
+])
+def test_resolve_rejects_other_names(cache, filename):
+    assert cache.resolve(filename) is None
+    assert ChartCache.key_of(filename) is None
+
+
+def test_resolve_accepts_chart_names(cache):
+    key = "0123456789abcdef" * 2 + "01234567"
+    filename = ChartCache.filename(key)
+    assert cache.resolve(filename) == cache.directory / filename == cache.path_for(key)
+    assert ChartCache.key_of(filename) == key
+    assert str(os.getpid()) in cache.partial_path(key).name
+    assert cache.partial_path(key).parent == cache.directory
@@ -0,0 +1,88 @@
+"""
+Tests for MetricsCalculator.cycle_table (MAE/MFE theo chu kỳ DCA so với tính từng nến)
+"""
+
+import numpy as np
+import pytest
+
+from src.backtest.engine import BacktestEngine
+from src.backtest.portfolio import Portfolio, PositionBook
+from src.strategy.dca_strategy import DCAStrategy
+from src.utils.calculator import MetricsCalculator, PnLCalculator
+from tests.conftest import make_config
+
+
+COSTS = {"spread_pips": 3, "slippage_pips": 1, "commission_per_lot": 7}
+
+
+def _run(bars, direction_mode, trading):
+    config = make_config(direction_mode, trading)
+    engine = BacktestEngine(config, bars, DCAStrategy(config),
+                            Portfolio(10000, PnLCalculator.from_config(config)))
+    engine.verbose = False
+    return engine, engine.run()
+
+
+def _brute_force_excursions(engine):
+    """MAE/MFE của từng chu kỳ: P&L thả nổi (đã trừ chi phí đóng) ở high/low của từng nến giữ lệnh."""
+    book = engine.portfolio.book
+    calculator = engine.portfolio.pnl_calculator
+    high, low = engine.bar_high, engine.bar_low
+    bounds = list(book.cycle_starts()) + [book.open_start]
+    excursions = []
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        rows = range(start, stop)
+        pnl = sum(book.pnl[row] for row in rows)
+        worst = best = pnl
+        for bar in range(book.entry_bar[start] + 1, book.exit_bar[start] + 1):
+            held = [row for row in rows if book.entry_bar[row] < bar]
+            values = []
+            for adverse in (True, False):
+                total = 0.0
+                for row in held:
+                    direction = book.direction[row]
+                    price = low[bar] if (direction > 0) == adverse else high[bar]
+                    total += (direction * (price - book.entry_price[row]) * book.lot_size[row]
+                              * calculator.contract_size - book.lot_size[row] * calculator.cost_per_lot)
+                values.append(total)
+            worst, best = min(worst, values[0]), max(best, values[1])
+        excursions.append((worst, best))
+    return np.array(excursions).reshape(-1, 2)
+
+
+@pytest.mark.parametrize("direction_mode", ["AUTO", "BUY", "SELL"])
+@pytest.mark.parametrize("trading", [None, COSTS], ids=["default-costs", "costs"])
+def test_mae_mfe_match_brute_force(bars, direction_mode, trading):
+    engine, results = _run(bars.iloc[:2500], direction_mode, trading)
+    table = engine.cycle_table()
+    expected = _brute_force_excursions(engine)
+
+    assert len(table["cycle"]) == len(expected) > 0
+    np.testing.assert_allclose(table["mae"], expected[:, 0], atol=1e-6)
+    np.testing.assert_allclose(table["mfe"], expected[:, 1], atol=1e-6)
+    assert np.all(table["mae"] <= table["pnl"] + 1e-9)
+    assert np.all(table["pnl"] <= table["mfe"] + 1e-9)
+    assert table["pnl"].sum() == pytest.approx(results["total_pnl"], abs=1e-6)
+
+
+def test_cycle_columns(bars):
+    engine, results = _run(bars.iloc[:2500], "AUTO", None)
+    table = engine.cycle_table()
+    book = engine.portfolio.book
+    starts = book.cycle_starts()
+
+    assert table["positions"].sum() == book.open_start
+    assert set(table["direction"]) <= {"BUY", "SELL"}
+    np.testing.assert_array_equal(table["bars_held"], table["exit_bar"] - table["entry_bar"])
+    np.testing.assert_allclose(table["lots"], np.add.reduceat(book.lot_size[:book.open_start], starts))
+    assert np.all(table["depth"] >= 1)
+    assert results["cycle_table"]["cycle"].tolist() == table["cycle"].tolist()
+
+
+def test_missing_prices_leave_excursions_empty(bars):
+    engine, _ = _run(bars.iloc[:2500], "AUTO", None)
+    table = MetricsCalculator.cycle_table(engine.portfolio.book)
+    assert np.isnan(table["mae"]).all() and np.isnan(table["mfe"]).all()
+
+    empty = MetricsCalculator.cycle_table(PositionBook(), engine.bar_high, engine.bar_low)
+    assert len(empty["cycle"]) == 0 and len(empty["mae"]) == 0
@@ -0,0 +1,59 @@
+"""
+Tests for DataLoader.load_bars (cùng một frame dù bar store đã cập nhật hay chưa)
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.utils.data_loader import DataLoader
+from tests.conftest import make_bars
+
+
+def _write_offset_csv(path, count=300):
+    """CSV giờ địa phương +07:00, volume số nguyên và một cột thừa."""
+    bars = make_bars(count=count)
+    local = bars.index.tz_localize("UTC").tz_convert("Asia/Bangkok")
+    frame = pd.DataFrame({
+        "timestamp": [stamp.isoformat() for stamp in local],
+        "open": bars["open"].to_numpy(),
+        "high": bars["high"].to_numpy(),
+        "low": bars["low"].to_numpy(),
+        "close": bars["close"].to_numpy(),
+        "volume": range(count),
+        "spread": 3,
+    })
+    frame.to_csv(path, index=False)
+    return bars
+
+
+def test_load_bars_same_frame_before_and_after_store(tmp_path):
+    source = tmp_path / "xauusd_h1.csv"
+    bars = _write_offset_csv(source)
+    loader = DataLoader()
+
+    first = loader.load_bars(source, store_dir=tmp_path / "store")   # store chưa có: parse CSV
+    second = loader.load_bars(source, store_dir=tmp_path / "store")  # đọc từ bar store
+
+    pd.testing.assert_frame_equal(first, second)
+    assert first.index.tz is None and first.index.name == "timestamp"
+    assert list(first.columns) == ["open", "high", "low", "close", "volume"]
+    assert first["volume"].dtype == "float64"
+    # Index là UTC (không phải giờ địa phương +07:00)
+    assert first.index.as_unit("ns").equals(bars.index.as_unit("ns"))
+    np.testing.assert_allclose(first["close"], bars["close"], rtol=1e-12)
+
+
+def test_load_bars_after_source_change(tmp_path):
+    source = tmp_path / "xauusd_h1.csv"
+    _write_offset_csv(source, count=200)
+    loader = DataLoader()
+    loader.load_bars(source, store_dir=tmp_path / "store")
+
+    # File nguồn thay đổi (thêm nến): store stale, kết quả vẫn cùng dạng
+    bars = _write_offset_csv(source, count=260)
+    reloaded = loader.load_bars(source, store_dir=tmp_path / "store")
+    cached = loader.load_bars(source, store_dir=tmp_path / "store")
+
+    assert len(reloaded) == 260
+    pd.testing.assert_frame_equal(reloaded, cached)
+    assert reloaded.index.as_unit("ns").equals(bars.index.as_unit("ns"))
@@ -0,0 +1,88 @@
+"""
+Tests for DatasetCache (key theo fingerprint, biến thể, giới hạn bộ nhớ LRU)
+"""
+
+import os
+
+import pytest
+
+from src.utils.dataset_cache import DatasetCache, frame_nbytes
+from tests.conftest import make_bars, write_csv
+
+
+def _with_rsi(df):
+    df["rsi"] = 50.0
+    return df
+
+
+@pytest.fixture
+def paths(tmp_path, isolated_store):
+    return [write_csv(tmp_path / f"data_{i}.csv", make_bars(count=200, seed=i)) for i in range(3)]
+
+
+def test_hit_until_fingerprint_changes(paths):
+    cache = DatasetCache()
+    first = cache.get(paths[0])
+    assert cache.get(paths[0]) is first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    with_rsi = cache.get(paths[0], variant=("rsi", 14), prepare=_with_rsi)
+    assert "rsi" in with_rsi and "rsi" not in first  # prepare nhận bản copy
+    assert cache.get(paths[0], variant=("rsi", 14), prepare=_with_rsi) is with_rsi
+
+    # Chỉ đổi mtime: fingerprint đổi, bỏ cả dữ liệu gốc lẫn biến thể
+    stat = os.stat(paths[0])
+    os.utime(paths[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert cache.get(paths[0], variant=("rsi", 14), prepare=_with_rsi) is not with_rsi
+    assert cache.get(paths[0]) is not first
+    assert cache.stats()["entries"] == 2
+
+
+def test_lru_eviction_by_bytes(paths):
+    one = frame_nbytes(DatasetCache().get(paths[0]))
+    cache = DatasetCache(max_bytes=2 * one)
+
+    cache.get(paths[0])
+    cache.get(paths[1])
+    cache.get(paths[0])  # data_0 thành entry dùng gần nhất
+    cache.get(paths[2])  # vượt giới hạn: bỏ data_1
+
+    stats = cache.stats()
+    assert [os.path.basename(item["path"]) for item in stats["datasets"]] == ["data_0.csv", "data_2.csv"]
+    assert stats["bytes"] == 2 * one and cache.evictions == 1
+
+    misses = cache.misses
+    cache.get(paths[0])
+    assert cache.misses == misses
+    cache.get(paths[1])
+    assert cache.misses == misses + 1
+
+
+def test_oversized_frame_not_cached(paths):
+    data = DatasetCache().get(paths[0])
+    cache = DatasetCache(max_bytes=frame_nbytes(data) - 1)
+
+    assert len(cache.get(paths[0])) == 200
+    cache.get(paths[0])
+    assert cache.misses == 2 and cache.evictions == 0
+    assert cache.stats()["entries"] == 0 and cache.total_bytes == 0
+
+
+def test_invalidate(paths):
+    cache = DatasetCache()
+    cache.get(paths[0])
+    cache.get(paths[0], variant="x", prepare=_with_rsi)
+    cache.get(paths[1])
+
+    cache.invalidate(paths[0])
+    assert [item["path"] for item in cache.stats()["datasets"]] == [str(paths[1].resolve())]
+    cache.invalidate()
+    assert cache.stats()["entries"] == 0 and cache.total_bytes == 0
+
+
+def test_errors(paths, tmp_path):
+    cache = DatasetCache()
+    with pytest.raises(FileNotFoundError):
+        cache.get(tmp_path / "missing.csv")
+    with pytest.raises(ValueError, match="prepare is required"):
+        cache.get(paths[0], variant=("rsi", 14))
@@ -0,0 +1,91 @@
+"""
+Tests for DatasetRegistry (thống kê theo fingerprint, lưu index JSON)
+"""
+
+import os
+
+import pytest
+
+from src.utils.dataset_cache import get_dataset_cache
+from src.utils.dataset_registry import DatasetRegistry, compute_stats, file_fingerprint
+from tests.conftest import make_bars, write_csv
+
+
+@pytest.fixture
+def source(tmp_path):
+    return write_csv(tmp_path / "xauusd_h1.csv", make_bars(count=500))
+
+
+@pytest.fixture
+def registry(tmp_path, isolated_store):
+    return DatasetRegistry(index_path=tmp_path / "registry.json")
+
+
+def test_compute_stats():
+    bars = make_bars(count=500)
+    # Bỏ 3 khoảng nến -> 3 gap
+    gapped = bars.drop(bars.index[[100, 101, 250, 400]])
+    stats = compute_stats(gapped)
+
+    assert stats["rows"] == 496
+    assert stats["interval_seconds"] == 3600
+    assert stats["gaps"] == 3
+    assert stats["start"] == bars.index[0].isoformat() and stats["end"] == bars.index[-1].isoformat()
+    assert stats["avg_price"] == pytest.approx(gapped["close"].mean())
+    assert stats["min_price"] == gapped["low"].min() and stats["max_price"] == gapped["high"].max()
+
+    empty = compute_stats(bars.iloc[:0])
+    assert empty["rows"] == 0 and empty["start"] is None and empty["gaps"] == 0
+
+
+def test_fingerprint_change_forces_register(registry, source):
+    entry = registry.ensure(source)
+    assert entry["rows"] == 500
+    assert tuple(entry["fingerprint"]) == file_fingerprint(source)
+    misses = get_dataset_cache().misses
+
+    # File chưa đổi: dùng entry đã lưu, không load lại
+    assert registry.ensure(source) == entry
+    assert get_dataset_cache().misses == misses
+
+    # Thêm nến: fingerprint đổi -> entry cũ bị bỏ, ensure() tính lại
+    write_csv(source, make_bars(count=650))
+    assert registry.get(source) is None
+    assert registry.ensure(source)["rows"] == 650
+
+    # Chỉ đổi mtime (nội dung giữ nguyên) cũng coi là đã đổi
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert registry.get(source) is None
+
+
+def test_entries_flags_unregistered_files(registry, source, tmp_path):
+    other = write_csv(tmp_path / "xauusd_m1.csv", make_bars(count=50, freq="min"))
+    registry.register(source, make_bars(count=500))
+
+    entries = registry.entries([source, other, tmp_path / "missing.csv"])
+    assert [entry["registered"] for entry in entries] == [True, False, False]
+    assert entries[0]["rows"] == 500 and entries[0]["path"] == str(source)
+    assert entries[1] == {"name": "xauusd_m1.csv", "path": str(other), "registered": False}
+    # entries() không load file nào
+    assert get_dataset_cache().misses == 0
+
+
+def test_index_persists_across_instances(registry, source, tmp_path):
+    entry = registry.register(source, make_bars(count=500))
+
+    reloaded = DatasetRegistry(index_path=tmp_path / "registry.json")
+    assert reloaded.get(source) == entry
+
+    reloaded.remove(source)
+    assert DatasetRegistry(index_path=tmp_path / "registry.json").get(source) is None
+    # Index hỏng được coi như rỗng
+    (tmp_path / "registry.json").write_text("{not json")
+    assert DatasetRegistry(index_path=tmp_path / "registry.json").entries([source])[0]["registered"] is False
+
+
+def test_ingest_builds_bar_store(registry, source, isolated_store):
+    entry = registry.ingest(source)
+
+    assert entry["rows"] == 500
+    assert any(isolated_store.iterdir())
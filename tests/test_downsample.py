@@ -0,0 +1,91 @@
+"""
+Tests for downsample (LTTB, envelope, gom OHLC theo bucket)
+"""
+
+import numpy as np
+import pytest
+
+from src.utils.downsample import (
+    aggregate_ohlc, bucket_starts, decimate_series, lttb_indices, max_drawdown_indices,
+)
+
+
+def _series(count=5000, seed=2):
+    rng = np.random.default_rng(seed)
+    x = 1700000000 + 3600 * np.arange(count)
+    y = 10000 + np.cumsum(rng.normal(0, 25.0, count))
+    return x, y
+
+
+@pytest.mark.parametrize("count,points", [(5000, 1000), (5000, 3), (1001, 1000), (10, 7)])
+def test_lttb_keeps_endpoints_and_count(count, points):
+    x, y = _series(count)
+    indices = lttb_indices(x, y, points)
+
+    assert len(indices) == points
+    assert indices[0] == 0 and indices[-1] == count - 1
+    assert np.all(np.diff(indices) > 0)
+
+
+@pytest.mark.parametrize("points", [5000, 6000, 2, 0])
+def test_lttb_returns_all_points_without_budget(points):
+    x, y = _series(5000)
+    np.testing.assert_array_equal(lttb_indices(x, y, points), np.arange(5000))
+
+
+def test_lttb_picks_spike():
+    x = np.arange(101, dtype=float)
+    y = np.zeros(101)
+    y[37] = 50.0
+    assert 37 in lttb_indices(x, y, 10)
+
+
+def test_max_drawdown_indices():
+    assert max_drawdown_indices(np.array([100, 120, 90, 110, 130, 100.0])) == (1, 2)
+    assert max_drawdown_indices(np.array([1, 2, 3.0])) == (0, 0)
+    assert max_drawdown_indices(np.array([])) == (0, 0)
+
+
+def test_decimate_series_keeps_drawdown_and_envelope():
+    x, y = _series(20000)
+    result = decimate_series(x, y, points=500)
+    peak, trough = max_drawdown_indices(y)
+
+    assert 500 <= len(result["x"]) <= 502
+    assert x[peak] in result["x"] and x[trough] in result["x"]
+    assert result["x"][0] == x[0] and result["x"][-1] == x[-1]
+    np.testing.assert_array_equal(result["y"], y[np.searchsorted(x, result["x"])])
+
+    # Envelope bao trọn toàn bộ chuỗi
+    assert result["envelope_min"].min() == y.min()
+    assert result["envelope_max"].max() == y.max()
+    assert len(result["envelope_x"]) == len(result["envelope_min"]) == len(result["envelope_max"])
+
+
+def test_decimate_series_small_and_empty_input():
+    x, y = _series(100)
+    result = decimate_series(x, y, points=1000)
+    np.testing.assert_array_equal(result["y"], y)
+    np.testing.assert_array_equal(result["envelope_min"], y)
+
+    empty = decimate_series(np.array([]), np.array([]))
+    assert all(len(values) == 0 for values in empty.values())
+
+
+def test_aggregate_ohlc_buckets():
+    rng = np.random.default_rng(5)
+    close = 1800 + np.cumsum(rng.normal(0, 1.0, 1003))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) + 0.5
+    low = np.minimum(open_, close) - 0.5
+
+    starts = bucket_starts(len(close), 10)
+    assert len(starts) == 10 and starts[0] == 0
+    assert len(bucket_starts(5, 10)) == 5
+
+    bars = aggregate_ohlc(open_, high, low, close, starts)
+    for i, (start, end) in enumerate(zip(starts, np.r_[starts[1:], len(close)])):
+        assert bars["open"][i] == open_[start]
+        assert bars["high"][i] == high[start:end].max()
+        assert bars["low"][i] == low[start:end].min()
+        assert bars["close"][i] == close[end - 1]
@@ -0,0 +1,134 @@
+"""
+Tests for BacktestEngine (kết quả khớp engine trước khi tối ưu, không tính chi phí)
+"""
+
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from src.backtest.engine import BacktestEngine
+from src.backtest.portfolio import Portfolio
+from src.strategy.dca_strategy import DCAStrategy
+from src.strategy.rsi_handler import RSIHandler
+from src.utils import backtest_utils
+from tests.conftest import make_config
+
+
+# Kết quả theo từng nến/chu kỳ, bỏ qua khi run(summary_only=True)
+BAR_SIZED_KEYS = {"equity_curve", "equity_values", "cycle_table"}
+
+
+# Kết quả của engine gốc (trước các thay đổi về PositionBook / equity buffer /
+# cost model) trên make_bars(), Portfolio(10000) không tính chi phí
+BASELINE = {
+    "AUTO": {
+        "total_entries": 553, "total_trades": 553,
+        "total_pnl": -903.5231811565616, "max_drawdown": 21.247512673681356,
+        "events": {"entry": 553, "break": 2381, "exit": 132},
+        "equity_len": 5987, "equity_sum": 52891859.45932193,
+    },
+    "BUY": {
+        "total_entries": 418, "total_trades": 418,
+        "total_pnl": -3390.396436466376, "max_drawdown": 40.570021132723866,
+        "events": {"entry": 418, "break": 1484, "exit": 95},
+        "equity_len": 5987, "equity_sum": 46600773.49613731,
+    },
+    "SELL": {
+        "total_entries": 400, "total_trades": 400,
+        "total_pnl": 1597.6741228888507, "max_drawdown": 11.69911099676599,
+        "events": {"entry": 400, "break": 1817, "exit": 94},
+        "equity_len": 5987, "equity_sum": 65156390.28940992,
+    },
+}
+
+
+def _engine(bars, direction_mode):
+    config = make_config(direction_mode)
+    engine = BacktestEngine(config, bars, DCAStrategy(config), Portfolio(initial_capital=10000))
+    engine.verbose = False
+    return engine
+
+
+@pytest.mark.parametrize("direction_mode", sorted(BASELINE))
+def test_run_matches_baseline_without_costs(bars, direction_mode):
+    expected = BASELINE[direction_mode]
+    results = _engine(bars, direction_mode).run()
+
+    assert results["total_entries"] == expected["total_entries"]
+    assert results["total_trades"] == expected["total_trades"]
+    assert results["total_pnl"] == pytest.approx(expected["total_pnl"], abs=1e-9)
+    assert results["max_drawdown"] == pytest.approx(expected["max_drawdown"], abs=1e-9)
+    assert dict(Counter(event["type"] for event in results["events"])) == expected["events"]
+    assert len(results["equity_curve"]) == expected["equity_len"]
+    assert sum(point["equity"] for point in results["equity_curve"]) == pytest.approx(
+        expected["equity_sum"], rel=1e-12)
+
+
+def test_equity_curve_and_values(bars):
+    engine = _engine(bars.iloc[:3000], "AUTO")
+    results = engine.run()
+
+    curve = results["equity_curve"]
+    assert isinstance(curve, list) and set(curve[0]) == {"timestamp", "equity", "open_positions"}
+    values = results["equity_values"]
+    np.testing.assert_array_equal(values, [point["equity"] for point in curve])
+    assert curve[0]["timestamp"] == engine.equity_index[0]
+
+    # equity_values là bản copy: chạy lại (dùng lại buffer) không làm thay đổi kết quả cũ
+    saved = values.copy()
+    engine.reconfigure(make_config("SELL"), portfolio=Portfolio(initial_capital=10000))
+    engine.run()
+    assert not np.array_equal(engine.equity_values, saved)
+    np.testing.assert_array_equal(results["equity_values"], saved)
+    assert not np.shares_memory(results["equity_values"], engine.equity_values)
+
+
+def test_run_is_repeatable(bars):
+    engine = _engine(bars.iloc[:3000], "AUTO")
+    first = engine.run()
+    second = engine.run()
+
+    assert second["total_pnl"] == first["total_pnl"]
+    assert len(second["events"]) == len(first["events"])
+    np.testing.assert_array_equal(second["equity_values"], first["equity_values"])
+
+
+@pytest.mark.parametrize("direction_mode", ["AUTO", "SELL"])
+def test_summary_only_returns_same_metrics(bars, direction_mode):
+    engine = _engine(bars.iloc[:3000], direction_mode)
+    full = engine.run()
+    summary = engine.run(summary_only=True)
+
+    assert set(full) - set(summary) == BAR_SIZED_KEYS
+    for key in summary:
+        if key != "events":
+            assert summary[key] == full[key], key
+    assert len(summary["events"]) == len(full["events"])
+    # Dữ liệu theo nến vẫn đọc được từ engine khi cần
+    np.testing.assert_array_equal(engine.equity_values, full["equity_values"])
+
+
+def test_optimizer_uses_summary_only_runs(bars, monkeypatch):
+    data = RSIHandler(period=14).add_rsi_columns(bars.iloc[:3000].copy())
+    monkeypatch.setattr(backtest_utils, "load_backtest_data", lambda *args, **kwargs: data)
+    lot_data = [{"entry_number": i, "lot_size": round(0.01 * i, 2)} for i in range(1, 41)]
+
+    # Đếm số lần dựng dữ liệu theo nến trong lúc tối ưu
+    built = []
+    original_cycle_table = BacktestEngine.cycle_table
+    monkeypatch.setattr(BacktestEngine, "cycle_table",
+                        lambda self: built.append("cycle_table") or original_cycle_table(self))
+    result = backtest_utils.optimize_rsi_thresholds(
+        lot_data, "unused.csv", buy_range=(30, 35), sell_range=(65, 70), step=5,
+    )
+    assert built == []
+    assert len(result["all_results"]) == 4
+
+    # Mỗi tổ hợp cho cùng chỉ số với một lần chạy đầy đủ riêng
+    for combo in result["all_results"]:
+        expected, _ = backtest_utils.run_backtest_with_params(
+            combo["buy_threshold"], combo["sell_threshold"], lot_data, "unused.csv", silent=True,
+        )
+        assert combo["summary"] == expected
+    assert built  # lần chạy đầy đủ có dựng cycle_table
@@ -0,0 +1,109 @@
+"""
+Tests for EventIndex (sắp xếp theo thời gian, truy vấn khoảng, gom marker theo nến)
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils.event_store import EventIndex
+
+
+T0 = 1700000000 - 1700000000 % 3600  # Đầu một giờ (epoch giây)
+
+
+def _iso(seconds):
+    return pd.Timestamp(seconds, unit="s").isoformat()
+
+
+@pytest.fixture
+def events():
+    # Cố tình không theo thứ tự thời gian; timestamp naive = UTC
+    return [
+        {"type": "exit", "timestamp": _iso(T0 + 7200), "price": 1810.0, "entry_count": 3},
+        {"type": "entry", "timestamp": _iso(T0), "price": 1800.0, "direction": "BUY", "entry_number": 1},
+        {"type": "entry", "timestamp": _iso(T0 + 60), "price": 1799.0, "direction": "BUY", "entry_number": 2},
+        {"type": "break", "timestamp": _iso(T0 + 3600), "price": 1805.0, "entry_count": 2},
+        {"type": "entry", "timestamp": _iso(T0 + 3600), "price": 1805.0, "direction": "SELL", "entry_number": 3},
+    ]
+
+
+def test_events_sorted_by_time(events):
+    index = EventIndex(events)
+
+    assert len(index) == 5
+    assert index.times.tolist() == [T0, T0 + 60, T0 + 3600, T0 + 3600, T0 + 7200]
+    # Sắp xếp ổn định: events cùng thời điểm giữ thứ tự ban đầu
+    assert [e["type"] for e in index.events] == ["entry", "entry", "break", "entry", "exit"]
+    assert index.counts() == {"break": 1, "entry": 3, "exit": 1}
+
+
+def test_timezone_aware_timestamps(events):
+    aware = [dict(e, timestamp=pd.Timestamp(e["timestamp"]).tz_localize("UTC").tz_convert("Asia/Bangkok"))
+             for e in events]
+    np.testing.assert_array_equal(EventIndex(aware).times, EventIndex(events).times)
+
+
+def test_range_bounds_are_inclusive(events):
+    index = EventIndex(events)
+
+    assert index.range(T0, T0 + 7200) == (0, 5)
+    assert index.range(T0 + 60, T0 + 3600) == (1, 4)
+    assert index.range(T0 + 1, T0 + 59) == (1, 1)
+    assert index.range(T0 + 9000, T0 + 10000) == (5, 5)
+    # Khoảng ngược: rỗng
+    assert index.range(T0 + 3600, T0) == (2, 2)
+
+
+def test_select_filters_types_and_time(events):
+    index = EventIndex(events)
+
+    assert index.select().tolist() == [0, 1, 2, 3, 4]
+    assert index.select(types=["entry"]).tolist() == [0, 1, 3]
+    assert index.select(types=["exit", "break"], from_time=T0 + 3600).tolist() == [2, 4]
+    assert index.select(types=["entry"], to_time=T0 + 60).tolist() == [0, 1]
+    assert index.select(types=["missing"]).tolist() == []
+    assert [e["price"] for e in index.rows(index.select(from_time=T0 + 3600, to_time=T0 + 3600))] == [1805.0] * 2
+
+
+def test_select_matches_brute_force():
+    rng = np.random.default_rng(3)
+    times = T0 + rng.integers(0, 50000, 500)
+    types = rng.choice(["entry", "exit", "break"], 500)
+    index = EventIndex([{"type": str(k), "timestamp": _iso(int(t))} for k, t in zip(types, times)])
+
+    for _ in range(50):
+        lo, hi = np.sort(T0 + rng.integers(-1000, 51000, 2))
+        wanted = {"entry", "break"}
+        expected = sorted(
+            (int(t), i) for i, (k, t) in enumerate(zip(types, times)) if lo <= t <= hi and k in wanted
+        )
+        positions = index.select(types=wanted, from_time=int(lo), to_time=int(hi))
+        assert index.times[positions].tolist() == [t for t, _ in expected]
+        assert set(index.types[positions]) <= wanted
+
+
+def test_columnar_and_empty_index(events):
+    index = EventIndex(events)
+    data = index.columnar(index.select(types=["entry"]))
+
+    assert data["time"] == [T0, T0 + 60, T0 + 3600]
+    assert data["direction"] == ["BUY", "BUY", "SELL"]
+    assert data["entry_count"] == [None, None, None]
+
+    empty = EventIndex([])
+    assert len(empty) == 0 and empty.counts() == {}
+    assert empty.range(0, T0) == (0, 0)
+    assert empty.select(types=["entry"]).tolist() == []
+    assert empty.marks(0, T0 * 2, 3600) == []
+
+
+def test_marks_group_events_per_bar(events):
+    index = EventIndex(events)
+
+    marks = index.marks(T0, T0 + 7200, bucket_seconds=3600)
+    assert [(m["time"], m["label"]) for m in marks] == [(T0, "2"), (T0 + 3600, "S")]
+    assert marks[0]["text"].startswith("2 entries")
+
+    timescale = index.timescale_marks(T0, T0 + 7200, bucket_seconds=3600)
+    assert [(m["time"], m["label"]) for m in timescale] == [(T0 + 3600, "!"), (T0 + 7200, "X")]
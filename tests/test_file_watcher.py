@@ -0,0 +1,136 @@
+"""
+Tests for DataDirWatcher (phân loại thay đổi: touch / append / modify, lần quét đầu)
+"""
+
+import os
+
+import pytest
+
+from src.utils.file_watcher import (
+    FILE_ADDED, FILE_APPENDED, FILE_MODIFIED, FILE_REMOVED, DataDirWatcher, FileState,
+)
+
+
+HEADER = b"timestamp,open,high,low,close,volume\n"
+ROWS = b"".join(b"2024-01-01 %02d:00:00,1800,1801,1799,1800.5,1\n" % hour for hour in range(24))
+
+
+def _bump_mtime(path, seconds=5):
+    """Đổi mtime chắc chắn (không phụ thuộc độ phân giải mtime của filesystem)."""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 10**9))
+
+
+def _write(path, data, mode="wb"):
+    with open(path, mode) as f:
+        f.write(data)
+    _bump_mtime(path)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    (tmp_path / "xauusd_h1.csv").write_bytes(HEADER + ROWS)
+    (tmp_path / "notes.txt").write_bytes(b"ignored")
+    return tmp_path
+
+
+@pytest.fixture
+def watcher(data_dir):
+    watcher = DataDirWatcher(str(data_dir), interval=0.05)
+    watcher.received = []
+    watcher.subscribe(lambda path, kind: watcher.received.append((os.path.basename(path), kind)))
+    return watcher
+
+
+def _classify(watcher, path):
+    """_classify với trạng thái đã ghi nhận của file (như một lần poll)."""
+    stat = os.stat(path)
+    old = watcher._states.get(str(path))
+    kind, state = watcher._classify(str(path), old, stat.st_size, stat.st_mtime_ns)
+    watcher._states[str(path)] = state
+    return kind
+
+
+def test_classify_touch_append_and_rewrite(watcher, data_dir):
+    path = data_dir / "xauusd_h1.csv"
+    assert _classify(watcher, path) == FILE_ADDED
+    # Không đổi gì: không cần hash lại
+    state = watcher._states[str(path)]
+    assert _classify(watcher, path) is None and watcher._states[str(path)] is state
+
+    _bump_mtime(path)
+    assert _classify(watcher, path) is None
+
+    _write(path, b"2024-01-02 00:00:00,1800,1801,1799,1800.5,1\n", mode="ab")
+    assert _classify(watcher, path) == FILE_APPENDED
+
+    # Sửa phần đầu, giữ nguyên kích thước
+    content = path.read_bytes()
+    _write(path, content.replace(b"1800.5", b"1900.5", 1))
+    assert _classify(watcher, path) == FILE_MODIFIED
+
+    # Sửa phần đầu và dài thêm: không phải append
+    _write(path, b"time," + path.read_bytes()[len(b"timestamp,"):] + ROWS)
+    assert _classify(watcher, path) == FILE_MODIFIED
+
+    # Ngắn lại
+    _write(path, HEADER + ROWS[:100])
+    assert _classify(watcher, path) == FILE_MODIFIED
+
+
+def test_file_state_hashes_head_and_tail(tmp_path):
+    path = tmp_path / "big.csv"
+    path.write_bytes(b"a" * 200000)
+    state = FileState(str(path), 200000, 0)
+    assert state.head_length == 64 * 1024
+    assert state.head_hash == state.tail_hash
+
+    small = tmp_path / "small.csv"
+    small.write_bytes(b"abc")
+    assert FileState(str(small), 3, 0).head_length == 3
+
+
+def test_first_scan_emits_nothing(watcher, data_dir):
+    assert watcher.poll() == []
+    assert watcher.received == []
+    assert watcher.files() == [str(data_dir / "xauusd_h1.csv")]
+    # Không thay đổi gì
+    assert watcher.poll() == []
+
+
+def test_poll_reports_changes(watcher, data_dir):
+    watcher.poll()
+    path = data_dir / "xauusd_h1.csv"
+
+    _bump_mtime(path)
+    assert watcher.poll() == []
+
+    _write(path, ROWS[:45], mode="ab")
+    added = data_dir / "xauusd_m1.csv"
+    _write(added, HEADER)
+    assert sorted(watcher.poll()) == sorted([(str(path), FILE_APPENDED), (str(added), FILE_ADDED)])
+
+    path.unlink()
+    assert watcher.poll() == [(str(path), FILE_REMOVED)]
+    assert watcher.received == [
+        ("xauusd_h1.csv", FILE_APPENDED), ("xauusd_m1.csv", FILE_ADDED), ("xauusd_h1.csv", FILE_REMOVED),
+    ]
+    assert watcher.latest() == str(added)
+
+
+def test_failing_callback_does_not_block_others(watcher, data_dir, capsys):
+    def failing(path, kind):
+        raise RuntimeError("boom")
+
+    watcher._callbacks.insert(0, failing)
+    watcher.poll()
+    _write(data_dir / "xauusd_h1.csv", b"x", mode="ab")
+
+    assert watcher.poll() == [(str(data_dir / "xauusd_h1.csv"), FILE_APPENDED)]
+    assert watcher.received == [("xauusd_h1.csv", FILE_APPENDED)]
+    assert "boom" in capsys.readouterr().err
+
+
+def test_missing_directory(tmp_path):
+    watcher = DataDirWatcher(str(tmp_path / "missing"))
+    assert watcher.poll() == [] and watcher.files() == [] and watcher.latest() is None
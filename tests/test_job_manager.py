@@ -0,0 +1,96 @@
+"""
+Tests for JobManager (process pool, progress, cancel)
+"""
+
+import time
+
+import pytest
+
+from src.utils import backtest_utils
+from src.utils.job_manager import (
+    JOB_CANCELLED, JOB_DONE, JOB_RUNNING, FINISHED_STATES, JobCancelled, JobManager,
+)
+
+
+def counting_job(params, progress_callback=None):
+    """Job mẫu: báo progress sau mỗi bước (top-level để chạy được trong worker spawn)."""
+    for step in range(params["steps"]):
+        time.sleep(params.get("delay", 0.0))
+        if progress_callback is not None:
+            progress_callback(completed=step + 1, total=params["steps"])
+    return {"steps": params["steps"]}
+
+
+def _wait(predicate, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+@pytest.fixture(scope="module")
+def manager():
+    manager = JobManager(max_workers=1)
+    yield manager
+    manager.shutdown()
+
+
+def test_job_completes_with_result(manager):
+    job = manager.submit("test", counting_job, {"steps": 3})
+    _wait(lambda: job.status in FINISHED_STATES)
+    assert job.status == JOB_DONE
+    assert job.result == {"steps": 3}
+
+
+def test_running_job_stops_on_cancel(manager):
+    job = manager.submit("test", counting_job, {"steps": 100000, "delay": 0.001})
+    _wait(lambda: job.status == JOB_RUNNING and job.progress.get("completed"))
+
+    assert manager.cancel(job.job_id)
+    _wait(lambda: job.status in FINISHED_STATES, timeout=5.0)
+    assert job.status == JOB_CANCELLED
+    assert job.progress.get("completed", 0) < 100000
+    # Job đã kết thúc thì không hủy được nữa
+    assert not manager.cancel(job.job_id)
+
+
+def test_pending_job_is_cancelled_without_running(manager):
+    running = manager.submit("test", counting_job, {"steps": 50, "delay": 0.01})
+    pending = manager.submit("test", counting_job, {"steps": 1})
+
+    assert manager.cancel(pending.job_id)
+    _wait(lambda: pending.status in FINISHED_STATES)
+    assert pending.status == JOB_CANCELLED
+    assert pending.started_at is None
+
+    _wait(lambda: running.status in FINISHED_STATES)
+    assert running.status == JOB_DONE
+
+
+def test_optimizer_propagates_job_cancelled(monkeypatch):
+    calls = []
+    inside = [False]
+
+    def fake_backtest(*args, progress_callback=None, **kwargs):
+        calls.append(args[:2])
+        inside[0] = True
+        try:
+            progress_callback(bars_done=0, total_bars=10)
+        finally:
+            inside[0] = False
+        return {"total_pnl": 0.0}, None
+
+    def cancelled_callback(**progress):
+        # Hủy chỉ được phát hiện bên trong backtest (lần báo sau tổ hợp coi như bị throttle bỏ qua)
+        if inside[0]:
+            raise JobCancelled("job")
+
+    monkeypatch.setattr(backtest_utils, "run_backtest_with_params", fake_backtest)
+    with pytest.raises(JobCancelled):
+        backtest_utils.optimize_rsi_thresholds(
+            [], buy_range=(30, 35), sell_range=(65, 70), step=1,
+            progress_callback=cancelled_callback,
+        )
+    # Dừng ngay ở tổ hợp đầu tiên thay vì chạy tiếp 35 tổ hợp còn lại
+    assert len(calls) == 1
@@ -0,0 +1,129 @@
+"""
+Tests for MetricsCalculator (drawdown, lợi nhuận theo kỳ, Sharpe/Sortino, thống kê chu kỳ)
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.backtest.portfolio import PositionBook
+from src.utils.calculator import MetricsCalculator
+
+
+def _times(count, freq="h", start="2024-01-01"):
+    return pd.date_range(start, periods=count, freq=freq).as_unit("ns").asi8
+
+
+def test_drawdown_stats():
+    equity = [100, 120, 90, 110, 130, 100]
+    stats = MetricsCalculator.drawdown_stats(equity, _times(6, freq="D"))
+
+    assert stats["max_drawdown"] == pytest.approx(25.0)  # 120 -> 90
+    assert stats["max_drawdown_amount"] == pytest.approx(30.0)  # 130 -> 100 cũng là 30
+    # 120 (nến 1) chưa lấy lại đỉnh đến nến 3: 2 nến; 130 -> hết dữ liệu: 1 nến
+    assert stats["max_drawdown_bars"] == 2
+    assert stats["max_drawdown_days"] == pytest.approx(2.0)
+    assert MetricsCalculator.calculate_max_drawdown(equity) == stats["max_drawdown"]
+
+
+def test_drawdown_stats_edge_cases():
+    empty = MetricsCalculator.drawdown_stats([])
+    assert empty == {"max_drawdown": 0.0, "max_drawdown_amount": 0.0,
+                     "max_drawdown_bars": 0, "max_drawdown_days": None}
+
+    rising = MetricsCalculator.drawdown_stats(np.arange(1.0, 50.0))
+    assert rising["max_drawdown"] == 0.0 and rising["max_drawdown_bars"] == 0
+
+    # Chưa bao giờ lấy lại đỉnh: tính đến hết dữ liệu
+    falling = MetricsCalculator.drawdown_stats([100, 80, 70, 90])
+    assert falling["max_drawdown"] == pytest.approx(30.0)
+    assert falling["max_drawdown_bars"] == 3
+
+
+def test_drawdown_bars_matches_brute_force():
+    rng = np.random.default_rng(4)
+    equity = 10000 + np.cumsum(rng.normal(0, 20.0, 2000))
+    peak, longest, since = -np.inf, 0, 0
+    for value in equity:
+        if value >= peak:
+            peak, since = value, 0
+        else:
+            since += 1
+        longest = max(longest, since)
+    assert MetricsCalculator.drawdown_stats(equity)["max_drawdown_bars"] == longest
+
+
+def test_period_returns_daily_buckets():
+    # 3 ngày x 24 nến H1: equity cuối ngày 110, 99, 108.9
+    equity = np.concatenate([np.linspace(100, 110, 24), np.linspace(110, 99, 24), np.linspace(99, 108.9, 24)])
+    returns = MetricsCalculator.period_returns(equity, _times(72), start_equity=100)
+    np.testing.assert_allclose(returns, [0.10, -0.10, 0.10])
+
+    # Không có times: lợi nhuận theo nến
+    np.testing.assert_allclose(MetricsCalculator.period_returns([100, 110, 121], None), [0.1, 0.1])
+    assert len(MetricsCalculator.period_returns([100], None)) == 0
+    assert len(MetricsCalculator.period_returns([], None)) == 0
+
+
+def test_sharpe_sortino():
+    returns = np.array([0.01, -0.02, 0.03, 0.005, -0.01])
+    sharpe, sortino = MetricsCalculator.sharpe_sortino(returns, periods_per_year=252)
+
+    mean = returns.mean()
+    assert sharpe == pytest.approx(mean / returns.std(ddof=1) * np.sqrt(252))
+    downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2))
+    assert sortino == pytest.approx(mean / downside * np.sqrt(252))
+
+    # Độ lệch bằng 0 / không có kỳ lỗ / thiếu dữ liệu
+    assert MetricsCalculator.sharpe_sortino([0.01, 0.01, 0.01]) == (0.0, 0.0)
+    assert MetricsCalculator.sharpe_sortino([0.01, 0.02])[1] == 0.0
+    assert MetricsCalculator.sharpe_sortino([0.01]) == (0.0, 0.0)
+
+
+def _book(cycles):
+    """PositionBook từ danh sách chu kỳ [(direction, [(bar, price, lot), ...], exit_bar, exit_price)]."""
+    book = PositionBook()
+    for direction, entries, exit_bar, exit_price in cycles:
+        for number, (bar, price, lot) in enumerate(entries, start=1):
+            book.append(number, direction, price, lot, pd.Timestamp(_times(100)[bar]), bar)
+        book.close_open(exit_price, pd.Timestamp(_times(100)[exit_bar]), exit_bar)
+    return book
+
+
+def test_cycle_stats():
+    book = _book([
+        ("BUY", [(0, 1800.0, 0.1), (2, 1790.0, 0.2)], 5, 1800.0),  # +200
+        ("SELL", [(6, 1800.0, 0.1)], 9, 1805.0),                   # -50
+        ("BUY", [(10, 1800.0, 0.1), (11, 1795.0, 0.1), (12, 1790.0, 0.1)], 20, 1800.0),  # +150
+    ])
+    stats = MetricsCalculator.cycle_stats(book)
+
+    assert stats["cycles"] == 3 and stats["winning_cycles"] == 2
+    assert stats["cycle_win_rate"] == pytest.approx(200 / 3)
+    assert stats["gross_profit"] == pytest.approx(350.0)
+    assert stats["gross_loss"] == pytest.approx(50.0)
+    assert stats["profit_factor"] == pytest.approx(7.0)
+    assert stats["best_cycle_pnl"] == pytest.approx(200.0)
+    assert stats["worst_cycle_pnl"] == pytest.approx(-50.0)
+    assert stats["max_cycle_positions"] == 3
+    assert stats["avg_cycle_bars"] == pytest.approx((5 + 3 + 10) / 3)
+    assert stats["max_cycle_bars"] == 10
+
+    assert MetricsCalculator.cycle_stats(PositionBook())["cycles"] == 0
+
+
+def test_calculate_metrics():
+    empty = MetricsCalculator.calculate_metrics([])
+    assert empty["max_drawdown"] == 0.0 and empty["sharpe"] == 0.0
+    assert empty["return_periods"] == 0 and empty["exposure"] == 0.0
+
+    equity = np.concatenate([np.full(24, 100.0), np.full(24, 110.0), np.full(24, 104.5)])
+    open_counts = np.r_[np.zeros(36), np.ones(36)]
+    metrics = MetricsCalculator.calculate_metrics(
+        equity, open_counts, _times(72), book=_book([("BUY", [(0, 1800.0, 0.1)], 5, 1801.0)]),
+        initial_capital=100,
+    )
+    assert metrics["return_periods"] == 3
+    assert metrics["exposure"] == pytest.approx(50.0)
+    assert metrics["max_drawdown"] == pytest.approx(5.0)
+    assert metrics["cycles"] == 1
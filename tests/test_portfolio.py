@@ -0,0 +1,117 @@
+"""
+Tests for PositionBook / Portfolio (đóng cả cụm lệnh, equity O(1))
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.backtest.portfolio import Portfolio, PositionBook
+from src.utils.calculator import PnLCalculator
+
+
+T0 = pd.Timestamp("2024-01-01 00:00")
+
+
+def _brute_force_equity(portfolio, price):
+    """Equity bằng cách cộng từng lệnh (realized + unrealized của các lệnh đang mở)."""
+    calculator = portfolio.pnl_calculator
+    equity = portfolio.initial_capital
+    for position in portfolio.positions:
+        if position.exit_price is not None:
+            equity += position.pnl
+        else:
+            equity += calculator.calculate_pnl(position.entry_price, price, position.lot_size, position.direction)
+    return equity
+
+
+def test_book_grows_and_closes_open_rows():
+    book = PositionBook(capacity=2)
+    for i in range(5):
+        book.append(i + 1, "BUY", 1800.0 - i, 0.01 * (i + 1), T0 + pd.Timedelta(hours=i), bar_index=i)
+
+    assert len(book) == 5 and book.open_count == 5
+    assert book.entry_price.tolist() == [1800.0, 1799.0, 1798.0, 1797.0, 1796.0]
+    assert np.isnan(book.exit_price).all()
+
+    pnl = book.close_open(1801.0, T0 + pd.Timedelta(hours=6), bar_index=6)
+    np.testing.assert_allclose(pnl, (1801.0 - book.entry_price) * book.lot_size * 100)
+    assert book.open_count == 0 and book.open_start == 5
+    assert book.closed_mask().all()
+    assert book.exit_bar.tolist() == [6] * 5
+
+    # Lệnh mới mở sau khi đóng không ảnh hưởng các dòng đã đóng
+    book.append(6, "SELL", 1802.0, 0.01, T0 + pd.Timedelta(hours=7), bar_index=7)
+    assert book.open_count == 1
+    assert book.view(5).direction == "SELL" and book.view(5).exit_price is None
+    assert book.view(0).exit_timestamp == T0 + pd.Timedelta(hours=6)
+
+
+def test_cycle_starts_split_closed_cycles():
+    book = PositionBook()
+    assert book.cycle_starts().tolist() == []
+
+    cycles = [(3, 10), (1, 20), (4, 35)]  # (số lệnh, nến đóng)
+    bar = 0
+    for count, exit_bar in cycles:
+        for _ in range(count):
+            book.append(1, "BUY", 1800.0, 0.01, T0 + pd.Timedelta(hours=bar), bar_index=bar)
+            bar += 1
+        book.close_open(1805.0, T0 + pd.Timedelta(hours=exit_bar), bar_index=exit_bar)
+    # Lệnh đang mở không thuộc chu kỳ nào
+    book.append(1, "BUY", 1800.0, 0.01, T0, bar_index=40)
+
+    starts = book.cycle_starts()
+    assert starts.tolist() == [0, 3, 4]
+    cycle_pnl = np.add.reduceat(book.pnl[:book.open_start], starts)
+    np.testing.assert_allclose(cycle_pnl, [15.0, 5.0, 20.0])
+
+
+def test_timezone_aware_timestamps_round_trip():
+    book = PositionBook()
+    stamp = pd.Timestamp("2024-03-01 12:00", tz="UTC")
+    book.append(1, "BUY", 1800.0, 0.01, stamp)
+    assert book.view(0).entry_timestamp == stamp
+    assert book.view(0).exit_timestamp is None
+
+
+@pytest.mark.parametrize("calculator", [
+    None,
+    PnLCalculator(spread_pips=3, slippage_pips=1, commission_per_lot=7),
+], ids=["no-costs", "costs"])
+def test_equity_matches_brute_force(calculator):
+    rng = np.random.default_rng(11)
+    portfolio = Portfolio(initial_capital=10000, pnl_calculator=calculator)
+    price = 1800.0
+
+    for bar in range(400):
+        price += rng.normal(0, 2.0)
+        action = rng.random()
+        timestamp = T0 + pd.Timedelta(hours=bar)
+        if action < 0.3:
+            direction = "BUY" if rng.random() < 0.5 else "SELL"
+            portfolio.open_position(portfolio.open_count + 1, direction, price,
+                                    round(0.01 * rng.integers(1, 10), 2), timestamp, bar)
+        elif action < 0.35 and portfolio.open_count:
+            portfolio.close_all_positions(price, timestamp, bar)
+
+        assert portfolio.get_current_equity(price) == pytest.approx(
+            _brute_force_equity(portfolio, price), abs=1e-6)
+
+    closed = [p.pnl for p in portfolio.positions if p.exit_price is not None]
+    assert portfolio.get_total_pnl() == pytest.approx(sum(closed), abs=1e-9)
+    # Không có giá hiện tại: chỉ tính realized P&L
+    assert portfolio.get_current_equity() == pytest.approx(10000 + sum(closed), abs=1e-9)
+
+
+def test_portfolio_reset():
+    portfolio = Portfolio(initial_capital=5000)
+    portfolio.open_position(1, "BUY", 1800.0, 0.1, T0, 0)
+    portfolio.close_all_positions(1810.0, T0, 1)
+    portfolio.open_position(1, "SELL", 1810.0, 0.1, T0, 2)
+    assert portfolio.get_total_pnl() == pytest.approx(100.0)
+
+    portfolio.reset()
+    assert portfolio.positions == [] and portfolio.open_count == 0
+    assert portfolio.get_total_pnl() == 0.0
+    assert portfolio.get_current_equity(1900.0) == 5000
@@ -0,0 +1,50 @@
+"""
+Tests for RSIHandler / IncrementalRSI
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.strategy.rsi_handler import IncrementalRSI, RSIHandler
+
+
+def _prices(count=500, seed=1):
+    rng = np.random.default_rng(seed)
+    return pd.Series(1800 + np.cumsum(rng.normal(0, 2.0, count)))
+
+
+@pytest.mark.parametrize("period", [2, 14, 30])
+def test_incremental_rsi_matches_rolling_rsi(period):
+    prices = _prices()
+    expected = RSIHandler(period=period).calculate_rsi(prices).to_numpy()
+
+    rsi = IncrementalRSI(period)
+    actual = np.array([rsi.update(price) for price in prices])
+
+    # NaN ở cùng vị trí (chưa đủ nến), giá trị còn lại khớp tới sai số dấu phẩy động
+    np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected))
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-9, equal_nan=True)
+
+
+def test_incremental_rsi_flat_and_rising_prices():
+    rsi = IncrementalRSI(3)
+    values = [rsi.update(price) for price in [10, 10, 10, 10]]
+    # Không có gain lẫn loss: 0/0 -> NaN như pandas
+    assert np.isnan(values[-1])
+
+    rsi.reset()
+    values = [rsi.update(price) for price in [10, 11, 12, 13]]
+    assert values[-1] == 100.0
+
+
+def test_reset_clears_history():
+    rsi = IncrementalRSI(5)
+    for price in _prices(20):
+        rsi.update(price)
+    assert rsi.ready
+
+    rsi.reset()
+    assert not rsi.ready
+    assert rsi.prev_price is None
+    assert np.isnan(rsi.value)
@@ -0,0 +1,117 @@
+"""
+Tests for ResampledSeriesCache (key theo fingerprint, giới hạn số file LRU, tra cứu khoảng)
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from src.utils.dataset_registry import get_registry
+from src.utils.series_cache import ResampledSeries, ResampledSeriesCache
+from tests.conftest import make_bars, write_csv
+
+
+@pytest.fixture
+def m1():
+    return make_bars(count=3000, freq="min")
+
+
+@pytest.fixture
+def source(tmp_path, m1):
+    return write_csv(tmp_path / "xauusd_m1.csv", m1)
+
+
+@pytest.fixture
+def cache(isolated_store, monkeypatch):
+    cache = ResampledSeriesCache(max_files=2)
+    # Đếm số lần load file
+    cache.loads = []
+    original = cache._load
+
+    def counting_load(key):
+        cache.loads.append(os.path.basename(key))
+        return original(key)
+
+    monkeypatch.setattr(cache, "_load", counting_load)
+    return cache
+
+
+def _resample(df, freq):
+    return df.resample(freq).agg({
+        "open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum",
+    }).dropna()
+
+
+def test_resolutions(cache, source, m1):
+    base = cache.get(source, "1")
+    assert base.frame.index.tz is not None and str(base.frame.index.tz) == "UTC"
+    np.testing.assert_allclose(base.close, m1["close"].to_numpy(), rtol=1e-12)
+
+    # Level có sẵn trong pyramid và resolution phải resample (30 phút)
+    for resolution, freq in [("60", "h"), ("5", "5min"), ("30", "30min")]:
+        expected = _resample(m1, freq)
+        series = cache.get(source, resolution)
+        np.testing.assert_allclose(series.close, expected["close"].to_numpy())
+        assert series.times[0] == expected.index[0].timestamp()
+    # 1D/1W giữ nguyên nến gốc
+    assert len(cache.get(source, "1D")) == len(m1)
+    assert cache.loads == ["xauusd_m1.csv"]
+    # Load lần đầu đăng ký thống kê của file
+    assert get_registry().get(source)["rows"] == 3000
+
+
+def test_cached_until_file_changes(cache, source, tmp_path):
+    assert cache.peek(source, "60") is None
+    series = cache.get(source, "60")
+    assert cache.peek(source, "60") is series
+    assert cache.get(source, "60") is series
+    assert cache.peek(source, "15") is None  # resolution chưa build
+
+    write_csv(source, make_bars(count=3600, freq="min"))
+    assert cache.peek(source, "60") is None
+    rebuilt = cache.get(source, "60")
+    assert rebuilt is not series and len(rebuilt) == 60
+    assert cache.loads == ["xauusd_m1.csv", "xauusd_m1.csv"]
+
+    # File bị xóa: không trả về bản cũ
+    os.remove(source)
+    assert cache.peek(source, "60") is None
+
+
+def test_lru_bound_on_files(cache, tmp_path):
+    paths = [write_csv(tmp_path / f"data_{i}.csv", make_bars(count=200, seed=i)) for i in range(3)]
+    cache.get(paths[0], "60")
+    cache.get(paths[1], "60")
+    cache.get(paths[0], "60")  # data_0 thành file dùng gần nhất
+    cache.get(paths[2], "60")  # vượt max_files=2: bỏ data_1
+
+    assert cache.peek(paths[0], "60") is not None
+    assert cache.peek(paths[1], "60") is None
+    assert cache.peek(paths[2], "60") is not None
+
+    cache.invalidate(paths[0])
+    assert cache.peek(paths[0], "60") is None
+    cache.invalidate()
+    assert cache.peek(paths[2], "60") is None
+
+
+def test_explicit_store_dir(tmp_path, source, m1, isolated_store):
+    cache = ResampledSeriesCache(store_dir=tmp_path / "other-store")
+    np.testing.assert_allclose(cache.get(source, "1").close, m1["close"].to_numpy(), rtol=1e-12)
+    assert any((tmp_path / "other-store").iterdir())
+
+
+def test_series_range_queries(m1):
+    series = ResampledSeries(m1.tz_localize("UTC"))
+    t0 = int(series.times[0])
+
+    assert series.range(t0, t0 + 59) == (0, 1)
+    assert series.range(t0 + 60, t0 + 180) == (1, 4)
+    assert series.range(t0 - 600, t0 - 1) == (0, 0)
+    assert series.last_n(t0 + 600, 5) == (6, 11)
+    assert series.last_n(t0 + 120, 10) == (0, 3)
+
+    columns = series.columns(1, 4)
+    assert columns["t"].tolist() == [t0 + 60, t0 + 120, t0 + 180]
+    assert np.shares_memory(columns["c"], series.close)
@@ -0,0 +1,147 @@
+"""
+Tests for StrategySettings / compile_config (kiểm tra giá trị, không sửa được, khớp StrategyConfig.get)
+"""
+
+import copy
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.config.strategy_config import StrategyConfig, StrategySettings, compile_config
+from tests.conftest import make_config
+
+
+DEFAULT_CONFIG = Path(__file__).resolve().parent.parent / "configs" / "default_config.json"
+
+# attribute -> (dot key, default) như strategy đọc qua StrategyConfig.get trước khi biên dịch
+DOT_KEYS = {
+    "rsi_period": ("strategy.rsi_period", 14),
+    "rsi_entry_buy": ("strategy.rsi_entry_threshold.buy", 30),
+    "rsi_entry_sell": ("strategy.rsi_entry_threshold.sell", 70),
+    "rsi_break_buy": ("strategy.rsi_break_threshold.buy", 40),
+    "rsi_break_sell": ("strategy.rsi_break_threshold.sell", 60),
+    "rsi_exit_threshold": ("strategy.rsi_exit.threshold", 50),
+    "rsi_exit_tolerance": ("strategy.rsi_exit.tolerance", 1),
+    "rsi_exit_use_open": ("strategy.rsi_exit.use_open", True),
+    "min_entries_before_break": ("strategy.min_entries_before_break", 9),
+    "initial_capital": ("portfolio.initial_capital", 10000),
+    "spread_pips": ("trading.spread_pips", 3),
+    "slippage_pips": ("trading.slippage_pips", 1),
+    "commission_per_lot": ("trading.commission_per_lot", 0),
+    "pip_size": ("trading.pip_size", 0.1),
+    "contract_size": ("trading.contract_size", 100),
+}
+
+
+@pytest.mark.parametrize("source", ["file", "dict"])
+def test_compiled_matches_dict_lookups(source):
+    if source == "file":
+        config = StrategyConfig(DEFAULT_CONFIG)
+    else:
+        config = StrategyConfig(config_dict=make_config("SELL"))
+    settings = config.compiled
+
+    for name, (key, default) in DOT_KEYS.items():
+        assert getattr(settings, name) == config.get(key, default), name
+    assert settings.direction_mode == (config.get("strategy.direction_mode", "AUTO") or "AUTO").upper()
+    for name in ("count_only", "trade", "wait_exit"):
+        expected = config.get(f"strategy.entry_range.{name}", config.get(f"entry_range.{name}"))
+        assert list(getattr(settings, f"entry_{name}")) == (expected or [])
+
+    # Lot theo STT entry: giá trị của lot_sizes.entry_<n> trong khoảng trade, 0 ngoài khoảng
+    start, end = settings.entry_trade
+    assert len(settings.lot_sizes) == end + 1
+    for entry in range(end + 1):
+        expected = config.get(f"lot_sizes.entry_{entry}", 0.0) if entry >= start else 0.0
+        assert settings.lot_sizes[entry] == expected, entry
+
+
+def test_compile_config_accepts_all_config_types():
+    config = make_config()
+    settings = compile_config(config)
+
+    assert compile_config(settings) is settings
+    wrapped = StrategyConfig(config_dict=copy.deepcopy(config))
+    assert compile_config(wrapped) is wrapped.compiled
+    assert repr(compile_config(wrapped)) == repr(settings)
+    with pytest.raises(TypeError):
+        compile_config(["not", "a", "config"])
+
+
+def test_missing_keys_use_defaults():
+    settings = StrategySettings.from_dict({})
+    assert settings.direction_mode == "AUTO"
+    assert settings.rsi_entry_buy == 30 and settings.rsi_entry_sell == 70
+    assert settings.entry_trade == (1, 40) and settings.entry_wait_exit == (41, None)
+    assert not settings.lot_sizes.any()
+
+
+def test_settings_are_immutable():
+    settings = compile_config(make_config())
+
+    with pytest.raises(AttributeError):
+        settings.rsi_period = 7
+    with pytest.raises(AttributeError):
+        settings.new_field = 1
+    with pytest.raises(AttributeError):
+        del settings.direction_mode
+    with pytest.raises(ValueError):
+        settings.lot_sizes[1] = 1.0
+    assert not hasattr(settings, "__dict__")
+
+
+def _with(path, value):
+    config = make_config()
+    node = config
+    *parents, last = path.split(".")
+    for key in parents:
+        node = node.setdefault(key, {})
+    node[last] = value
+    return config
+
+
+@pytest.mark.parametrize("path,value,message", [
+    ("strategy.rsi_entry_threshold.buy", 120, "strategy.rsi_entry_threshold.buy"),
+    ("strategy.rsi_break_threshold.sell", -5, "strategy.rsi_break_threshold.sell"),
+    ("strategy.rsi_exit.threshold", "50", "expected a number"),
+    ("strategy.rsi_period", 0, "strategy.rsi_period"),
+    ("strategy.rsi_period", 14.5, "expected an integer"),
+    ("strategy.direction_mode", "LONG", "strategy.direction_mode"),
+    ("strategy.entry_range.trade", [40, 10], "entry_range.trade"),
+    ("strategy.entry_range.trade", [0, 10], "entries start at 1"),
+    ("lot_sizes", [0.01, 0.02], "lot_sizes: expected a mapping"),
+    ("lot_sizes.entry_3", -0.01, "lot_sizes.entry_3"),
+    ("lot_sizes.entry_3", "0.01", "lot_sizes.entry_3"),
+    ("lot_sizes.third", 0.01, "key must look like entry_<n>"),
+    ("portfolio.initial_capital", 0, "portfolio.initial_capital"),
+    ("trading.spread_pips", -1, "trading.spread_pips"),
+])
+def test_invalid_values_rejected(path, value, message):
+    with pytest.raises(ValueError, match="Invalid configuration") as error:
+        compile_config(_with(path, value))
+    assert message in str(error.value)
+
+    # StrategyConfig báo lỗi ngay khi dựng từ dict
+    with pytest.raises(ValueError):
+        StrategyConfig(config_dict=_with(path, value))
+
+
+def test_all_errors_reported_together():
+    config = _with("strategy.rsi_entry_threshold.buy", 150)
+    config["lot_sizes"]["entry_2"] = -1
+    with pytest.raises(ValueError) as error:
+        compile_config(config)
+    assert "rsi_entry_threshold.buy" in str(error.value) and "entry_2" in str(error.value)
+
+
+def test_validate_recompiles_after_edit():
+    config = StrategyConfig(config_dict=make_config())
+    config.config["strategy"]["rsi_entry_threshold"]["buy"] = 25
+    config.validate()
+    assert config.compiled.rsi_entry_buy == 25
+
+    config.config["lot_sizes"]["entry_1"] = -1
+    with pytest.raises(ValueError):
+        config.validate()
+    np.testing.assert_array_equal(StrategyConfig(config_dict=make_config()).compiled.lot_sizes[:3], [0, 0.01, 0.02])
@@ -0,0 +1,106 @@
+"""
+Tests for StreamingEngine (khớp BacktestEngine, warm-up từ dữ liệu lịch sử)
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from src.backtest.engine import BacktestEngine
+from src.backtest.portfolio import Portfolio
+from src.backtest.streaming import DataFrameReplayFeed, StreamingEngine
+from src.strategy.dca_strategy import DCAStrategy
+from src.strategy.rsi_handler import IncrementalRSI
+from tests.conftest import make_config
+
+
+def _streaming_engine(config):
+    return StreamingEngine(config, DCAStrategy(config), Portfolio(10000))
+
+
+async def _feed(engine, data):
+    events = []
+    async for bar in DataFrameReplayFeed(data):
+        events.extend(engine.on_bar(bar))
+    return events
+
+
+def _signature(events):
+    return [(e["type"], e["timestamp"], round(float(e["price"]), 9)) for e in events]
+
+
+def test_streaming_matches_batch(bars):
+    config = make_config()
+    batch = BacktestEngine(config, bars, DCAStrategy(config), Portfolio(10000))
+    batch.verbose = False
+    expected = batch.run()
+
+    engine = _streaming_engine(config)
+    results = asyncio.run(engine.run(DataFrameReplayFeed(bars)))
+
+    assert _signature(results["events"]) == _signature(expected["events"])
+    assert results["total_pnl"] == pytest.approx(expected["total_pnl"], abs=1e-9)
+    np.testing.assert_allclose(engine.equity_values, batch.equity_values, atol=1e-9)
+
+
+@pytest.mark.parametrize("cut", [5, 15, 1000, 4321])
+def test_warm_up_matches_full_replay(bars, cut):
+    config = make_config()
+    full = _streaming_engine(config)
+    all_events = asyncio.run(_feed(full, bars))
+    start = bars.index[cut]
+    expected = [e for e in all_events if e["timestamp"] >= start]
+
+    engine = _streaming_engine(config)
+    assert engine.warm_up(bars.iloc[:cut]) == cut
+    # Warm-up không ghi equity/event của các nến lịch sử
+    assert engine.events == [] and len(engine.equity_values) == 0
+    events = asyncio.run(_feed(engine, bars.iloc[cut:]))
+
+    assert _signature(events) == _signature(expected)
+    assert engine.portfolio.realized_pnl == pytest.approx(full.portfolio.realized_pnl, abs=1e-9)
+    assert engine.portfolio.open_count == full.portfolio.open_count
+
+
+@pytest.mark.parametrize("count", [0, 3, 14, 15, 200])
+def test_incremental_rsi_seed_matches_updates(bars, count):
+    prices = bars["close"].to_numpy()[:count]
+    updated = IncrementalRSI(14)
+    for price in prices:
+        updated.update(price)
+
+    seeded = IncrementalRSI(14)
+    seeded.seed(prices)
+
+    assert seeded.ready == updated.ready
+    np.testing.assert_allclose(seeded.value, updated.value, equal_nan=True)
+    # Giá tiếp theo cho cùng kết quả
+    if count:
+        np.testing.assert_allclose(seeded.update(1850.0), updated.update(1850.0), equal_nan=True)
+
+
+def test_reconfigure_with_new_rsi_period(bars):
+    data = bars.iloc[:1500]
+    engine = _streaming_engine(make_config("BUY"))
+    asyncio.run(_feed(engine, data))
+    queue = engine.subscribe()
+
+    config = make_config("SELL")
+    config["strategy"]["rsi_period"] = 10
+    # Mặc định: portfolio mới với chi phí giao dịch của config
+    assert engine.reconfigure(config) is engine
+    assert engine.portfolio.pnl_calculator.cost_per_lot == 50.0
+
+    engine.reconfigure(config, portfolio=Portfolio(10000))
+    assert engine.rsi_close.period == engine.rsi_open.period == 10
+    assert engine.events == [] and engine.portfolio.open_count == 0 and engine.last_bar is None
+
+    fresh = _streaming_engine(config)
+    expected = asyncio.run(_feed(fresh, data))
+    events = asyncio.run(_feed(engine, data))
+
+    assert _signature(events) == _signature(expected)
+    assert engine.portfolio.realized_pnl == pytest.approx(fresh.portfolio.realized_pnl, abs=1e-9)
+    # Subscriber vẫn nhận event sau khi đổi cấu hình
+    assert queue.qsize() == min(len(events), queue.maxsize)
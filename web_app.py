@@ -3,27 +3,58 @@ Web application cho Backtest XAUUSD
 FastAPI backend với HTML/CSS/JS frontend
 """
 
+import asyncio
+import gzip
 import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Optional, List, Dict
 from fastapi import FastAPI, HTTPException, UploadFile, File, Query, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse, JSONResponse
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from datetime import datetime
 import pandas as pd
 
-from src.utils.data_loader import DataLoader
+try:
+    import orjson  # Optional: JSON encoder nhanh cho /api/tv/history
+except ImportError:
+    orjson = None
+
+try:
+    import brotli  # Optional: nén brotli cho /api/backtest/{run_id}/events
+except ImportError:
+    brotli = None
+
 from src.strategy.dca_strategy import DCAStrategy
 from src.backtest.portfolio import Portfolio
 from src.backtest.engine import BacktestEngine
+from src.backtest.streaming import StreamingEngine, DataFrameReplayFeed
 from src.config.strategy_config import StrategyConfig
-from src.utils.chart_visualizer import ChartVisualizer
+from src.utils.calculator import PnLCalculator
+from src.utils.series_cache import ResampledSeriesCache
+from src.utils.event_store import EventIndex
+from src.utils.chart_cache import ChartCache, chart_key
+from src.utils.dataset_cache import get_dataset_cache
+from src.utils.dataset_registry import get_registry
+from src.utils.file_watcher import DataDirWatcher, FILE_REMOVED
+from src.utils.downsample import decimate_series
+from src.utils.job_manager import JobManager, JOB_DONE, JOB_CANCELLED, JOB_FAILED, FINISHED_STATES
 from src.utils.backtest_utils import (
+    build_strategy_config,
+    convert_events_to_serializable,
+    serialize_event,
+    run_backtest_job,
+    render_chart_job,
     run_backtest_with_params,
     optimize_rsi_thresholds,
     get_xauusd_average_price,
+    warm_worker,
     DEFAULT_OPTIMIZE_BUY_RANGE,
     DEFAULT_OPTIMIZE_SELL_RANGE,
     DEFAULT_OPTIMIZE_STEP,
@@ -36,36 +67,158 @@ from src.utils.backtest_utils import (
 
 CONFIG_PATH = Path("configs/default_config.json")
 
-app = FastAPI(title="Backtest XAUUSD Web App")
-
-
-def convert_events_to_serializable(engine):
-    """Convert engine events to JSON-serializable format"""
-    events = []
-    if engine and hasattr(engine, 'events'):
-        for event in engine.events:
-            event_dict = {
-                'type': event.get('type'),
-                'timestamp': event.get('timestamp'),
-                'price': event.get('price'),
-                'rsi': event.get('rsi'),
-            }
-            # Add optional fields
-            if 'entry_number' in event:
-                event_dict['entry_number'] = event['entry_number']
-            if 'direction' in event:
-                event_dict['direction'] = event['direction']
-            if 'should_trade' in event:
-                event_dict['should_trade'] = event['should_trade']
-            if 'entry_count' in event:
-                event_dict['entry_count'] = event['entry_count']
-            # Convert timestamp to ISO string if it's a pandas Timestamp
-            if hasattr(event.get('timestamp'), 'isoformat'):
-                event_dict['timestamp'] = event['timestamp'].isoformat()
-            elif isinstance(event.get('timestamp'), pd.Timestamp):
-                event_dict['timestamp'] = event['timestamp'].isoformat()
-            events.append(event_dict)
-    return events
+
+def _web_setting(key: str, default):
+    """Đọc setting `web.<key>` từ config mặc định (trả về default nếu thiếu)"""
+    return _config_setting(f"web.{key}", default)
+
+
+def _config_setting(key: str, default):
+    """Đọc setting `key` (dot path) từ config mặc định (trả về default nếu thiếu)"""
+    try:
+        return StrategyConfig(CONFIG_PATH).get(key, default)
+    except (FileNotFoundError, ValueError, OSError):
+        return default
+
+
+# Backtest/tối ưu chạy trong process pool để không chặn event loop
+job_manager = JobManager(max_workers=_web_setting("max_concurrent_jobs", 2))
+
+# Nến đã resample cho TradingView, cache theo (file, resolution)
+series_cache = ResampledSeriesCache()
+
+# DataFrame đã load dùng chung giữa các endpoint (LRU, giới hạn bộ nhớ)
+dataset_cache = get_dataset_cache()
+dataset_cache.max_bytes = int(_web_setting("dataset_cache_mb", 512)) * 1024 * 1024
+
+# Thống kê các file data (số nến, khoảng thời gian, giá TB...), lưu trong data/store/registry.json
+dataset_registry = get_registry()
+_registering = set()
+_registering_lock = threading.Lock()
+
+# Theo dõi data/raw: file thêm/sửa/xóa -> bỏ cache liên quan, cập nhật bar store + registry
+data_watcher = DataDirWatcher("data/raw", "*.csv", interval=_web_setting("data_watch_interval", 2.0))
+
+# Biểu đồ PNG vẽ trong pool riêng (không chiếm slot backtest), cache theo nội dung
+chart_jobs = JobManager(max_workers=_web_setting("chart_workers", 1))
+chart_cache = ChartCache(
+    "results/charts",
+    max_age=float(_web_setting("chart_cache_max_age_hours", 168)) * 3600,
+    max_bytes=int(_web_setting("chart_cache_mb", 256)) * 1024 * 1024,
+)
+# key -> Job đang vẽ: request trùng key dùng chung một lần vẽ
+_chart_renders: Dict = {}
+_chart_renders_lock = threading.Lock()
+
+# Kích thước chunk khi ghi file upload
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+# Trạng thái warm-up lúc khởi động (trả về ở /api/health)
+_warmup: Dict = {"status": "pending", "data_file": None, "steps": {}, "error": None}
+
+
+async def _warm_step(name: str, func, *args):
+    """Chạy một bước warm-up trong thread, ghi lại thời gian vào _warmup["steps"]"""
+    started = time.perf_counter()
+    _warmup["steps"][name] = {"status": "running"}
+    result = await asyncio.to_thread(func, *args)
+    _warmup["steps"][name] = {"status": "done", "seconds": round(time.perf_counter() - started, 3)}
+    return result
+
+
+async def _warm_up(data_file: str):
+    """
+    Warm-up ở background: file data mới nhất vào bar store + registry, các
+    resolution TradingView vào series cache, và worker pool đã spawn với
+    dữ liệu + RSI (theo rsi_period trong config) nạp sẵn.
+    """
+    _warmup.update(status="warming", data_file=data_file, started_at=time.time())
+    try:
+        rsi_period = int(_config_setting("strategy.rsi_period", 14))
+        await _warm_step("dataset", dataset_registry.ensure, data_file)
+        await _warm_step("series", series_cache.warm, data_file)
+
+        started = time.perf_counter()
+        _warmup["steps"]["workers"] = {"status": "running"}
+        futures = job_manager.warm_up(warm_worker, data_file, rsi_period)
+        workers = await asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+        _warmup["steps"]["workers"] = {
+            "status": "done",
+            "seconds": round(time.perf_counter() - started, 3),
+            "count": len(workers),
+            "rsi_period": rsi_period,
+        }
+        _warmup["status"] = "ready"
+    except Exception as e:
+        # Warm-up lỗi không chặn server: request đầu tiên sẽ tự load như bình thường
+        _warmup.update(status="failed", error=str(e))
+        print(f"⚠️ Warm-up lỗi: {e}")
+    finally:
+        _warmup["finished_at"] = time.time()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup/shutdown hook của web app"""
+    data_watcher.start()
+    # Dọn biểu đồ cũ (quá hạn/vượt dung lượng) ở background
+    asyncio.get_running_loop().run_in_executor(None, chart_cache.evict)
+    # Warm-up ở background, không chặn startup
+    data_file = _latest_data_file()
+    warm_task = None
+    if data_file:
+        warm_task = asyncio.create_task(_warm_up(data_file))
+    else:
+        _warmup["status"] = "ready"
+    yield
+    if warm_task is not None:
+        warm_task.cancel()
+    data_watcher.stop()
+    job_manager.shutdown()
+    chart_jobs.shutdown()
+
+
+app = FastAPI(title="Backtest XAUUSD Web App", lifespan=lifespan)
+
+
+# Tham số của lần /api/backtest gần nhất (để replay dựng lại đúng cấu hình)
+_last_backtest: Dict = {}
+
+# EventIndex theo run_id (job id) của các lần chạy gần nhất
+_run_event_indexes: "OrderedDict[str, EventIndex]" = OrderedDict()
+RUN_INDEX_CACHE = 8
+
+# /api/backtest/{run_id}/events: số event tối đa mỗi trang, response nhỏ hơn thì không nén
+EVENTS_MAX_PAGE = 50000
+COMPRESS_MIN_SIZE = 1024
+
+# Số giây của mỗi resolution TradingView
+TV_RESOLUTION_SECONDS = {
+    "1": 60,
+    "5": 300,
+    "15": 900,
+    "30": 1800,
+    "60": 3600,
+    "240": 14400,
+    "1D": 86400,
+    "1W": 604800,
+    "1M": 2592000,
+}
+
+# Replay: số message SSE tối đa chờ gửi, và chu kỳ gom nến thành 1 message
+REPLAY_QUEUE_SIZE = 8
+REPLAY_FLUSH_INTERVAL = 0.05
+REPLAY_MAX_BATCH = 2000
+
+# Chu kỳ (giây) kiểm tra progress của job cho /api/jobs/{job_id}/events
+JOB_EVENTS_INTERVAL = 0.25
+
+
+def _latest_data_file():
+    """Return path of the most recently modified CSV in data/raw, or None"""
+    # Danh sách file do data_watcher giữ, không glob/stat thư mục ở mỗi request
+    return data_watcher.latest()
 
 # CORS middleware for TradingView
 app.add_middleware(
@@ -112,6 +265,13 @@ class BacktestRequest(BaseModel):
     auto_optimize: bool = False
 
 
+class ChartRequest(BaseModel):
+    run_id: Optional[str] = None
+    max_bars: Optional[int] = 1000
+    buckets: int = 1200
+    title: Optional[str] = None
+
+
 @app.get("/", response_class=HTMLResponse)
 async def read_root():
     """Serve main HTML page"""
@@ -129,97 +289,277 @@ async def read_root():
     """)
 
 
+@app.get("/api/health")
+async def health():
+    """Server đang chạy + trạng thái warm-up (luôn trả về 200)"""
+    return {
+        "status": "ok",
+        "ready": _warmup["status"] in ("ready", "failed"),
+        "warmup": _warmup,
+        "dataset_cache": dataset_cache.stats(),
+        "chart_cache": chart_cache.stats(),
+    }
+
+
+@app.get("/api/ready")
+async def readiness():
+    """Readiness probe: 503 cho đến khi warm-up xong (kể cả khi warm-up lỗi)"""
+    ready = _warmup["status"] in ("ready", "failed")
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"ready": ready, "status": _warmup["status"]},
+    )
+
+
+def _event_index_for(job) -> EventIndex:
+    """EventIndex của một job đã xong (build một lần, giữ RUN_INDEX_CACHE lần chạy gần nhất)"""
+    event_index = _run_event_indexes.get(job.job_id)
+    if event_index is None:
+        event_index = EventIndex(job.result.get("events") or [])
+        _run_event_indexes[job.job_id] = event_index
+        while len(_run_event_indexes) > RUN_INDEX_CACHE:
+            _run_event_indexes.popitem(last=False)
+    _run_event_indexes.move_to_end(job.job_id)
+    return event_index
+
+
+def _remember_backtest(job):
+    """Lưu tham số + index events của lần backtest gần nhất cho replay/marks"""
+    if _last_backtest.get("job_id") == job.job_id:
+        return
+    _last_backtest.clear()
+    _last_backtest.update({
+        "job_id": job.job_id,
+        "data_file_path": job.params.get("data_file_path"),
+        "params": job.result.get("params"),
+        "event_index": _event_index_for(job),
+    })
+
+
+def _job_result(job, include_events: bool = False):
+    """
+    Result payload of a finished job (raises HTTPException otherwise).
+
+    Mặc định không kèm events: trả về `run_id` + số event theo loại, events
+    lấy theo trang qua /api/backtest/{run_id}/events.
+    """
+    if job.status == JOB_FAILED:
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.status == JOB_CANCELLED:
+        raise HTTPException(status_code=409, detail="Job đã bị hủy")
+    if job.status != JOB_DONE:
+        raise HTTPException(status_code=409, detail=f"Job chưa xong (status={job.status})")
+    _remember_backtest(job)
+    payload = {
+        key: value for key, value in job.result.items()
+        if key not in ("params", "events", "equity_curve", "cycles")
+    }
+    payload["run_id"] = job.job_id
+    payload["event_counts"] = _event_index_for(job).counts()
+    payload["events_url"] = f"/api/backtest/{job.job_id}/events"
+    payload["equity_url"] = f"/api/backtest/{job.job_id}/equity"
+    payload["cycles_url"] = f"/api/backtest/{job.job_id}/cycles"
+    if include_events:
+        payload["events"] = job.result.get("events", [])
+    return payload
+
+
 @app.post("/api/backtest")
-async def run_backtest(request: BacktestRequest):
-    """Chạy backtest với tham số từ request"""
+async def run_backtest(
+    request: BacktestRequest,
+    include_events: bool = Query(False, description="Kèm toàn bộ events trong response (payload lớn)"),
+):
+    """Chạy backtest với tham số từ request (chờ kết quả, không chặn event loop)"""
+    job = job_manager.submit("backtest", run_backtest_job, request.dict())
     try:
-        # Convert Pydantic models to dicts
-        lot_data = [item.dict() for item in request.lot_data]
-        
-        if request.auto_optimize:
-            # Chế độ tự động tối ưu
-            result = optimize_rsi_thresholds(
-                lot_data,
-                request.data_file_path,
-                buy_range=DEFAULT_OPTIMIZE_BUY_RANGE,
-                sell_range=DEFAULT_OPTIMIZE_SELL_RANGE,
-                step=DEFAULT_OPTIMIZE_STEP,
-                direction_mode=request.direction_mode,
-            )
-            
-            # Chạy lại với tham số tốt nhất để lấy engine
-            best_buy = result.get('buy_threshold', 30)
-            best_sell = result.get('sell_threshold', 65)
-            direction = request.direction_mode.upper()
-            
-            if direction == "BUY":
-                buy_th = best_buy
-                sell_th = 100.0
-            else:
-                buy_th = 0.0
-                sell_th = best_sell
-            
-            _, engine = run_backtest_with_params(
-                buy_th,
-                sell_th,
-                lot_data,
-                request.data_file_path,
-                silent=True,
-                direction_mode=direction,
-            )
-            
-            # Convert events to serializable format
-            events = convert_events_to_serializable(engine)
-            
-            return {
-                "success": True,
-                "optimized": True,
-                "best_buy_threshold": best_buy,
-                "best_sell_threshold": best_sell,
-                "summary": result.get('summary', {}),
-                "all_results": result.get('all_results', []),
-                "events": events,
-            }
-        else:
-            # Chế độ thủ công
-            direction = request.direction_mode.upper()
-            if direction == "BUY":
-                buy_th = request.entry_rsi or request.buy_threshold
-                sell_th = 100.0
-            else:
-                buy_th = 0.0
-                sell_th = request.entry_rsi or request.sell_threshold
-            
-            summary, engine = run_backtest_with_params(
-                buy_th,
-                sell_th,
-                lot_data,
-                request.data_file_path,
-                silent=True,
-                direction_mode=direction,
-                entry_rsi=request.entry_rsi,
-                exit_rsi=request.exit_rsi,
-                break_rsi=request.break_rsi,
-            )
-            
-            # Convert events to serializable format
-            events = convert_events_to_serializable(engine)
-            
-            return {
-                "success": True,
-                "optimized": False,
-                "summary": summary,
-                "events": events,
-            }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        await asyncio.wrap_future(job.future)
+    except Exception:
+        # Lỗi/hủy đã được ghi vào job, _job_result trả về HTTP error tương ứng
+        pass
+    return _job_result(job, include_events)
+
+
+@app.get("/api/backtest/{run_id}/events")
+async def get_backtest_events(
+    request: Request,
+    run_id: str,
+    offset: int = Query(0, ge=0, description="Vị trí bắt đầu (sau khi lọc)"),
+    limit: int = Query(1000, ge=1, le=EVENTS_MAX_PAGE, description="Số event tối đa mỗi trang"),
+    types: Optional[str] = Query(None, description="Lọc theo loại, ví dụ: entry,exit"),
+    from_time: Optional[int] = Query(None, alias="from", description="Từ thời điểm (epoch seconds)"),
+    to_time: Optional[int] = Query(None, alias="to", description="Đến thời điểm (epoch seconds)"),
+    format: str = Query("columns", pattern="^(columns|rows)$", description="columns (mặc định) hoặc rows"),
+):
+    """
+    Events của một lần backtest theo trang, sắp xếp theo thời gian.
+
+    format=columns trả về {"time": [...], "type": [...], "price": [...], ...};
+    response được nén gzip/brotli theo Accept-Encoding.
+    """
+    job = _get_job_or_404(run_id)
+    _job_result(job)  # 409/500 nếu job chưa xong hoặc lỗi
+    event_index = _event_index_for(job)
+
+    type_filter = [t.strip() for t in types.split(",") if t.strip()] if types else None
+    positions = event_index.select(type_filter, from_time, to_time)
+    page = positions[offset:offset + limit]
+    next_offset = offset + len(page) if offset + len(page) < len(positions) else None
+
+    payload = {
+        "run_id": run_id,
+        "total": int(len(positions)),
+        "offset": offset,
+        "limit": limit,
+        "next_offset": next_offset,
+        "format": format,
+        "events": event_index.columnar(page) if format == "columns" else event_index.rows(page),
+    }
+    return _compressed_json(request, payload)
+
+
+@app.get("/api/backtest/{run_id}/equity")
+async def get_backtest_equity(
+    request: Request,
+    run_id: str,
+    points: int = Query(1000, ge=3, le=20000, description="Số điểm tối đa của đường equity"),
+):
+    """
+    Equity curve của một lần backtest, đã giảm điểm bằng LTTB.
+
+    Trả về các điểm LTTB (giữ đỉnh/đáy của drawdown lớn nhất) và dải bao
+    min/max của từng bucket.
+    """
+    job = _get_job_or_404(run_id)
+    _job_result(job)  # 409/500 nếu job chưa xong hoặc lỗi
+    curve = job.result.get("equity_curve") or {"t": [], "equity": []}
+    decimated = decimate_series(curve["t"], curve["equity"], points)
+    return _compressed_json(request, {
+        "run_id": run_id,
+        "total_points": len(curve["t"]),
+        "t": decimated["x"],
+        "equity": decimated["y"],
+        "envelope": {
+            "t": decimated["envelope_x"],
+            "min": decimated["envelope_min"],
+            "max": decimated["envelope_max"],
+        },
+    })
+
+
+@app.get("/api/backtest/{run_id}/cycles")
+async def get_backtest_cycles(
+    request: Request,
+    run_id: str,
+    format: str = Query("columns", pattern="^(columns|rows)$", description="columns (mặc định) hoặc rows"),
+):
+    """
+    Bảng chu kỳ DCA của một lần backtest: mỗi chu kỳ một dòng.
+
+    Cột: cycle, direction, entry_time/exit_time (epoch seconds), entry_bar/exit_bar,
+    bars_held, positions, depth (entry cao nhất), lots, avg_entry_price,
+    exit_price, pnl, mae (P&L thả nổi thấp nhất), mfe (cao nhất).
+    """
+    job = _get_job_or_404(run_id)
+    _job_result(job)  # 409/500 nếu job chưa xong hoặc lỗi
+    table = job.result.get("cycles") or {}
+    total = len(table.get("cycle", []))
+    if format == "rows":
+        columns = [values.tolist() if hasattr(values, "tolist") else list(values) for values in table.values()]
+        cycles = [dict(zip(table, row)) for row in zip(*columns)]
+    else:
+        cycles = table
+    return _compressed_json(request, {
+        "run_id": run_id,
+        "total": total,
+        "format": format,
+        "cycles": cycles,
+    })
+
+
+@app.post("/api/jobs/backtest")
+async def submit_backtest_job(request: BacktestRequest):
+    """Gửi backtest/tối ưu vào hàng đợi, trả về job id ngay"""
+    job = job_manager.submit("backtest", run_backtest_job, request.dict())
+    return job.to_dict()
+
+
+@app.get("/api/jobs")
+async def list_jobs():
+    """Liệt kê các job (đang chờ, đang chạy và đã xong gần đây)"""
+    return {"jobs": job_manager.list(), "max_concurrent_jobs": job_manager.max_workers}
+
+
+def _get_job_or_404(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Không tìm thấy job: {job_id}")
+    return job
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Trạng thái và progress của job"""
+    return _get_job_or_404(job_id).to_dict()
+
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_job_result(
+    job_id: str,
+    include_events: bool = Query(False, description="Kèm toàn bộ events trong response (payload lớn)"),
+):
+    """Kết quả của job đã hoàn thành (409 nếu chưa xong hoặc đã hủy)"""
+    return _job_result(_get_job_or_404(job_id), include_events)
+
+
+async def _job_event_stream(request: Request, job):
+    """SSE generator: gửi progress mỗi khi job thay đổi, kết thúc bằng message `done`"""
+    last_version = None
+    while True:
+        if await request.is_disconnected():
+            break
+        # Đọc version trước status để không bỏ lỡ lần cập nhật cuối
+        version = job.version
+        finished = job.status in FINISHED_STATES
+        if version != last_version:
+            last_version = version
+            yield _sse("done" if finished else "progress", job.to_dict())
+        if finished:
+            break
+        await asyncio.sleep(JOB_EVENTS_INTERVAL)
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(request: Request, job_id: str):
+    """
+    Progress của job dưới dạng Server-Sent Events.
+
+    Message `progress` chứa status snapshot (completed/total, best, eta_seconds,
+    bars_per_sec...) mỗi khi worker báo progress; message `done` khi job kết thúc
+    (lấy kết quả qua /api/jobs/{job_id}/result).
+    """
+    job = _get_job_or_404(job_id)
+    return StreamingResponse(
+        _job_event_stream(request, job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Hủy job đang chờ hoặc đang chạy"""
+    job = _get_job_or_404(job_id)
+    if not job_manager.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"Job đã kết thúc (status={job.status})")
+    return job.to_dict()
 
 
 @app.post("/api/calculate-lot")
 async def calculate_lot(request: CalculateLotRequest):
     """Tính lot size từ danh sách số tiền"""
     try:
-        xauusd_price = get_xauusd_average_price(request.data_file_path)
+        # Registry trả về ngay nếu file đã đăng ký; lần đầu load CSV trong thread riêng
+        xauusd_price = await asyncio.to_thread(get_xauusd_average_price, request.data_file_path)
         
         # Đảm bảo xauusd_price là số hợp lệ
         if not xauusd_price or xauusd_price <= 0:
@@ -255,17 +595,65 @@ async def calculate_lot(request: CalculateLotRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _refresh_dataset(file_path, ingest: bool = False):
+    """
+    Đăng ký file vào dataset registry (bỏ qua nếu file đang được xử lý).
+
+    ingest=True (sau upload / file thay đổi): normalize luôn vào bar store để
+    backtest và TradingView không phải parse lại CSV.
+    """
+    key = str(Path(file_path).resolve())
+    with _registering_lock:
+        if key in _registering:
+            return
+        _registering.add(key)
+    try:
+        if ingest:
+            dataset_registry.ingest(file_path)
+            series_cache.invalidate(file_path)
+        else:
+            dataset_registry.ensure(file_path)
+    except (FileNotFoundError, ValueError, OSError) as e:
+        print(f"⚠️ Không đăng ký được dataset {file_path}: {e}")
+    finally:
+        with _registering_lock:
+            _registering.discard(key)
+
+
+def _register_dataset(file_path, ingest: bool = False):
+    """Chạy _refresh_dataset ở background thread"""
+    asyncio.get_running_loop().run_in_executor(None, _refresh_dataset, file_path, ingest)
+
+
+def _on_data_change(file_path: str, kind: str):
+    """
+    Callback của data_watcher (chạy trong thread watcher): bỏ cache của file
+    và cập nhật bar store + registry (file chỉ nối thêm nến -> bar store chỉ append).
+    """
+    print(f"📂 Data file {kind}: {file_path}")
+    series_cache.invalidate(file_path)
+    dataset_cache.invalidate(file_path)
+    if kind == FILE_REMOVED:
+        dataset_registry.remove(file_path)
+        return
+    # Upload đã tự ingest: registry còn khớp fingerprint thì không parse lại
+    if dataset_registry.get(file_path) is None:
+        _refresh_dataset(file_path, ingest=True)
+    if file_path == data_watcher.latest():
+        series_cache.warm(file_path)
+
+
+data_watcher.subscribe(_on_data_change)
+
+
 @app.get("/api/data-files")
 async def list_data_files():
-    """Liệt kê các file data có sẵn"""
-    data_dir = Path("data/raw")
-    files = []
-    if data_dir.exists():
-        for file in data_dir.glob("*.csv"):
-            files.append({
-                "name": file.name,
-                "path": str(file),
-            })
+    """Liệt kê các file data có sẵn, kèm thống kê từ dataset registry"""
+    files = dataset_registry.entries(data_watcher.files())
+    # File mới/đã đổi: trả về ngay không kèm thống kê, đăng ký ở background
+    for file in files:
+        if not file["registered"]:
+            _register_dataset(file["path"])
     return {"files": files}
 
 
@@ -276,78 +664,180 @@ async def upload_data_file(file: UploadFile = File(...)):
         upload_dir = Path("data/raw")
         upload_dir.mkdir(parents=True, exist_ok=True)
         
-        file_path = upload_dir / file.filename
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        # Chỉ lấy tên file, không cho ghi ra ngoài data/raw
+        filename = Path(file.filename or "").name
+        if not filename:
+            raise HTTPException(status_code=400, detail="Missing filename")
+        file_path = upload_dir / filename
+        
+        # Ghi từng chunk vào file tạm rồi đổi tên: không giữ cả file trong RAM,
+        # và file đang upload dở không bị đọc như file data hoàn chỉnh
+        part_path = file_path.with_name(filename + ".part")
+        size = 0
+        try:
+            with open(part_path, "wb") as f:
+                while True:
+                    chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    await asyncio.to_thread(f.write, chunk)
+                    size += len(chunk)
+            os.replace(part_path, file_path)
+        finally:
+            if part_path.exists():
+                part_path.unlink()
+        
+        # Parse + normalize vào bar store + tính thống kê ở background
+        _register_dataset(file_path, ingest=True)
         
         return {
             "success": True,
-            "filename": file.filename,
+            "filename": filename,
             "path": str(file_path),
+            "size": size,
+            "processing": True,
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-async def plot_chart_auto(engine, direction: str = "BUY"):
+def _chart_run(run_id: Optional[str]):
+    """(data file, tham số backtest) của run_id, hoặc của lần backtest gần nhất nếu None"""
+    if run_id is not None:
+        job = _get_job_or_404(run_id)
+        if job.status != JOB_DONE:
+            raise HTTPException(status_code=409, detail=f"Job chưa xong (status={job.status})")
+        data_file, run_params = job.params.get("data_file_path"), job.result.get("params")
+    else:
+        data_file, run_params = _last_backtest.get("data_file_path"), _last_backtest.get("params")
+    if not run_params:
+        raise HTTPException(status_code=404, detail="Chưa có kết quả backtest để vẽ biểu đồ")
+    return data_file or _config_setting("data.data_file", "data/raw/xauusd_h1.csv"), run_params
+
+
+def _on_chart_done(key: str, job):
+    """Render xong: bỏ khỏi danh sách đang vẽ (giữ job lỗi để báo lỗi) và dọn cache"""
+    if job.status == JOB_DONE:
+        with _chart_renders_lock:
+            if _chart_renders.get(key) is job:
+                del _chart_renders[key]
+    chart_cache.evict()
+
+
+def _submit_chart(data_file, run_params: Dict, max_bars: Optional[int] = 1000,
+                  buckets: int = 1200, title: Optional[str] = None):
+    """
+    Biểu đồ của một lần backtest: dùng PNG đã có trong cache hoặc gửi vào pool vẽ chart.
+
+    Returns:
+        tuple: (filename, Job đang vẽ hoặc None nếu đã có trong cache)
+
+    Raises:
+        FileNotFoundError: If the data file does not exist
     """
-    Tự động vẽ biểu đồ sau khi backtest hoàn thành.
-    
+    window = {"max_bars": max_bars, "buckets": buckets if max_bars is None else None}
+    key = chart_key(data_file, run_params, window, {"title": title})
+    filename = chart_cache.filename(key)
+    if chart_cache.lookup(key) is not None:
+        return filename, None
+
+    with _chart_renders_lock:
+        job = _chart_renders.get(key)
+        if job is None or job.status in FINISHED_STATES:
+            job = chart_jobs.submit("chart", render_chart_job, {
+                "key": key,
+                "directory": str(chart_cache.directory),
+                "data_file_path": data_file,
+                "run_params": run_params,
+                "max_bars": max_bars,
+                "buckets": buckets,
+                "title": title,
+            })
+            _chart_renders[key] = job
+            job.future.add_done_callback(lambda _future, key=key, job=job: _on_chart_done(key, job))
+    return filename, job
+
+
+async def plot_chart_auto(run_params: Dict, data_file_path: Optional[str] = None,
+                          max_bars: Optional[int] = 1000):
+    """
+    Vẽ biểu đồ sau khi backtest hoàn thành (trong pool vẽ chart, không chặn event loop).
+
     Args:
-        engine: BacktestEngine instance
-        direction: Direction mode (BUY/SELL)
-    
+        run_params: Tham số backtest (result["params"] của job)
+        data_file_path: File data (None = file trong config)
+        max_bars: Số nến cuối cùng cần vẽ (None = toàn bộ lịch sử, gom nến)
+
     Returns:
-        str: Chart filename
+        str: Chart filename trong results/charts, None nếu vẽ lỗi
     """
+    data_file = data_file_path or _config_setting("data.data_file", "data/raw/xauusd_h1.csv")
     try:
-        if engine is None or engine.data is None or len(engine.data) == 0:
-            return None
-        
-        # Lấy events từ engine
-        events = engine.events if hasattr(engine, 'events') and engine.events is not None else []
-        if not isinstance(events, list):
-            events = []
-        
-        # Tạo visualizer
-        visualizer = ChartVisualizer(
-            data=engine.data,
-            events=events
-        )
-        
-        # Tạo thư mục lưu biểu đồ
-        output_dir = Path("results/charts")
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Tên file với timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        chart_filename = f"backtest_chart_{timestamp}.png"
-        save_path = output_dir / chart_filename
-        
-        # Đếm số events
-        entry_events = [e for e in events if isinstance(e, dict) and e.get('type') == 'entry']
-        exit_events = [e for e in events if isinstance(e, dict) and e.get('type') == 'exit']
-        
-        # Tạo title
-        title = f"XAUUSD Backtest {direction} - {len(entry_events)} entries, {len(exit_events)} exits"
-        
-        # Vẽ biểu đồ (không hiển thị, chỉ lưu file)
-        visualizer.plot(
-            title=title,
-            save_path=str(save_path),
-            show=False,
-            max_bars=1000,
-        )
-        
-        return chart_filename
+        filename, job = _submit_chart(data_file, run_params, max_bars=max_bars)
+        if job is not None:
+            await asyncio.wrap_future(job.future)
+        return filename
     except Exception as e:
         print(f"⚠️ Lỗi khi vẽ biểu đồ tự động: {e}")
-        import traceback
-        traceback.print_exc()
         return None
 
 
+@app.post("/api/chart")
+async def render_chart(
+    request: ChartRequest,
+    wait: bool = Query(False, description="Chờ vẽ xong rồi mới trả về"),
+):
+    """
+    Biểu đồ PNG của một lần backtest (run_id, mặc định lần gần nhất).
+
+    Trả về URL ngay nếu đã có trong cache; ngược lại gửi vào pool vẽ chart
+    và trả 202 kèm job id (hoặc chờ vẽ xong nếu wait=true).
+    """
+    data_file, run_params = _chart_run(request.run_id)
+    try:
+        filename, job = _submit_chart(
+            data_file, run_params, request.max_bars, request.buckets, request.title,
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    payload = {"filename": filename, "url": f"/api/chart/{filename}"}
+    if job is None:
+        return {**payload, "status": "ready", "cached": True}
+    if wait:
+        try:
+            await asyncio.wrap_future(job.future)
+        except Exception:
+            raise HTTPException(status_code=500, detail=job.error or "Vẽ biểu đồ bị hủy")
+        return {**payload, "status": "ready", "cached": False, "render": job.result}
+    return JSONResponse(
+        status_code=202,
+        content={**payload, "status": job.status, "cached": False, "job_id": job.job_id},
+    )
+
+
+@app.get("/api/chart/{filename}")
+async def get_chart(filename: str):
+    """File PNG của biểu đồ (202 khi đang vẽ); tên theo nội dung nên cache được lâu phía client"""
+    path = chart_cache.resolve(filename)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Không tìm thấy biểu đồ: {filename}")
+    if path.exists():
+        return FileResponse(
+            path,
+            media_type="image/png",
+            headers={"Cache-Control": "public, max-age=86400, immutable"},
+        )
+    job = _chart_renders.get(ChartCache.key_of(filename))
+    if job is not None and job.status not in FINISHED_STATES:
+        return JSONResponse(status_code=202, content={"status": job.status, "job_id": job.job_id})
+    if job is not None and job.status == JOB_FAILED:
+        raise HTTPException(status_code=500, detail=job.error)
+    raise HTTPException(status_code=404, detail=f"Không tìm thấy biểu đồ: {filename}")
+
+
 # TradingView UDF Datafeed Endpoints
 @app.get("/api/tv/config")
 async def tv_config():
@@ -355,8 +845,8 @@ async def tv_config():
     return {
         "supports_search": False,
         "supports_group_request": True,
-        "supports_marks": False,
-        "supports_timescale_marks": False,
+        "supports_marks": True,
+        "supports_timescale_marks": True,
         "supports_time": True,
         "exchanges": [
             {"value": "FOREX", "name": "Forex", "desc": "Forex"}
@@ -427,142 +917,253 @@ async def tv_history(
             except (ValueError, TypeError):
                 countback = None
         # Load data from default or last used file
-        data_file_path = None
-        data_dir = Path("data/raw")
-        if data_dir.exists():
-            csv_files = list(data_dir.glob("*.csv"))
-            if csv_files:
-                # Use the most recent file
-                data_file_path = str(max(csv_files, key=lambda p: p.stat().st_mtime))
+        data_file_path = _latest_data_file()
         
         if not data_file_path:
             return {"s": "no_data"}
         
-        loader = DataLoader()
-        df = loader.load_csv(data_file_path, source="auto")
-        
-        # Ensure datetime index
-        if not isinstance(df.index, pd.DatetimeIndex):
-            if 'timestamp' in df.columns:
-                df['timestamp'] = pd.to_datetime(df['timestamp'])
-                df.set_index('timestamp', inplace=True)
-            else:
-                return {"s": "error", "errmsg": "Data must have datetime index"}
-        
-        # Make timezone-aware if not already
-        if df.index.tz is None:
-            df.index = df.index.tz_localize('UTC')
-        
-        # Convert resolution to pandas frequency
-        resolution_map = {
-            "1": "1min",
-            "5": "5min",
-            "15": "15min",
-            "30": "30min",
-            "60": "1h",  # Changed from '1H' to '1h' (deprecated)
-            "240": "4h",  # Changed from '4H' to '4h' (deprecated)
-            "1D": "1D",
-            "1W": "1W",
-            "1M": "1M",
-        }
-        
-        freq = resolution_map.get(resolution, "1h")  # Changed from '1H' to '1h'
-        
-        # Resample if needed (only for intraday resolutions)
-        if resolution in ["1", "5", "15", "30", "60", "240"]:
+        # Series đã resample được cache theo (file, resolution); chỉ load khi chưa có
+        series = series_cache.peek(data_file_path, resolution)
+        if series is None:
             try:
-                df = df.resample(freq).agg({
-                    'open': 'first',
-                    'high': 'max',
-                    'low': 'min',
-                    'close': 'last',
-                    'volume': 'sum' if 'volume' in df.columns else 'first',
-                }).dropna()
-            except Exception as e:
-                return {"s": "error", "errmsg": f"Resampling error: {str(e)}"}
+                series = await asyncio.to_thread(series_cache.get, data_file_path, resolution)
+            except ValueError as e:
+                return {"s": "error", "errmsg": str(e)}
         
-        # Filter by time range
-        from_dt = pd.Timestamp.fromtimestamp(from_time, tz='UTC')
-        to_dt = pd.Timestamp.fromtimestamp(to_time, tz='UTC')
-        
-        # Debug: Log data range
-        print(f"DEBUG: Requested range: {from_dt} to {to_dt}")
-        print(f"DEBUG: Data range: {df.index.min()} to {df.index.max()}")
-        print(f"DEBUG: Data shape before filter: {df.shape}")
-        
-        df_filtered = df[(df.index >= from_dt) & (df.index <= to_dt)]
+        if len(series) == 0:
+            return {"s": "no_data"}
         
-        print(f"DEBUG: Data shape after filter: {df_filtered.shape}")
+        # Filter by time range (countback: số nến cần lấy tính ngược từ `to`, bỏ qua `from`)
+        if countback and countback > 0:
+            lo, hi = series.last_n(to_time, countback)
+        else:
+            lo, hi = series.range(from_time, to_time)
         
         # If no data in exact range, try to return available data
-        if df_filtered.empty:
-            # If we have data but not in the requested range, return what we have
+        if lo == hi:
+            # Return the most recent data (last 500 bars to avoid too much data)
             # This helps TradingView display something while it adjusts the time range
-            if not df.empty:
-                # Return the most recent data (last 500 bars to avoid too much data)
-                df_filtered = df.tail(500)
-                print(f"DEBUG: No data in exact range, returning last 500 bars")
-            else:
-                return {"s": "no_data"}
-        
-        if df_filtered.empty:
-            return {"s": "no_data"}
+            lo, hi = max(len(series) - 500, 0), len(series)
         
-        # Convert to UDF format
-        bars = []
-        for idx, row in df_filtered.iterrows():
-            timestamp = int(idx.timestamp())
-            bars.append({
-                "t": timestamp,
-                "o": float(row['open']),
-                "h": float(row['high']),
-                "l": float(row['low']),
-                "c": float(row['close']),
-                "v": float(row.get('volume', 0)),
-            })
+        # Build UDF response directly from column arrays
+        response_data = {"s": "ok", **series.columns(lo, hi)}
         
-        # Sort by time (ascending)
-        bars.sort(key=lambda x: x["t"])
+        # nextTime should be the timestamp of the last bar + 1 period
+        resolution_seconds = TV_RESOLUTION_SECONDS.get(resolution, 3600)
+        response_data["nextTime"] = int(series.times[hi - 1]) + resolution_seconds
         
-        # Calculate nextTime for TradingView to know where data is available
-        nextTime = None
-        if bars:
-            # nextTime should be the timestamp of the last bar + 1 period
-            last_timestamp = bars[-1]["t"]
-            # Add one period based on resolution
-            resolution_seconds = {
-                "1": 60,
-                "5": 300,
-                "15": 900,
-                "30": 1800,
-                "60": 3600,
-                "240": 14400,
-                "1D": 86400,
-                "1W": 604800,
-                "1M": 2592000,
-            }.get(resolution, 3600)
-            nextTime = last_timestamp + resolution_seconds
-        
-        response_data = {
-            "s": "ok",
-            "t": [b["t"] for b in bars],
-            "o": [b["o"] for b in bars],
-            "h": [b["h"] for b in bars],
-            "l": [b["l"] for b in bars],
-            "c": [b["c"] for b in bars],
-            "v": [b["v"] for b in bars],
-        }
-        
-        if nextTime:
-            response_data["nextTime"] = nextTime
-        
-        print(f"DEBUG: Returning {len(bars)} bars, nextTime: {nextTime}")
-        
-        return response_data
+        return Response(content=_json_bytes(response_data), media_type="application/json")
     except Exception as e:
         return {"s": "error", "errmsg": str(e)}
 
 
+def _marks_request(from_time: int, to_time: int, resolution: str):
+    """Index events của lần backtest gần nhất + số giây mỗi nến (None nếu chưa có backtest)"""
+    event_index = _last_backtest.get("event_index")
+    if event_index is None or to_time < from_time:
+        return None, 0
+    return event_index, TV_RESOLUTION_SECONDS.get(resolution, 0)
+
+
+@app.get("/api/tv/marks")
+async def tv_marks(
+    symbol: str = Query(..., description="Symbol name"),
+    from_time: int = Query(..., alias="from", description="Range start (epoch seconds)"),
+    to_time: int = Query(..., alias="to", description="Range end (epoch seconds)"),
+    resolution: str = Query("60", description="Chart resolution (events trong cùng nến được gom)"),
+):
+    """TradingView UDF marks: entry của lần backtest gần nhất trong khoảng đang hiển thị"""
+    event_index, bucket_seconds = _marks_request(from_time, to_time, resolution)
+    if event_index is None:
+        return []
+    return event_index.marks(from_time, to_time, bucket_seconds)
+
+
+@app.get("/api/tv/timescale_marks")
+async def tv_timescale_marks(
+    symbol: str = Query(..., description="Symbol name"),
+    from_time: int = Query(..., alias="from", description="Range start (epoch seconds)"),
+    to_time: int = Query(..., alias="to", description="Range end (epoch seconds)"),
+    resolution: str = Query("60", description="Chart resolution (events trong cùng nến được gom)"),
+):
+    """TradingView UDF timescale marks: exit/break của lần backtest gần nhất"""
+    event_index, bucket_seconds = _marks_request(from_time, to_time, resolution)
+    if event_index is None:
+        return []
+    return event_index.timescale_marks(from_time, to_time, bucket_seconds)
+
+
+def _json_bytes(data) -> bytes:
+    """Encode JSON (numpy arrays allowed) bằng orjson nếu có, ngược lại dùng json"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(data, default=lambda o: o.tolist()).encode()
+
+
+def _compressed_json(request: Request, data) -> Response:
+    """JSON response, nén brotli (nếu có thư viện) hoặc gzip theo Accept-Encoding"""
+    body = _json_bytes(data)
+    headers = {"Vary": "Accept-Encoding"}
+    if len(body) >= COMPRESS_MIN_SIZE:
+        accepted = request.headers.get("accept-encoding", "").lower()
+        if brotli is not None and "br" in accepted:
+            body = brotli.compress(body, quality=4)
+            headers["Content-Encoding"] = "br"
+        elif "gzip" in accepted:
+            body = gzip.compress(body, compresslevel=6)
+            headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _sse(event: str, data) -> str:
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _to_index_time(index, epoch_seconds):
+    """Convert a UDF epoch (seconds, UTC) to a Timestamp comparable with `index`"""
+    ts = pd.Timestamp(int(epoch_seconds), unit='s', tz='UTC')
+    if getattr(index, 'tz', None) is None:
+        return ts.tz_localize(None)
+    return ts.tz_convert(index.tz)
+
+
+def _replay_message(candles: Dict, events: List[Dict]) -> str:
+    """Pack a batch of replayed candles (columnar, UDF-style) and events into one SSE message"""
+    rows = list(candles.values())
+    return _sse("bars", {
+        "t": [row[0] for row in rows],
+        "o": [row[1] for row in rows],
+        "h": [row[2] for row in rows],
+        "l": [row[3] for row in rows],
+        "c": [row[4] for row in rows],
+        "v": [row[5] for row in rows],
+        "events": events,
+    })
+
+
+async def _produce_replay(engine, warmup, data, speed, bucket_seconds, queue):
+    """
+    Chạy StreamingEngine trên dữ liệu replay và đẩy các batch SSE vào queue.
+
+    Backpressure: queue có giới hạn, `await queue.put` sẽ dừng replay khi
+    client đọc chậm. Khi client đọc kịp lại, feed (neo theo đồng hồ) phát bù
+    nhanh và các batch lớn hơn, nên không event nào bị bỏ.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        # Warm-up: đưa RSI/strategy/portfolio về trạng thái tại điểm bắt đầu
+        # (chạy theo mảng, trong thread để không chặn event loop)
+        await loop.run_in_executor(None, engine.warm_up, warmup)
+
+        candles = {}  # bucket time -> [t, o, h, l, c, v] của nến đang hình thành
+        events = []
+        current = None
+        last_flush = loop.time()
+        async for bar in DataFrameReplayFeed(data, speed=speed):
+            t = int(bar.timestamp.timestamp())
+            bucket = t - t % bucket_seconds if bucket_seconds else t
+            if current is None or current[0] != bucket:
+                current = [bucket, bar.open, bar.high, bar.low, bar.close, bar.volume]
+            else:
+                current[2] = max(current[2], bar.high)
+                current[3] = min(current[3], bar.low)
+                current[4] = bar.close
+                current[5] += bar.volume
+            candles[bucket] = current
+
+            for event in engine.on_bar(bar):
+                item = serialize_event(event)
+                item['time'] = t
+                events.append(item)
+
+            if len(candles) >= REPLAY_MAX_BATCH or loop.time() - last_flush >= REPLAY_FLUSH_INTERVAL:
+                await queue.put(_replay_message(candles, events))
+                candles = {}
+                events = []
+                last_flush = loop.time()
+
+        if candles or events:
+            await queue.put(_replay_message(candles, events))
+    except Exception as e:
+        await queue.put(_sse("error", {"errmsg": str(e)}))
+    await queue.put(None)
+
+
+async def _replay_stream(request: Request, engine, warmup, data, speed, bucket_seconds, resolution):
+    """SSE generator: forward batches from the producer until done or client disconnects"""
+    queue = asyncio.Queue(maxsize=REPLAY_QUEUE_SIZE)
+    producer = asyncio.create_task(
+        _produce_replay(engine, warmup, data, speed, bucket_seconds, queue)
+    )
+    try:
+        yield _sse("meta", {"bars": len(data), "speed": speed, "resolution": resolution})
+        while True:
+            message = await queue.get()
+            if message is None:
+                yield _sse("end", {})
+                break
+            if await request.is_disconnected():
+                break
+            yield message
+    finally:
+        producer.cancel()
+
+
+@app.get("/api/tv/replay")
+async def tv_replay(
+    request: Request,
+    resolution: str = Query("60", description="Chart resolution used to aggregate replayed bars"),
+    speed: float = Query(3600.0, ge=0, description="Replay speed multiplier (0 = as fast as possible)"),
+    from_time: Optional[int] = Query(None, alias="from", description="Replay start (epoch seconds)"),
+    to_time: Optional[int] = Query(None, alias="to", description="Replay end (epoch seconds)"),
+    data_file_path: Optional[str] = None,
+):
+    """
+    Replay nến + events (entry/exit/break) của engine dưới dạng Server-Sent Events.
+
+    Dùng cấu hình của lần /api/backtest gần nhất (hoặc config mặc định).
+    Message `bars` chứa các nến đã gom theo `resolution` (dạng cột như UDF
+    history) và events phát sinh trong batch đó; kết thúc bằng message `end`.
+    """
+    data_file = data_file_path or _last_backtest.get("data_file_path") or _latest_data_file()
+    if not data_file:
+        raise HTTPException(status_code=404, detail="Không tìm thấy file data để replay")
+
+    try:
+        params = _last_backtest.get("params")
+        cfg = build_strategy_config(**params) if params else StrategyConfig(CONFIG_PATH)
+        df = await asyncio.to_thread(dataset_cache.get, data_file)
+    except (FileNotFoundError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    start = _to_index_time(df.index, from_time) if from_time is not None else None
+    end = _to_index_time(df.index, to_time) if to_time is not None else None
+    warmup = df[df.index < start] if start is not None else df.iloc[:0]
+    data = df[df.index >= start] if start is not None else df
+    if end is not None:
+        data = data[data.index <= end]
+
+    portfolio_cfg = cfg.get("portfolio", {}) or {}
+    engine = StreamingEngine(
+        config=cfg,
+        strategy=DCAStrategy(cfg),
+        portfolio=Portfolio(
+            initial_capital=portfolio_cfg.get("initial_capital", 10000),
+            pnl_calculator=PnLCalculator.from_config(cfg),
+        ),
+        symbol=cfg.get("data.symbol", "XAUUSD"),
+    )
+    # 1W/1M không gom được bằng số giây cố định -> gửi nến gốc
+    bucket_seconds = 0 if resolution in ("1W", "1M") else TV_RESOLUTION_SECONDS.get(resolution, 0)
+
+    return StreamingResponse(
+        _replay_stream(request, engine, warmup, data, speed or None, bucket_seconds, resolution),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/api/tv/time")
 async def tv_time():
     """TradingView UDF server time endpoint"""
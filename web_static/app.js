@@ -27,6 +27,8 @@ const btnRun = document.getElementById('btn-run');
 const fileLabel = document.getElementById('file-label');
 const statusLabel = document.getElementById('status-label');
 const resultText = document.getElementById('result-text');
+const btnReplay = document.getElementById('btn-replay');
+const replaySpeedSelect = document.getElementById('replay-speed');
 
 // Event Listeners
 directionRadios.forEach(radio => {
@@ -43,6 +45,7 @@ btnLoad.addEventListener('click', onLoadLotData);
 btnUpdate.addEventListener('click', onUpdateLotData);
 btnSelectFile.addEventListener('click', onSelectDataFile);
 btnRun.addEventListener('click', onRunBacktest);
+btnReplay.addEventListener('click', onToggleReplay);
 
 // Initialize
 onRsiModeChange();
@@ -400,28 +403,13 @@ async function onRunBacktest() {
     }
     
     try {
-        const response = await fetch(`${API_BASE}/backtest`, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify(request),
-        });
-        
-        if (!response.ok) {
-            const error = await response.json();
-            throw new Error(error.detail || 'Backtest failed');
-        }
-        
-        const data = await response.json();
+        const data = await runBacktestJob(request);
         lastBacktestResult = data;
         
         displayResults(data);
         
-        // Vẽ markers trên TradingView chart
-        if (data.events && data.events.length > 0) {
-            drawBacktestMarkers(data.events);
-        }
+        // Markers được chart tự tải theo khoảng đang hiển thị (/api/tv/marks)
+        refreshBacktestMarks();
         
         showStatus('✅ Backtest hoàn thành!', 'success');
     } catch (error) {
@@ -432,6 +420,70 @@ async function onRunBacktest() {
     }
 }
 
+function formatJobProgress(progress) {
+    const parts = [];
+    if (progress.total) {
+        parts.push(`${progress.completed || 0}/${progress.total} tổ hợp`);
+    } else if (progress.total_bars) {
+        parts.push(`${(progress.bars_done || 0).toLocaleString()}/${progress.total_bars.toLocaleString()} nến`);
+    }
+    if (progress.best) {
+        parts.push(`tốt nhất BUY=${progress.best.buy_threshold} SELL=${progress.best.sell_threshold} ($${progress.best.total_pnl.toFixed(2)})`);
+    }
+    if (progress.bars_per_sec) {
+        parts.push(`${Math.round(progress.bars_per_sec).toLocaleString()} nến/s`);
+    }
+    if (progress.eta_seconds !== undefined) {
+        parts.push(`còn ~${Math.ceil(progress.eta_seconds)}s`);
+    }
+    return parts.join(' | ');
+}
+
+async function runBacktestJob(request) {
+    // Gửi job, theo dõi progress qua SSE rồi lấy kết quả khi job xong
+    const response = await fetch(`${API_BASE}/jobs/backtest`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(request),
+    });
+    
+    if (!response.ok) {
+        const error = await response.json();
+        throw new Error(error.detail || 'Backtest failed');
+    }
+    
+    const job = await response.json();
+    
+    await new Promise((resolve) => {
+        const source = new EventSource(`${API_BASE}/jobs/${job.job_id}/events`);
+        source.addEventListener('progress', (e) => {
+            const status = JSON.parse(e.data);
+            const text = formatJobProgress(status.progress);
+            if (text) {
+                showStatus(`⏳ Đang chạy backtest... ${text}`, 'info');
+            }
+        });
+        source.addEventListener('done', () => {
+            source.close();
+            resolve();
+        });
+        source.onerror = () => {
+            // Mất kết nối SSE: vẫn thử lấy kết quả bên dưới
+            source.close();
+            resolve();
+        };
+    });
+    
+    const resultResponse = await fetch(`${API_BASE}/jobs/${job.job_id}/result`);
+    if (!resultResponse.ok) {
+        const error = await resultResponse.json();
+        throw new Error(error.detail || 'Backtest failed');
+    }
+    return await resultResponse.json();
+}
+
 function displayResults(data) {
     const summary = data.summary;
     const isOptimized = data.optimized;
@@ -463,6 +515,18 @@ function displayResults(data) {
     result += `      - Số entry: ${summary.sell_entries || 0}\n`;
     result += `      - Số lệnh thực tế: ${summary.sell_trades || 0}\n`;
     
+    const metrics = summary.metrics;
+    if (metrics) {
+        const fmt = (value, digits = 2) => (value === null || value === undefined) ? 'N/A' : Number(value).toFixed(digits);
+        result += `\n📉 CHỈ SỐ HIỆU SUẤT:\n`;
+        result += `   Max Drawdown: ${fmt(metrics.max_drawdown)}% ($${fmt(metrics.max_drawdown_amount)})\n`;
+        result += `   Drawdown dài nhất: ${metrics.max_drawdown_bars} nến (${fmt(metrics.max_drawdown_days, 1)} ngày)\n`;
+        result += `   Sharpe: ${fmt(metrics.sharpe)} | Sortino: ${fmt(metrics.sortino)}\n`;
+        result += `   Profit Factor: ${fmt(metrics.profit_factor)}\n`;
+        result += `   Chu kỳ: ${metrics.cycles || 0} (thắng ${fmt(metrics.cycle_win_rate, 1)}%), TB ${fmt(metrics.avg_cycle_positions, 1)} lệnh / ${fmt(metrics.avg_cycle_bars, 1)} nến\n`;
+        result += `   Exposure: ${fmt(metrics.exposure, 1)}% thời gian có lệnh mở\n`;
+    }
+    
     resultText.textContent = result;
 }
 
@@ -568,6 +632,7 @@ function showStatus(message, type = 'info') {
 
 // TradingView Chart Initialization
 let tvWidget = null;
+let tvDatafeed = null;
 
 function initTradingViewChart() {
     if (typeof TradingView === 'undefined' || typeof BacktestDatafeed === 'undefined') {
@@ -588,6 +653,7 @@ function initTradingViewChart() {
     }
 
     const datafeed = new BacktestDatafeed('/api/tv');
+    tvDatafeed = datafeed;
 
     tvWidget = new TradingView.widget({
         debug: false,
@@ -673,7 +739,58 @@ window.addEventListener('DOMContentLoaded', () => {
     }
 });
 
+// Replay backtest trên chart: bắt đầu từ đầu vùng đang xem, events vẽ dần theo nến
+function onToggleReplay() {
+    if (!tvWidget || !tvDatafeed) {
+        showStatus('⚠️ Biểu đồ chưa sẵn sàng', 'error');
+        return;
+    }
+
+    if (tvDatafeed.isReplaying()) {
+        tvDatafeed.stopReplay();
+        tvWidget.activeChart().resetData();
+        btnReplay.textContent = '▶️ Replay';
+        showStatus('⏹️ Đã dừng replay', 'info');
+        return;
+    }
+
+    tvWidget.onChartReady(() => {
+        const chart = tvWidget.activeChart();
+        const visibleRange = chart.getVisibleRange();
+
+        tvDatafeed.startReplay({
+            from: Math.floor(visibleRange.from),
+            speed: parseFloat(replaySpeedSelect.value),
+            resolution: chart.resolution(),
+            onEvents: (events) => drawBacktestMarkers(events),
+            onEnd: () => {
+                btnReplay.textContent = '▶️ Replay';
+                showStatus('✅ Replay hoàn thành', 'success');
+            },
+            onError: (errmsg) => {
+                btnReplay.textContent = '▶️ Replay';
+                showStatus(`❌ Lỗi replay: ${errmsg}`, 'error');
+            },
+        });
+        chart.resetData();
+        btnReplay.textContent = '⏹️ Dừng replay';
+        showStatus('⏳ Đang replay...', 'info');
+    });
+}
+
 // Function to draw backtest markers on TradingView chart
+function refreshBacktestMarks() {
+    if (!tvWidget) {
+        return;
+    }
+    tvWidget.onChartReady(() => {
+        const chart = tvWidget.activeChart();
+        if (chart) {
+            chart.refreshMarks();
+        }
+    });
+}
+
 function drawBacktestMarkers(events) {
     if (!tvWidget) {
         console.warn('TradingView widget not initialized yet');
@@ -53,6 +53,12 @@
             this._symbolsStorage = null;
             this._requester = new Requester();
             this._configurationReadyPromise = this._requestConfiguration();
+
+            // Realtime subscribers (subscriberUID -> { onTick, onResetCacheNeededCallback })
+            this._subscribers = {};
+            // Replay state: EventSource đang mở và thời điểm bắt đầu replay (giây)
+            this._replaySource = null;
+            this._replayFrom = null;
         }
 
         onReady(callback) {
@@ -130,6 +136,15 @@
                 params.countback = periodParams.countBack;
             }
 
+            // Khi đang replay, history chỉ được tới điểm bắt đầu replay, phần sau do replay đẩy vào
+            if (this._replayFrom !== null) {
+                if (params.from >= this._replayFrom) {
+                    onHistoryCallback([], { noData: true });
+                    return;
+                }
+                params.to = Math.min(params.to, this._replayFrom - 1);
+            }
+
             console.log('TradingView getBars request:', params);
             
             this._requester.sendRequest(this._datafeedUrl, 'history', params)
@@ -195,13 +210,139 @@
                 });
         }
 
+        getMarks(symbolInfo, from, to, onDataCallback, resolution) {
+            // Chỉ lấy markers trong khoảng đang hiển thị (server gom theo nến)
+            const params = {
+                symbol: symbolInfo.name || symbolInfo.ticker,
+                from: from,
+                to: to,
+                resolution: resolution,
+            };
+            this._requester.sendRequest(this._datafeedUrl, 'marks', params)
+                .then(marks => onDataCallback(Array.isArray(marks) ? marks : []))
+                .catch(error => {
+                    console.error('Marks request error:', error);
+                    onDataCallback([]);
+                });
+        }
+
+        getTimescaleMarks(symbolInfo, from, to, onDataCallback, resolution) {
+            const params = {
+                symbol: symbolInfo.name || symbolInfo.ticker,
+                from: from,
+                to: to,
+                resolution: resolution,
+            };
+            this._requester.sendRequest(this._datafeedUrl, 'timescale_marks', params)
+                .then(marks => onDataCallback(Array.isArray(marks) ? marks : []))
+                .catch(error => {
+                    console.error('Timescale marks request error:', error);
+                    onDataCallback([]);
+                });
+        }
+
         subscribeBars(symbolInfo, resolution, onTick, subscriberUID, onResetCacheNeededCallback) {
-            // Real-time subscription not implemented yet
-            // Can be extended later if needed
+            // Nến realtime chỉ đến từ replay (startReplay), không có feed live
+            this._subscribers[subscriberUID] = {
+                resolution: resolution,
+                onTick: onTick,
+                onResetCacheNeededCallback: onResetCacheNeededCallback,
+            };
         }
 
         unsubscribeBars(subscriberUID) {
-            // Real-time unsubscription not implemented yet
+            delete this._subscribers[subscriberUID];
+        }
+
+        _resetSubscribersCache() {
+            Object.values(this._subscribers).forEach(sub => {
+                if (typeof sub.onResetCacheNeededCallback === 'function') {
+                    sub.onResetCacheNeededCallback();
+                }
+            });
+        }
+
+        /**
+         * Replay nến + events của backtest gần nhất qua Server-Sent Events.
+         * options: { from, to, speed, resolution, onEvents(events), onEnd(), onError(msg) }
+         * Gọi chart.resetData() sau khi start để chart tải lại history tới điểm `from`.
+         */
+        startReplay(options) {
+            this.stopReplay(false);
+            const opts = options || {};
+            const params = {
+                speed: opts.speed !== undefined ? opts.speed : 3600,
+                resolution: opts.resolution || '60',
+            };
+            if (opts.from !== undefined) {
+                params.from = opts.from;
+            }
+            if (opts.to !== undefined) {
+                params.to = opts.to;
+            }
+            const query = Object.keys(params)
+                .map(key => `${encodeURIComponent(key)}=${encodeURIComponent(params[key].toString())}`)
+                .join('&');
+
+            this._replayFrom = opts.from !== undefined ? opts.from : null;
+            this._resetSubscribersCache();
+
+            const source = new EventSource(`${this._datafeedUrl}/replay?${query}`);
+            this._replaySource = source;
+
+            source.addEventListener('bars', (message) => {
+                const batch = JSON.parse(message.data);
+                const subscribers = Object.values(this._subscribers);
+                for (let i = 0; i < batch.t.length; i++) {
+                    const bar = {
+                        time: batch.t[i] * 1000,
+                        open: batch.o[i],
+                        high: batch.h[i],
+                        low: batch.l[i],
+                        close: batch.c[i],
+                        volume: batch.v[i],
+                    };
+                    subscribers.forEach(sub => sub.onTick(bar));
+                }
+                if (batch.events.length > 0 && typeof opts.onEvents === 'function') {
+                    opts.onEvents(batch.events);
+                }
+            });
+
+            source.addEventListener('end', () => {
+                source.close();
+                this._replaySource = null;
+                if (typeof opts.onEnd === 'function') {
+                    opts.onEnd();
+                }
+            });
+
+            source.addEventListener('error', (message) => {
+                // Server gửi event 'error' có data; lỗi kết nối thì không có data
+                const errmsg = message.data ? JSON.parse(message.data).errmsg : 'Replay connection error';
+                source.close();
+                this._replaySource = null;
+                if (typeof opts.onError === 'function') {
+                    opts.onError(errmsg);
+                }
+            });
+        }
+
+        stopReplay(resetCache = true) {
+            if (this._replaySource) {
+                this._replaySource.close();
+                this._replaySource = null;
+            }
+            if (this._replayFrom !== null) {
+                this._replayFrom = null;
+                if (resetCache) {
+                    this._resetSubscribersCache();
+                }
+            }
+        }
+
+        isReplaying() {
+            return this._replaySource !== null;
         }
 
         getServerTime(callback) {